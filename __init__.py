@@ -5,9 +5,6 @@
 #Version: 0.1.0
 #Date: 15-10-2024
 # ==============================================================================
-from .module_loader import refresh
-refresh()
-
 
 bl_info = {
     "name" : "Arcade",
@@ -20,14 +17,23 @@ bl_info = {
     "category" : "Import-Export"
 }
 
-import bpy
-from .panels import ADDON1_PT_Panel, ADDON2_PT_Panel, ADDON3_PT_Panel, ADDON4_PT_Panel
-from .operators import ADDON1_OT_Operator, ADDON2_OT_Operator, ADDON3_OT_Operator, ADDON4_OT_Operator, ADDON5_OT_Operator
-from .properties import MyPropertyGroup, MyAddonProperties
-from .pref import saveLocFile
+# The simulation engine (engine.py, weather.py) can be imported without Blender,
+# in which case the add-on classes are simply not loaded
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+if bpy is not None:
+    from .module_loader import refresh
+    refresh()
 
+    from .panels import ADDON1_PT_Panel, ADDON2_PT_Panel, ADDON3_PT_Panel, ADDON4_PT_Panel
+    from .operators import ADDON1_OT_Operator, ADDON2_OT_Operator, ADDON3_OT_Operator, ADDON4_OT_Operator, ADDON5_OT_Operator
+    from .properties import MyPropertyGroup, MyAddonProperties
+    from .pref import saveLocFile
 
-classes=[MyPropertyGroup, ADDON1_PT_Panel,ADDON2_PT_Panel, ADDON3_PT_Panel, ADDON4_PT_Panel, ADDON1_OT_Operator, ADDON2_OT_Operator,ADDON3_OT_Operator, ADDON4_OT_Operator, ADDON5_OT_Operator, saveLocFile, MyAddonProperties]
+    classes=[MyPropertyGroup, ADDON1_PT_Panel,ADDON2_PT_Panel, ADDON3_PT_Panel, ADDON4_PT_Panel, ADDON1_OT_Operator, ADDON2_OT_Operator,ADDON3_OT_Operator, ADDON4_OT_Operator, ADDON5_OT_Operator, saveLocFile, MyAddonProperties]
 
 def register():
     from bpy.utils import register_class
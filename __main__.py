@@ -0,0 +1,51 @@
+"""
+Command-line interface of the simulation, for headless runs without Blender.
+
+Example:
+    python -m arcade simulate --geojson district.geojson --epw weather.epw --archetype DK --out results --workers 8
+
+The output files are the ones written by the "Calculate Heating and Cooling Loads" operator.
+"""
+import argparse
+import sys
+
+from .results import OUTPUT_FORMATS
+from .archetypes import get_registry
+from .pipeline import simulate_district
+
+
+def build_parser():
+    """ Return the parser of the command-line arguments. """
+    parser = argparse.ArgumentParser(prog="python -m arcade", description="Urban building energy simulation without Blender.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="Simulate the buildings of a footprint file")
+    simulate.add_argument("--geojson", required=True, help="GeoJSON (or .npz) file of the building footprints")
+    simulate.add_argument("--epw", required=True, help="EPW weather file")
+    simulate.add_argument("--archetype", required=True, choices=get_registry().regions, help="Archetype region")
+    simulate.add_argument("--out", required=True, help="Output folder")
+    simulate.add_argument("--workers", type=int, default=1, help="Number of worker processes, at most the number of CPUs; small districts run in a single process (default: 1)")
+    simulate.add_argument("--format", default="csv", choices=OUTPUT_FORMATS, help="Output format of the loads (default: csv)")
+    simulate.add_argument("--float32", action="store_true", help="Store the loads of the binary formats in single precision")
+    simulate.add_argument("--no-building-loads", action="store_true", help="Do not write the hourly loads of every building")
+    simulate.add_argument("--no-district-summary", action="store_true", help="Do not write the district aggregates")
+    simulate.add_argument("--azimuth-step", type=float, default=0.0,
+                          help="Faster approximation where façades whose orientation differs by less than this angle share the same solar irradiance [deg] (default: 0, exact)")
+    simulate.add_argument("--cache-size", type=int, default=0,
+                          help="Size limit of the result cache, which skips the buildings unchanged since a previous run [MB] (default: 0, no cache)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "simulate":
+        simulate_district(args.geojson, args.epw, args.archetype, args.out, workers=args.workers,
+                          azimuth_step=args.azimuth_step, cache_size=args.cache_size*1024**2,
+                          output_format=args.format, float32=args.float32,
+                          save_building_loads=not args.no_building_loads,
+                          save_district_summary=not args.no_district_summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+District aggregates of the hourly loads.
+
+`DistrictAggregator` is a sink for engine.simulate (like results.ResultWriter) that updates
+the district statistics with every batch of buildings as it completes: hourly district
+heating and cooling, peaks of each building and of the district, and load-duration curves.
+The per-building matrix never needs to be kept. Heating loads are positive and cooling
+loads negative in the simulation; here both are reported as positive demands.
+Nothing here depends on bpy.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from .engine import HOURS
+
+# Base name of the summary files
+SUMMARY_FILE = "District_Summary"
+
+
+class DistrictAggregator:
+    """
+    Incremental district statistics of the hourly loads.
+
+    Args:
+        names (list): Name of each building.
+        sink: Optional sink (e.g. results.ResultWriter) that also receives every batch.
+    """
+
+    def __init__(self, names, sink=None):
+        self.names = list(names)
+        self.sink = sink
+        n = len(self.names)
+        self.heating = np.zeros(HOURS)  # District heating demand of each hour [W]
+        self.cooling = np.zeros(HOURS)  # District cooling demand of each hour [W]
+        self.peak_heating = np.zeros(n)  # Peak heating demand of each building [W]
+        self.peak_cooling = np.zeros(n)  # Peak cooling demand of each building [W]
+        self.energy_heating = np.zeros(n)  # Annual heating demand of each building [Wh]
+        self.energy_cooling = np.zeros(n)  # Annual cooling demand of each building [Wh]
+        self.done = 0
+
+    def write(self, start, loads):
+        """ Add the hourly loads [W] of the buildings `start` to `start + len(loads)`. """
+        loads = np.asarray(loads)
+        heating = np.maximum(loads, 0)
+        cooling = np.maximum(-loads, 0)
+        stop = start+len(loads)
+
+        self.heating += heating.sum(axis=0)
+        self.cooling += cooling.sum(axis=0)
+        self.peak_heating[start:stop] = heating.max(axis=1, initial=0)
+        self.peak_cooling[start:stop] = cooling.max(axis=1, initial=0)
+        self.energy_heating[start:stop] = heating.sum(axis=1)
+        self.energy_cooling[start:stop] = cooling.sum(axis=1)
+        self.done += len(loads)
+
+        if self.sink is not None:
+            self.sink.write(start, loads)
+
+    def summary(self, count=None):
+        """
+        Return the district statistics.
+
+        Args:
+            count (int): Report only the first `count` buildings individually (e.g. the ones
+                         completed before a run was cancelled); default: all of them.
+
+        Returns:
+            dict: Number of buildings, district peaks [W] and their hour of the year (1-8760),
+                  annual demands [kWh], coincidence factors (district peak over the sum of
+                  the building peaks), and per-building peaks [W] and annual demands [kWh].
+        """
+        def coincidence(district_peak, building_peaks):
+            total = building_peaks.sum()
+            return float(district_peak / total) if total > 0 else None
+
+        return {
+            "buildings": self.done,
+            "peak_heating_W": float(self.heating.max()),
+            "peak_heating_hour": int(self.heating.argmax()) + 1,
+            "peak_cooling_W": float(self.cooling.max()),
+            "peak_cooling_hour": int(self.cooling.argmax()) + 1,
+            "annual_heating_kWh": float(self.heating.sum() / 1000),
+            "annual_cooling_kWh": float(self.cooling.sum() / 1000),
+            "coincidence_factor_heating": coincidence(self.heating.max(), self.peak_heating),
+            "coincidence_factor_cooling": coincidence(self.cooling.max(), self.peak_cooling),
+            "per_building": {
+                name: {"peak_heating_W": round(float(ph)), "peak_cooling_W": round(float(pc)),
+                       "annual_heating_kWh": round(float(eh) / 1000, 1), "annual_cooling_kWh": round(float(ec) / 1000, 1)}
+                for name, ph, pc, eh, ec in zip(self.names[:count], self.peak_heating, self.peak_cooling,
+                                               self.energy_heating, self.energy_cooling)
+            },
+        }
+
+    def hourly(self):
+        """
+        Return the hourly district demands and the load-duration curves (demands sorted in
+        decreasing order) as a DataFrame [W].
+        """
+        return pd.DataFrame({
+            "Hour of Year": np.arange(1, HOURS+1),
+            "Heating": self.heating,
+            "Cooling": self.cooling,
+            "Heating duration curve": np.sort(self.heating)[::-1],
+            "Cooling duration curve": np.sort(self.cooling)[::-1],
+        })
+
+    def save(self, out_dir, count=None):
+        """
+        Write the summary (JSON) and the hourly district demands and load-duration curves (CSV).
+
+        Args:
+            out_dir (str): Output folder.
+            count (int): Number of buildings reported individually, see `summary`.
+
+        Returns:
+            tuple: Paths of the summary file and of the hourly file.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        summary_file = os.path.join(out_dir, f"{SUMMARY_FILE}.json")
+        hourly_file = os.path.join(out_dir, f"{SUMMARY_FILE}_Hourly.csv")
+        with open(summary_file, 'w') as f:
+            json.dump(self.summary(count), f, indent=1)
+        self.hourly().round(1).to_csv(hourly_file, sep=';', index=False)
+        return summary_file, hourly_file
@@ -0,0 +1,121 @@
+"""
+Registry of the building archetypes of archetypes.json.
+
+The archetypes are parsed once and indexed by (usage, region, year band). The year
+bands of each region are stored as sorted arrays of boundary years, so the archetypes
+of a whole district are assigned with a single `numpy.searchsorted`.
+"""
+import json
+import os
+import numpy as np
+
+addon_dir = os.path.dirname(os.path.realpath(__file__))
+
+# Year bands of each region: last construction year of every band except the newest
+# one, and the band names used in the archetype names (<usage>_<band>_<region>)
+YEAR_BANDS = {
+    "DK": ([1850, 1930, 1950, 1960, 1972, 1978, 1998, 2006, 2010],
+           ["1850", "1851_1930", "1931_1950", "1951_1960", "1961_1972", "1973_1978",
+            "1979_1998", "1999_2006", "2007_2010", "2011"]),
+    "US_2A": ([1979, 2003], ["1980", "1980_2004", "2004"]),
+    "US_3C": ([1979, 2003], ["1980", "1980_2004", "2004"]),
+    "US_5A": ([1979, 2003], ["1980", "1980_2004", "2004"]),
+}
+
+# Building usages with archetypes
+USAGES = ["RES_1", "COM_1"]
+
+
+class ArchetypeRegistry:
+    """
+    Archetype constructions indexed by usage, region and year band.
+
+    Args:
+        archetype_data (dict): Content of archetypes.json.
+        year_bands (dict): Year bands of each region, see `YEAR_BANDS`.
+    """
+
+    def __init__(self, archetype_data, year_bands=YEAR_BANDS):
+        by_name = {archetype['name']: archetype['constructions'] for archetype in archetype_data['archetypes']}
+
+        self.year_bands = {}
+        self._constructions = {}
+        for region, (last_years, bands) in year_bands.items():
+            self.year_bands[region] = (np.asarray(last_years), list(bands))
+            for usage in USAGES:
+                self._constructions[(usage, region)] = [by_name.get(f"{usage}_{band}_{region}") for band in bands]
+
+    @property
+    def regions(self):
+        """Regions with archetypes (e.g. 'DK', 'US_2A', 'US_3C', 'US_5A')."""
+        return list(self.year_bands)
+
+    def band_indices(self, region, years):
+        """
+        Return the index of the year band of each construction year.
+
+        Args:
+            region (str): Archetype region (e.g. 'DK').
+            years (array-like): Construction years.
+
+        Returns:
+            numpy.ndarray: Index of the band of each year in `year_bands[region]`.
+        """
+        last_years, _ = self.year_bands[region]
+        return np.searchsorted(last_years, np.asarray(years), side='left')
+
+    def archetype_name(self, usage, region, year):
+        """Return the name of the archetype of a building (e.g. 'RES_1_1961_1972_DK')."""
+        _, bands = self.year_bands[region]
+        return f"{usage}_{bands[int(self.band_indices(region, year))]}_{region}"
+
+    def assign(self, usages, region, years):
+        """
+        Return the archetype constructions of a set of buildings.
+
+        Args:
+            usages (list): Usage of each building ('RES_1' or 'COM_1').
+            region (str): Archetype region, one of `regions`.
+            years (array-like): Construction year of each building.
+
+        Returns:
+            list: The constructions (dict) of each building, or None where no archetype matches.
+        """
+        if region not in self.year_bands:
+            print(f"Invalid country '{region}'. Must be one of {self.regions}.")
+            return [None]*len(usages)
+
+        indices = self.band_indices(region, years)
+        constructions = []
+        for usage, index in zip(usages, indices.tolist()):
+            table = self._constructions.get((usage, region))
+            if table is None:
+                print(f"Invalid building type '{usage}'. Must be one of {USAGES}.")
+                constructions.append(None)
+                continue
+            if table[index] is None:
+                print(f"Archetype '{usage}_{self.year_bands[region][1][index]}_{region}' not found!")
+            constructions.append(table[index])
+        return constructions
+
+    def lookup(self, usage, region, year):
+        """Return the archetype constructions of one building, or None if not found."""
+        return self.assign([usage], region, [year])[0]
+
+
+# Registries already loaded, by path of the JSON file
+_registries = {}
+
+
+def get_registry(file_path=None):
+    """
+    Return the archetype registry of a JSON file, parsing the file only the first time.
+
+    Args:
+        file_path (str): Path to the archetypes JSON file (default: archetypes.json of the add-on).
+    """
+    file_path = os.path.abspath(file_path or os.path.join(addon_dir, 'archetypes.json'))
+    if file_path not in _registries:
+        with open(file_path, 'r') as file:
+            _registries[file_path] = ArchetypeRegistry(json.load(file))
+    return _registries[file_path]
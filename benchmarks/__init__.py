@@ -0,0 +1,11 @@
+"""
+Benchmarks of the simulation pipeline.
+
+`city` generates synthetic districts, `reference` is a frozen copy of the original
+per-building simulation loop used to check faster engines for numerical equivalence, and
+`run` times every stage of the pipeline:
+
+    python -m arcade.benchmarks.run --epw weather.epw --sizes 10 1000 10000
+
+Importing these modules has no side effects (Blender's module loader imports them too).
+"""
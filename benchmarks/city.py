@@ -0,0 +1,97 @@
+"""
+Synthetic districts for the benchmarks.
+
+The footprints are rotated rectangles and L shapes on a regular grid of plots, with the
+properties of the enriched GeoJSON files of the add-on: 'building:levels', 'start_date',
+'building' and 'id'. Some footprints have no levels (flat faces in the importer) and some
+are too small to be simulated, as in real data.
+"""
+import json
+import math
+import numpy as np
+
+from ..footprints import EARTH_RADIUS
+
+# Usages of the synthetic buildings (OSM 'building' tags) and their frequency
+USES = ("residential", "apartments", "house", "office", "commercial", "yes")
+USE_WEIGHTS = (0.3, 0.25, 0.15, 0.1, 0.1, 0.1)
+
+# Side of the square plot of each building [m]
+PLOT_SIZE = 40.0
+
+
+def synthetic_city(n, seed=0, origin=(55.68, 12.57), no_levels=0.05):
+    """
+    Return a synthetic district as a GeoJSON FeatureCollection.
+
+    Args:
+        n (int): Number of footprints.
+        seed (int): Seed of the random generator (the same seed gives the same district).
+        origin (tuple): Latitude and longitude of the south-west corner of the district.
+        no_levels (float): Fraction of footprints without 'building:levels'.
+
+    Returns:
+        dict: The FeatureCollection.
+    """
+    rng = np.random.default_rng(seed)
+    columns = max(1, math.ceil(math.sqrt(n)))
+    lat0, lon0 = origin
+    meters_per_degree = EARTH_RADIUS*math.pi/180
+
+    widths = rng.uniform(6, 30, n)
+    depths = rng.uniform(6, 30, n)
+    angles = rng.uniform(0, math.pi, n)
+    l_shaped = rng.random(n) < 0.3
+    levels = rng.integers(1, 9, n)
+    years = np.clip(np.rint(rng.normal(1965, 30, n)), 1850, 2023).astype(int)
+    uses = rng.choice(USES, n, p=USE_WEIGHTS)
+    missing_levels = rng.random(n) < no_levels
+
+    features = []
+    for i in range(n):
+        w, d = widths[i]/2, depths[i]/2
+        if l_shaped[i]:
+            # Rectangle with a quarter cut out of one corner
+            corners = np.array([[-w, -d], [w, -d], [w, 0], [0, 0], [0, d], [-w, d]])
+        else:
+            corners = np.array([[-w, -d], [w, -d], [w, d], [-w, d]])
+        rotation = np.array([[math.cos(angles[i]), -math.sin(angles[i])], [math.sin(angles[i]), math.cos(angles[i])]])
+        centre = (np.array([i % columns, i // columns]) + 0.5)*PLOT_SIZE
+        xy = corners @ rotation.T + centre
+
+        lat = lat0 + xy[:, 1]/meters_per_degree
+        lon = lon0 + xy[:, 0]/(meters_per_degree*math.cos(math.radians(lat0)))
+        ring = np.column_stack([lon, lat]).round(7).tolist()
+
+        properties = {"building": str(uses[i]), "start_date": str(years[i]), "id": i+1}
+        if not missing_levels[i]:
+            properties["building:levels"] = str(levels[i])
+        features.append({
+            "type": "Feature",
+            "properties": properties,
+            "geometry": {"type": "Polygon", "coordinates": [ring + ring[:1]]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def to_overpass(city):
+    """
+    Return a district as an Overpass API response (ways and nodes), as parsed by
+    overpass.overpass_to_features.
+    """
+    elements = []
+    node_id = 1
+    for way_id, feature in enumerate(city["features"], start=1):
+        ring = feature["geometry"]["coordinates"][0][:-1]
+        nodes = list(range(node_id, node_id+len(ring)))
+        elements.append({"type": "way", "id": way_id, "nodes": nodes + nodes[:1],
+                         "tags": {key: value for key, value in feature["properties"].items() if key != "id"}})
+        elements.extend({"type": "node", "id": i, "lon": lon, "lat": lat} for i, (lon, lat) in zip(nodes, ring))
+        node_id += len(ring)
+    return {"elements": elements}
+
+
+def write_city(file_path, n, seed=0):
+    """ Write a synthetic district of `n` footprints to a GeoJSON file. """
+    with open(file_path, 'w') as f:
+        json.dump(synthetic_city(n, seed), f)
@@ -0,0 +1,170 @@
+"""
+Frozen reference of the original simulation loop of the add-on.
+
+`reference_loads` is the per-building calculation of the first release of the "Calculate
+Heating and Cooling Loads" operator, with Blender and file output removed: pvlib
+plane-of-array irradiance for every façade orientation, and one `np.linalg.solve` of the
+5R1C network (two when heating or cooling) for every hour. It is deliberately slow and
+must not be optimized: faster engines are checked against it for numerical equivalence.
+"""
+import math
+import numpy as np
+from pvlib import irradiance
+
+
+def reference_loads(horizontal_area, height, facade_areas, constructions_data, weather):
+    """
+    Calculate the hourly loads of one building with the original algorithm.
+
+    Args:
+        horizontal_area (float): Footprint area of the building [m2].
+        height (float): Height of the building [m].
+        facade_areas (dict): Vertical areas [m2] grouped by azimuth angle [deg].
+        constructions_data (dict): Archetype constructions of the building.
+        weather (dict): Weather data, as returned by weather.load_weather.
+
+    Returns:
+        numpy.ndarray: Hourly heating (+) and cooling (-) loads [W] (not rounded; the
+                       original output rounded them to W).
+    """
+    Text = np.asarray(weather["temp_air"], dtype=float)
+    solar_zenith = weather["solar_zenith"]
+    solar_azimuth = weather["solar_azimuth"]
+    ghi, dni, dhi = weather["ghi"], weather["dni"], weather["dhi"]
+
+    #Calculate number of floors, ensuring that the value is minimum = 1
+    num_floors = max(1, math.floor(height / 3))
+
+    #Calculate the horizontal area of the building, and then floor area and roof area
+    Aflo_tot=horizontal_area*num_floors
+    Aflo=horizontal_area
+    Aroo=horizontal_area
+
+    #Calculate total sum of vertical areas, and then area of walls (opaque) and windows
+    tot_vertical_area=sum(facade_areas.values())
+
+    Awal=tot_vertical_area*(1-constructions_data.get("window")["wwr"])
+    Awin=tot_vertical_area*(constructions_data.get("window")["wwr"])
+    Awal_list=[x * (1-constructions_data.get("window")["wwr"]) for x in list(facade_areas.values())]
+    Awin_list=[x * (constructions_data.get("window")["wwr"]) for x in list(facade_areas.values())]
+
+    #Calculate the total heat capacity of the building (1C) (windows are not involved - Eq. 66)
+    Cm_floor=constructions_data.get("floor")["k_m"]*Aflo_tot
+    Cm_roof=constructions_data.get("roof")["k_m"]*Aroo
+    Cm_walls=constructions_data.get("walls")["k_m"]*Awal
+    Cm_tot=Cm_floor+Cm_roof+Cm_walls
+
+    #Calculate the effective mass area Am - Eq. 65)
+    den_floor=constructions_data.get("floor")["k_m"]**2*Aflo_tot
+    den_roof=constructions_data.get("roof")["k_m"]**2*Aroo
+    den_walls=constructions_data.get("walls")["k_m"]**2*Awal
+    Am=Cm_tot**2/(den_floor+den_roof+den_walls)
+
+    #Calculate the volume of the building
+    vol=horizontal_area*height
+
+    #---------------Definition of constant parameters----------------------
+    b=0.5
+    h_sa=3.45 #W/m2K
+    h_ms=9.1 #W/m2K
+    ratSur=4.5
+    absCoe=0.6
+    surRes=0.04 #m2K/W
+    eps=0.9
+    ACH=0.15
+    shdFac=0.9
+
+    #--------------Calculation of heat transfer elements (5R) -----------------------
+    Atot=Aflo_tot*ratSur
+    Hven=1.225*1005*ACH*vol/3600
+    Uwin=constructions_data.get("window")["Uvalue"]
+    Hwin=Uwin*Awin
+    Uwal=constructions_data.get("walls")["Uvalue"]
+    Uflo=constructions_data.get("floor")["Uvalue"]
+    Uroo=constructions_data.get("roof")["Uvalue"]
+    Hem=1/(1/(Uwal*Awal+b*Uflo*Aflo+Uroo*Aroo)-1/(h_ms*Am))
+    Htr_ms=h_ms*Am
+    Htr_sa=h_sa*Atot
+
+    #---------CALCULATE SOLAR RADIATION ON SURFACES-----------
+    POA_irradiance_values = []
+    for azimuth_angle in facade_areas.keys():
+        POA_irradiance = irradiance.get_total_irradiance(surface_tilt=90, surface_azimuth=azimuth_angle,
+                                                         solar_zenith=solar_zenith, solar_azimuth=solar_azimuth,
+                                                         dni=dni, ghi=ghi, dhi=dhi)
+        POA_irradiance_values.append(np.asarray(POA_irradiance['poa_global'], dtype=float))
+
+    #---Calculate solar radiation through windows
+    multiplied_values_win = []
+    for win_value, poa_value in zip(Awin_list, POA_irradiance_values):
+        multiplied_values_win.append(win_value * poa_value*constructions_data.get("window")["g-factor"]*shdFac)
+    solRadWin_tot=sum(multiplied_values_win)
+
+    #---Calculate solar radiation through opaque constructions
+    multiplied_values_opa = []
+    for opa_value, poa_value in zip(Awal_list, POA_irradiance_values):
+        multiplied_values_opa.append(opa_value * poa_value*absCoe*Uwal*surRes)
+
+    multiplied_values_t_opa = []
+    for areaWal in Awal_list:
+        multiplied_values_t_opa.append(areaWal*Uwal*surRes*5*eps*11*0.5)
+
+    solRadOpa_walls = [a - b for a, b in zip(multiplied_values_opa, multiplied_values_t_opa)]
+    solRadOpa_walls_tot=sum(solRadOpa_walls)
+
+    #Calculate for the roof
+    POA_irradiance_roof = irradiance.get_total_irradiance(surface_tilt=0, surface_azimuth=0,
+                                                          solar_zenith=solar_zenith, solar_azimuth=solar_azimuth,
+                                                          dni=dni, ghi=ghi, dhi=dhi)
+    POA_global_roof=np.asarray(POA_irradiance_roof['poa_global'], dtype=float)
+    solRadOpa_roo_tot = POA_global_roof*Aroo*absCoe*Uroo*surRes - Aroo*Uroo*surRes*5*eps*11*1
+
+    #Calculate total solar radiation as sum of windows+opaque
+    solRadTot = solRadOpa_walls_tot + solRadOpa_roo_tot + solRadWin_tot
+
+    #------------INTERNAL GAINS---------------------------
+    gain = np.full(8760, 200.0)
+
+    #------------CALCULATIONS FOR HEAT INJECTIONS-------------------------------------
+    phi_air=gain*0.5
+    phi_sur=(1-Am/Atot-Hwin/(Atot*h_ms))*(0.5*gain+solRadTot)
+    phi_mas=(Am/Atot)*(0.5*gain+solRadTot)
+
+    #------------CALCULATION OF HEATING AND COOLING LOADS----------------------------
+    c=[]
+    Tm_ini=20
+    Ti_set_hea=20
+    Ti_set_coo=27
+
+    for h in range(0, 8760, 1):
+        A = np.array([[Hven+Htr_sa, -Htr_sa, 0], [Htr_sa, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
+        b = np.array([phi_air[h]+Hven*Text[h], -phi_sur[h]-Hwin*Text[h], -phi_mas[h]-Cm_tot/3600*Tm_ini-Hem*Text[h]])
+        x = np.linalg.solve(A, b)
+
+        if x[0]<Ti_set_hea:
+            #Heating condition
+            A = np.array([[1, Htr_sa, 0], [0, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
+            b = np.array([-Hven*Text[h]+Hven*Ti_set_hea+Htr_sa*Ti_set_hea-phi_air[h], -phi_sur[h]-Hwin*Text[h]-Ti_set_hea*Htr_sa, -phi_mas[h]-Cm_tot/3600*Tm_ini-Hem*Text[h]])
+            x = np.linalg.solve(A, b)
+            c.append(x[0])
+            Tm_ini=x[2]
+
+        elif x[0]>Ti_set_coo:
+            #Cooling condition
+            A = np.array([[1, Htr_sa, 0], [0, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
+            b = np.array([-Hven*Text[h]+Hven*Ti_set_coo+Htr_sa*Ti_set_coo-phi_air[h], -phi_sur[h]-Hwin*Text[h]-Ti_set_coo*Htr_sa, -phi_mas[h]-Cm_tot/3600*Tm_ini-Hem*Text[h]])
+            x = np.linalg.solve(A, b)
+            c.append(x[0])
+            Tm_ini=x[2]
+
+        else:
+            #No heating and cooling needed
+            c.append(0)
+            Tm_ini=x[2]
+
+    #Postprocess `c` to set cooling load to 0 when Text < Ti_set_coo - 20
+    for h in range(8760):
+        if Text[h] < (Ti_set_coo - 20) and c[h] < 0:
+            c[h] = 0
+
+    return np.array(c, dtype=float)
@@ -0,0 +1,202 @@
+"""
+Stage-by-stage timings of the simulation pipeline on synthetic districts.
+
+For every district size, the stages are timed separately:
+
+- weather: reading the EPW file and computing the solar position (no weather cache)
+- overpass: parsing an Overpass response into GeoJSON features (overpass_to_features)
+- import: reading the GeoJSON footprints and building the mesh arrays of the bulk importer
+- geometry: footprint areas and façade orientations (footprints.buildings_from_footprints)
+- archetype: matching the archetype of every building
+- solar: building parameters and solar gains, with an empty plane-of-array cache
+- solve: the hourly 5R1C solution (after a warm-up run, so JIT compilation is not counted)
+- output: streaming the loads to the output files and writing them
+
+The first buildings are also simulated with the frozen original loop (reference.py) and
+the largest difference of the hourly loads is reported; the exit status is 1 when it
+exceeds the tolerance.
+
+Example:
+    python -m arcade.benchmarks.run --epw weather.epw --sizes 10 1000 10000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+import numpy as np
+
+from .. import engine
+from ..archetypes import get_registry
+from ..kernels import resolve_backend
+from ..footprints import read_footprints, buildings_from_footprints, extrusion_arrays, open_rings
+from ..overpass import overpass_to_features
+from ..results import ResultWriter, resolve_format
+from ..weather import load_weather, PoaCache
+from .city import synthetic_city, to_overpass
+from .reference import reference_loads
+
+# Stages timed for every district size, in pipeline order
+STAGES = ("weather", "overpass", "import", "geometry", "archetype", "solar", "solve", "output")
+
+# Number of buildings simulated together, as engine.simulate
+BATCH_SIZE = 1024
+
+
+@contextmanager
+def timed(timings, stage):
+    """ Add the time spent in the block to `timings[stage]` [s]. """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def benchmark(n, epw_file, work_dir, archetype="DK", output_format="csv", backend="auto", azimuth_step=0.0, seed=0):
+    """
+    Time every stage of the pipeline on a synthetic district of `n` footprints.
+
+    Returns:
+        dict: Number of footprints and of simulated buildings, and the time of each stage [s].
+    """
+    timings = {}
+    city = synthetic_city(n, seed)
+    geojson_file = os.path.join(work_dir, f"city_{n}.geojson")
+    with open(geojson_file, 'w') as f:
+        json.dump(city, f)
+    overpass_response = to_overpass(city)
+    del city
+
+    with timed(timings, "weather"):
+        weather = load_weather(epw_file)
+
+    with timed(timings, "overpass"):
+        overpass_to_features(overpass_response)
+    del overpass_response
+
+    with timed(timings, "import"):
+        footprints = read_footprints(geojson_file)
+        xy, offsets = open_rings(footprints.project(), footprints.offsets)
+        extrusion_arrays(xy, offsets, np.full(len(footprints), 3.0))
+
+    with timed(timings, "geometry"):
+        buildings = buildings_from_footprints(footprints)
+
+    with timed(timings, "archetype"):
+        constructions = get_registry().assign(buildings["usages"], archetype, buildings["ages"])
+
+    # The loads are streamed to the output files batch by batch, as in the add-on
+    names = buildings["names"]
+    poa_cache = PoaCache(azimuth_step)
+    with timed(timings, "output"):
+        writer = ResultWriter(os.path.join(work_dir, f"out_{n}"), names, output_format)
+    parameters = []
+    for start in range(0, len(names), BATCH_SIZE):
+        stop = min(start+BATCH_SIZE, len(names))
+        with timed(timings, "solar"):
+            solar = np.zeros((stop-start, engine.HOURS))
+            for j, i in enumerate(range(start, stop)):
+                params = engine.building_parameters(buildings["horizontal_areas"][i], buildings["heights"][i],
+                                                    buildings["facade_areas"][i], constructions[i])
+                solar[j] = engine.solar_gains(params, buildings["facade_areas"][i], weather, poa_cache)
+                parameters.append(params)
+        with timed(timings, "solve"):
+            gain = np.full((stop-start, engine.HOURS), float(engine.INTERNAL_GAIN))
+            loads = engine.hourly_loads_batch(engine.stack_parameters(parameters[start:stop]), weather["temp_air"], gain, solar, backend)
+        with timed(timings, "output"):
+            writer.write(start, loads)
+    with timed(timings, "output"):
+        writer.finish([engine.parameter_row(params) for params in parameters])
+
+    return {"footprints": n, "buildings": len(names), "timings": timings}
+
+
+def read_footprints_from_city(city):
+    """ Return the footprints of a synthetic district, through a temporary GeoJSON file. """
+    with tempfile.TemporaryDirectory() as work_dir:
+        geojson_file = os.path.join(work_dir, "city.geojson")
+        with open(geojson_file, 'w') as f:
+            json.dump(city, f)
+        return read_footprints(geojson_file)
+
+
+def check_reference(epw_file, count=5, archetype="DK", backend="auto", seed=0):
+    """
+    Compare the engine with the frozen original loop on the first `count` buildings of a
+    synthetic district (with exact façade azimuths, as the original loop).
+
+    Returns:
+        dict: Number of buildings compared, largest absolute difference of the hourly loads [W],
+              and time per building of the engine and of the reference loop [s].
+    """
+    weather = load_weather(epw_file)
+    footprints = read_footprints_from_city(synthetic_city(max(count*2, 10), seed))
+    buildings = buildings_from_footprints(footprints)
+    inputs = [buildings[key][:count] for key in ("horizontal_areas", "heights", "facade_areas", "usages")]
+    constructions = get_registry().assign(inputs[3], archetype, buildings["ages"][:count])
+
+    start = time.perf_counter()
+    loads, _ = engine.simulate(*inputs, constructions, weather, backend=backend, poa_cache=PoaCache(0))
+    engine_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = np.array([reference_loads(area, height, facades, construction, weather)
+                          for area, height, facades, construction in zip(*inputs[:3], constructions)])
+    reference_time = time.perf_counter() - start
+
+    count = len(reference)
+    return {"buildings": count, "max_difference_W": float(np.abs(loads - reference).max()),
+            "engine_s_per_building": engine_time / count, "reference_s_per_building": reference_time / count}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m arcade.benchmarks.run", description="Time the stages of the simulation pipeline.")
+    parser.add_argument("--epw", required=True, help="EPW weather file")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="Numbers of footprints (default: 10 1000 10000)")
+    parser.add_argument("--archetype", default="DK", help="Archetype region (default: DK)")
+    parser.add_argument("--format", default="csv", help="Output format of the loads (default: csv)")
+    parser.add_argument("--backend", default="auto", help="Backend of the hourly solution: auto, numba or numpy")
+    parser.add_argument("--check", type=int, default=5, help="Number of buildings compared with the reference loop (0: no check)")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Largest accepted difference from the reference loop [W]")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    output_format = resolve_format(args.format)
+    backend = resolve_backend(args.backend)
+
+    # Warm-up: compile the kernels and load the archetypes before timing
+    with tempfile.TemporaryDirectory() as work_dir:
+        benchmark(2, args.epw, work_dir, args.archetype, output_format, backend)
+
+    results = {"backend": backend, "output_format": output_format, "sizes": []}
+    print(f"{'footprints':>10} {'buildings':>9} " + " ".join(f"{stage:>9}" for stage in STAGES) + f" {'total':>9}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            result = benchmark(n, args.epw, work_dir, args.archetype, output_format, backend)
+        timings = result["timings"]
+        print(f"{n:>10} {result['buildings']:>9} " + " ".join(f"{timings[stage]:>9.3f}" for stage in STAGES)
+              + f" {sum(timings.values()):>9.3f}")
+        results["sizes"].append(result)
+    print(f"Times in seconds ({backend} backend, {output_format} output)")
+
+    status = 0
+    if args.check:
+        check = check_reference(args.epw, args.check, args.archetype, backend)
+        results["reference"] = check
+        print(f"Reference loop: {check['buildings']} buildings, largest difference {check['max_difference_W']:.2e} W, "
+              f"{check['reference_s_per_building']:.2f} s per building (engine: {check['engine_s_per_building']:.4f} s)")
+        if check["max_difference_W"] > args.tolerance:
+            print(f"The engine differs from the reference loop by more than {args.tolerance} W")
+            status = 1
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Content-addressed cache of the simulation results of single buildings.
+
+Every building is keyed by a hash of all the inputs of its simulation: geometry-derived
+areas, archetype constructions, usage, weather file, solar and gain options and
+engine.ENGINE_VERSION. On a re-run, `simulate_cached` serves unchanged buildings from the
+cache and simulates only the others. Entries are .npz files in the cache folder; the
+least recently used ones are deleted when the folder grows over its size limit.
+Nothing here depends on bpy.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+
+from . import engine
+from .weather import POA_CACHE, weather_key
+
+# Default size limit of the cache folder (in bytes)
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+def building_key(horizontal_area, height, facade_areas, usage, constructions, weather, azimuth_step, schedule_gains):
+    """
+    Return the cache key of a building: a hash of every input of its simulation.
+
+    Args:
+        horizontal_area, height, facade_areas, usage, constructions: Inputs of the building,
+            see engine.simulate.
+        weather (dict): Weather data (identified by weather.weather_key).
+        azimuth_step (float): Azimuth quantization of the plane-of-array irradiance.
+        schedule_gains (bool): Whether the schedule-based internal gains are used.
+    """
+    inputs = {
+        "engine": engine.ENGINE_VERSION,
+        "weather": weather_key(weather),
+        "horizontal_area": float(horizontal_area),
+        "height": float(height),
+        "facades": sorted([float(azimuth), float(area)] for azimuth, area in facade_areas.items()),
+        "usage": usage,
+        "constructions": constructions,
+        "azimuth_step": float(azimuth_step),
+        "schedule_gains": bool(schedule_gains),
+    }
+    text = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(text.encode(), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of the hourly loads and parameters of single buildings.
+
+    Args:
+        cache_dir (str): Folder of the cache entries.
+        max_bytes (int): Size limit of the cache folder; the least recently used entries
+                         are evicted when it is exceeded.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        # Size of every entry, from the least to the most recently used (the modification
+        # time of the files keeps this order from one run to the next)
+        entries = []
+        for file_name in os.listdir(cache_dir):
+            if file_name.endswith(".npz"):
+                stat = os.stat(os.path.join(cache_dir, file_name))
+                entries.append((stat.st_mtime, file_name[:-4], stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.size = sum(self._entries.values())
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Return the cached hourly loads [W] and parameters (dict) of a building, or None.
+        """
+        if key not in self._entries:
+            return None
+        try:
+            with np.load(self.path(key)) as data:
+                loads = data["loads"]
+                params = json.loads(str(data["parameters"]))
+        except (OSError, ValueError, KeyError):
+            self._forget(key)
+            return None
+        # Mark the entry as recently used
+        os.utime(self.path(key))
+        self._entries.move_to_end(key)
+        return loads, params
+
+    def put(self, key, loads, params):
+        """ Store the hourly loads [W] and parameters (dict) of a building, then evict if needed. """
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, loads=np.asarray(loads, dtype=float),
+                     parameters=np.array(json.dumps({name: value.item() if isinstance(value, np.generic) else value
+                                                    for name, value in params.items()})))
+        os.replace(tmp_path, path)
+
+        if key in self._entries:
+            self.size -= self._entries.pop(key)
+        self._entries[key] = os.path.getsize(path)
+        self.size += self._entries[key]
+        self.evict()
+
+    def evict(self):
+        """ Delete the least recently used entries until the cache fits in `max_bytes`. """
+        while self.size > self.max_bytes and self._entries:
+            self._forget(next(iter(self._entries)))
+
+    def clear(self):
+        """ Delete all entries. """
+        for key in list(self._entries):
+            self._forget(key)
+
+    def _forget(self, key):
+        size = self._entries.pop(key)
+        self.size -= size
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+
+class _CachingSink:
+    # Sink of the simulation of the cache misses: stores every building in the cache and
+    # forwards its loads to the final sink at its index among all buildings
+    def __init__(self, cache, keys, indices, parameters, sink):
+        self.cache = cache
+        self.keys = keys
+        self.indices = indices
+        self.parameters = parameters
+        self.sink = sink
+
+    def write(self, start, loads):
+        for row, building_loads in enumerate(loads, start):
+            index = self.indices[row]
+            self.cache.put(self.keys[index], building_loads, self.parameters[row])
+            self.sink.write(index, building_loads[None])
+
+
+class _MatrixSink:
+    # Sink that fills a loads matrix in memory
+    def __init__(self, loads):
+        self.loads = loads
+
+    def write(self, start, loads):
+        self.loads[start:start+len(loads)] = loads
+
+
+def simulate_cached(horizontal_areas, heights, facade_areas, usages, constructions, weather, cache,
+                    simulate=engine.simulate, sink=None, schedule_gains=False, **kwargs):
+    """
+    Simulate a set of buildings, serving the unchanged ones from a result cache.
+
+    Args:
+        horizontal_areas, heights, facade_areas, usages, constructions, weather:
+            Same as engine.simulate.
+        cache (ResultCache): The result cache.
+        simulate: Function that simulates the missing buildings (engine.simulate or
+                  parallel.simulate_parallel); it must accept a `sink`.
+        sink: Optional sink of the loads of every building, see engine.simulate.
+        schedule_gains (bool): Use the schedule-based internal gains, see engine.simulate.
+        **kwargs: Other arguments of `simulate`.
+
+    Returns:
+        tuple: Loads array of shape (n_buildings, 8760) [W] (None with a `sink`), the list of
+               building parameters, and the number of buildings served from the cache.
+    """
+    n = len(horizontal_areas)
+    azimuth_step = kwargs.get("azimuth_step", None)
+    if azimuth_step is None:
+        azimuth_step = (kwargs.get("poa_cache") or POA_CACHE).azimuth_step
+    keys = [building_key(horizontal_areas[i], heights[i], facade_areas[i], usages[i], constructions[i],
+                         weather, azimuth_step, schedule_gains) for i in range(n)]
+
+    loads = np.zeros((n, engine.HOURS)) if sink is None else None
+    output = sink if sink is not None else _MatrixSink(loads)
+    parameters = [None]*n
+
+    # Buildings served from the cache
+    missing = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            missing.append(i)
+            continue
+        output.write(i, cached[0][None])
+        parameters[i] = cached[1]
+
+    # Buildings to simulate
+    if missing:
+        def pick(values):
+            return [values[i] for i in missing]
+        # Parameters of the missing buildings are needed to store them in the cache as they complete
+        missing_parameters = [engine.building_parameters(horizontal_areas[i], heights[i], facade_areas[i], constructions[i])
+                              for i in missing]
+        caching_sink = _CachingSink(cache, keys, missing, missing_parameters, output)
+        _, simulated = simulate(pick(horizontal_areas), pick(heights), pick(facade_areas), pick(usages),
+                                pick(constructions), weather, sink=caching_sink, schedule_gains=schedule_gains, **kwargs)
+        for i, params in zip(missing, simulated):
+            parameters[i] = params
+
+    return loads, parameters, n - len(missing)
+
@@ -0,0 +1,540 @@
+"""
+Headless 5R1C simulation engine.
+
+Nothing in this module depends on bpy: buildings are described by plain numbers
+(areas, height, archetype constructions) and the weather by plain arrays, so the
+physics can be run from worker processes, scripts and benchmarks as well as from
+the Blender operators.
+"""
+import math
+import numpy as np
+
+from .weather import POA_CACHE
+from .schedules import SCHEDULES
+from . import kernels
+
+# Number of simulated hours (one year)
+HOURS = 8760
+
+# Version of the model, part of the keys of the result cache (cache.py): increase it
+# whenever a change to the engine changes the simulated loads
+ENGINE_VERSION = 1
+
+#Adjustment factor for floor
+B_FLO = 0.5
+
+#Heat transfer coefficient between surface and air nodes
+H_SA = 3.45 #W/m2K
+
+#Heat trannsfer coefficient between mass and surface nodes
+H_MS = 9.1 #W/m2K
+
+#Ratio between internal surfaces and floor area (dimensionless)
+RAT_SUR = 4.5
+
+#Absorption coefficient for solar radiation (dimensionless)
+ABS_COE = 0.6
+
+#Heat resistance of external surfaces
+SUR_RES = 0.04 #m2K/W
+
+#Emissivity of external surfaces (dimensionless)
+EPS = 0.9
+
+#Air change rate (MAYBE TO BE MOVED INSIDE ARCHETYPES JSON FILE AS IT IS ARCHETYPE-SPECIFIC)
+ACH = 0.15
+
+#Shading factor
+SHD_FAC = 0.9
+
+#Constant internal gain used instead of the schedule-based gains (unless schedule_gains=True)
+INTERNAL_GAIN = 200 #W
+
+#Initial mass temperature and set-points for heating and cooling
+TM_INI = 20
+TI_SET_HEA = 20
+TI_SET_COO = 27
+
+# Labels of the values returned by `parameter_row`, in order
+PARAMETER_LABELS = ["Floor area [m2]",
+                    "Walls area [m2]",
+                    "Windows area [m2]",
+                    "Building heat capacity [J/K]",
+                    "U-value floor [W/m2K]",
+                    "U-value walls [W/m2K]",
+                    "U-value roof [W/m2K]",
+                    "U-value win [W/m2K]",
+                    "g-factor win [-]",
+                    "Hven [W/K]",
+                    "Hwin [W/K]",
+                    "Hem [W/K]",
+                    "Htr_ms [W/K]",
+                    "Htr_sa [W/K]",
+                    "Am [m2]"
+                    ]
+
+def building_parameters(horizontal_area, height, facade_areas, constructions):
+    """
+    Calculate areas, thermal capacity and heat transfer elements (5R1C) of a building.
+
+    Args:
+        horizontal_area (float): Footprint area of the building [m2].
+        height (float): Height of the building [m].
+        facade_areas (dict): Vertical areas [m2] grouped by azimuth angle [deg].
+        constructions (dict): Archetype constructions, as returned by archetypes.ArchetypeRegistry.lookup.
+
+    Returns:
+        dict: Building parameters (areas, U-values, Cm_tot, Am and the 5R elements).
+    """
+    #Calculate number of floors, ensuring that the value is minimum = 1
+    num_floors = max(1, math.floor(height / 3))
+
+    #Floor area and roof area
+    Aflo_tot = horizontal_area*num_floors
+    Aflo = horizontal_area
+    Aroo = horizontal_area
+
+    #Calculate total sum of vertical areas, and then area of walls (opaque) and windows
+    tot_vertical_area = sum(facade_areas.values())
+    wwr = constructions.get("window")["wwr"]
+    Awal = tot_vertical_area*(1-wwr)
+    Awin = tot_vertical_area*wwr
+
+    #Calculate the total heat capacity of the building (1C) (windows are not involved - Eq. 66)
+    Cm_floor = constructions.get("floor")["k_m"]*Aflo_tot
+    Cm_roof = constructions.get("roof")["k_m"]*Aroo
+    Cm_walls = constructions.get("walls")["k_m"]*Awal
+    Cm_tot = Cm_floor+Cm_roof+Cm_walls
+
+    #Calculate the effective mass area Am - Eq. 65)
+    den_floor = constructions.get("floor")["k_m"]**2*Aflo_tot
+    den_roof = constructions.get("roof")["k_m"]**2*Aroo
+    den_walls = constructions.get("walls")["k_m"]**2*Awal
+    Am = Cm_tot**2/(den_floor+den_roof+den_walls)
+
+    #Calculate the volume of the building
+    vol = horizontal_area*height
+
+    #--------------Calculation of heat transfer elements (5R) -----------------------
+
+    Atot = Aflo_tot*RAT_SUR
+
+    #Heat transfer element for ventilation (Eq. 21)
+    Hven = 1.225*1005*ACH*vol/3600
+
+    #Heat transfer element for windows (Eq. 17)
+    Uwin = constructions.get("window")["Uvalue"]
+    Hwin = Uwin*Awin
+
+    #Heat transfer element for opaque surfaces (Eq. 63)
+    Uwal = constructions.get("walls")["Uvalue"]
+    Uflo = constructions.get("floor")["Uvalue"]
+    Uroo = constructions.get("roof")["Uvalue"]
+    Hem = 1/(1/(Uwal*Awal+B_FLO*Uflo*Aflo+Uroo*Aroo)-1/(H_MS*Am))
+
+    #Heat transfer element between mass and surface node
+    Htr_ms = H_MS*Am
+
+    #Heat transfer element between surface and air node
+    Htr_sa = H_SA*Atot
+
+    return {
+        "Aflo_tot": Aflo_tot,
+        "Aroo": Aroo,
+        "Awal": Awal,
+        "Awin": Awin,
+        "Atot": Atot,
+        "wwr": wwr,
+        "Cm_tot": Cm_tot,
+        "Am": Am,
+        "Uflo": Uflo,
+        "Uwal": Uwal,
+        "Uroo": Uroo,
+        "Uwin": Uwin,
+        "g_factor": constructions.get("window")["g-factor"],
+        "Hven": Hven,
+        "Hwin": Hwin,
+        "Hem": Hem,
+        "Htr_ms": Htr_ms,
+        "Htr_sa": Htr_sa,
+    }
+
+
+def parameter_row(params):
+    """
+    Return the rounded building parameters in the order of `PARAMETER_LABELS`.
+    """
+    return [round(params["Aflo_tot"], 1),
+            round(params["Awal"], 1),
+            round(params["Awin"], 1),
+            round(params["Cm_tot"], 0),
+            round(params["Uflo"], 2),
+            round(params["Uwal"], 2),
+            round(params["Uroo"], 2),
+            round(params["Uwin"], 2),
+            round(params["g_factor"], 2),
+            round(params["Hven"], 2),
+            round(params["Hwin"], 2),
+            round(params["Hem"], 2),
+            round(params["Htr_ms"], 2),
+            round(params["Htr_sa"], 2),
+            round(params["Am"], 2)
+            ]
+
+
+def solar_gains(params, facade_areas, weather, poa_cache=None):
+    """
+    Calculate the hourly solar gains through windows and opaque constructions (walls and roof).
+
+    Args:
+        params (dict): Building parameters, as returned by `building_parameters`.
+        facade_areas (dict): Vertical areas [m2] grouped by azimuth angle [deg].
+        weather (dict): Weather data, as returned by `load_weather`.
+        poa_cache (PoaCache): Cache of plane-of-array irradiance (default: weather.POA_CACHE).
+
+    Returns:
+        numpy.ndarray: Hourly total solar gains [W].
+    """
+    poa_cache = poa_cache or POA_CACHE
+    wwr = params["wwr"]
+    Uwal = params["Uwal"]
+    Uroo = params["Uroo"]
+    Aroo = params["Aroo"]
+
+    solRadWin_tot = np.zeros(HOURS)
+    solRadOpa_walls_tot = np.zeros(HOURS)
+
+    #---Calculate solar radiation on vertical surfaces (windows and opaque walls)
+    for azimuth_angle, area in facade_areas.items():
+        POA_global = poa_cache.get(weather, 90, azimuth_angle)
+        areaWin = area*wwr
+        areaWal = area*(1-wwr)
+        solRadWin_tot += areaWin*POA_global*params["g_factor"]*SHD_FAC
+        solRadOpa_walls_tot += areaWal*POA_global*ABS_COE*Uwal*SUR_RES - areaWal*Uwal*SUR_RES*5*EPS*11*0.5
+
+    #---Calculate solar radiation on the roof
+    POA_global_roof = poa_cache.get(weather, 0, 0)
+    solRadOpa_roo_tot = POA_global_roof*Aroo*ABS_COE*Uroo*SUR_RES - Aroo*Uroo*SUR_RES*5*EPS*11*1
+
+    #Calculate total solar radiation as sum of windows+opaque
+    return solRadOpa_walls_tot + solRadOpa_roo_tot + solRadWin_tot
+
+
+def internal_gains(usage, floor_area, schedules=None):
+    """
+    Calculate the hourly internal gains from occupants, lighting and equipment.
+
+    Args:
+        usage (str): Building usage, either 'RES_1' or 'COM_1'.
+        floor_area (float): Total floor area of the building [m2].
+        schedules (ScheduleStore): Internal-gain profiles (default: schedules.SCHEDULES).
+
+    Returns:
+        numpy.ndarray: Hourly internal gains [W].
+    """
+    return (schedules or SCHEDULES).gain_per_m2(usage)*floor_area
+
+
+def system_coefficients(params):
+    """
+    Precompute the solution of the 5R1C network of one or more buildings.
+
+    The 3x3 matrices of the free-floating and of the heating/cooling systems only depend on
+    the building parameters, so they are inverted once here. Each hour then reduces to a few
+    multiply-adds on the right-hand side (see `hourly_loads` and `hourly_loads_batch`).
+
+    Args:
+        params (dict): Building parameters, either floats (`building_parameters`) or arrays
+                       of shape (n_buildings,) (`stack_parameters`).
+
+    Returns:
+        dict: Rows 0 and 2 of the inverse matrices ("ff" free-floating, "hc" heating/cooling),
+              the split factors of the heat injections and the coefficients multiplying the
+              mass temperature of the previous hour. Values have the same shape as `params`.
+    """
+    Hven = np.atleast_1d(np.asarray(params["Hven"], dtype=float))
+    Hwin = np.atleast_1d(np.asarray(params["Hwin"], dtype=float))
+    Hem = np.atleast_1d(np.asarray(params["Hem"], dtype=float))
+    Htr_ms = np.atleast_1d(np.asarray(params["Htr_ms"], dtype=float))
+    Htr_sa = np.atleast_1d(np.asarray(params["Htr_sa"], dtype=float))
+    Cm = np.atleast_1d(np.asarray(params["Cm_tot"], dtype=float))/3600
+
+    #Free-floating system: unknowns are air, surface and mass temperatures
+    A_ff = np.zeros((len(Hven), 3, 3))
+    A_ff[:, 0, 0] = Hven+Htr_sa
+    A_ff[:, 0, 1] = -Htr_sa
+    A_ff[:, 1, 0] = Htr_sa
+    A_ff[:, 1, 1] = -Hwin-Htr_sa-Htr_ms
+    A_ff[:, 1, 2] = Htr_ms
+    A_ff[:, 2, 1] = Htr_ms
+    A_ff[:, 2, 2] = -Hem-Htr_ms-Cm
+
+    #Heating/cooling system: unknowns are heating/cooling load, surface and mass temperatures
+    A_hc = A_ff.copy()
+    A_hc[:, 0, 0] = 1
+    A_hc[:, 0, 1] = Htr_sa
+    A_hc[:, 1, 0] = 0
+
+    inv_ff = np.linalg.inv(A_ff)
+    inv_hc = np.linalg.inv(A_hc)
+
+    coef = {
+        "ff0": inv_ff[:, 0, :].T,
+        "ff2": inv_ff[:, 2, :].T,
+        "hc0": inv_hc[:, 0, :].T,
+        "hc2": inv_hc[:, 2, :].T,
+        "fac_sur": 1-params["Am"]/params["Atot"]-params["Hwin"]/(params["Atot"]*H_MS),
+        "fac_mas": params["Am"]/params["Atot"],
+        #Coefficients of Tm_ini (which only appears in the third row of b, as -Cm*Tm_ini)
+        "k_Ti_ff": -inv_ff[:, 0, 2]*Cm,
+        "k_Tm_ff": -inv_ff[:, 2, 2]*Cm,
+        "k_phi_hc": -inv_hc[:, 0, 2]*Cm,
+        "k_Tm_hc": -inv_hc[:, 2, 2]*Cm,
+    }
+
+    if np.ndim(params["Hven"]) == 0:
+        coef = {key: (value[:, 0] if value.ndim == 2 else float(value[0])) if isinstance(value, np.ndarray) else value
+                for key, value in coef.items()}
+    return coef
+
+
+def _open_loop_terms(params, coef, Text, gain, solar):
+    """
+    Return the part of the hourly solution that does not depend on the mass temperature of
+    the previous hour: free-floating air and mass temperatures, and heating/cooling loads and
+    mass temperatures at the two set-points. Works on whole years or on single hours.
+    """
+    Hven = params["Hven"]
+    Hwin = params["Hwin"]
+    Hem = params["Hem"]
+    Htr_sa = params["Htr_sa"]
+
+    #------------CALCULATIONS FOR HEAT INJECTIONS-------------------------------------
+    phi_air = gain*0.5
+    phi_sur = coef["fac_sur"]*(0.5*gain+solar)
+    phi_mas = coef["fac_mas"]*(0.5*gain+solar)
+
+    #Right-hand side of the systems without the -Cm*Tm_ini term
+    b0 = phi_air+Hven*Text
+    b1 = -phi_sur-Hwin*Text
+    b2 = -phi_mas-Hem*Text
+
+    ff0, ff2, hc0, hc2 = coef["ff0"], coef["ff2"], coef["hc0"], coef["hc2"]
+    Ti_free = ff0[0]*b0+ff0[1]*b1+ff0[2]*b2
+    Tm_free = ff2[0]*b0+ff2[1]*b1+ff2[2]*b2
+
+    terms = [Ti_free, Tm_free]
+    for Ti_set in (TI_SET_HEA, TI_SET_COO):
+        b0_hc = -Hven*Text+Hven*Ti_set+Htr_sa*Ti_set-phi_air
+        b1_hc = -phi_sur-Hwin*Text-Ti_set*Htr_sa
+        terms.append(hc0[0]*b0_hc+hc0[1]*b1_hc+hc0[2]*b2)
+        terms.append(hc2[0]*b0_hc+hc2[1]*b1_hc+hc2[2]*b2)
+    return terms
+
+
+def hourly_loads(params, Text, gain, solar):
+    """
+    Solve the 5R1C network hour by hour and return the heating (+) and cooling (-) loads.
+
+    Args:
+        params (dict): Building parameters, as returned by `building_parameters`.
+        Text (numpy.ndarray): Hourly external air temperature [degC].
+        gain (numpy.ndarray): Hourly internal gains [W].
+        solar (numpy.ndarray): Hourly solar gains [W].
+
+    Returns:
+        numpy.ndarray: Hourly heating and cooling loads [W] (not rounded).
+    """
+    coef = system_coefficients(params)
+    Text = np.asarray(Text, dtype=float)
+
+    #The terms independent of Tm_ini are computed for the whole year at once
+    terms = _open_loop_terms(params, coef, Text, np.asarray(gain, dtype=float), np.asarray(solar, dtype=float))
+    Ti_free, Tm_free, phi_hea, Tm_hea, phi_coo, Tm_coo = [term.tolist() for term in terms]
+    k_Ti_ff = coef["k_Ti_ff"]
+    k_Tm_ff = coef["k_Tm_ff"]
+    k_phi_hc = coef["k_phi_hc"]
+    k_Tm_hc = coef["k_Tm_hc"]
+
+    #------------CALCULATION OF HEATING AND COOLING LOADS----------------------------
+    c = [0.0]*HOURS
+    Tm_ini = TM_INI
+
+    for h in range(HOURS):
+        Ti = Ti_free[h]+k_Ti_ff*Tm_ini
+
+        if Ti<TI_SET_HEA:
+            #Heating condition
+            c[h] = phi_hea[h]+k_phi_hc*Tm_ini
+            Tm_ini = Tm_hea[h]+k_Tm_hc*Tm_ini
+
+        elif Ti>TI_SET_COO:
+            #Cooling condition
+            c[h] = phi_coo[h]+k_phi_hc*Tm_ini
+            Tm_ini = Tm_coo[h]+k_Tm_hc*Tm_ini
+
+        else:
+            #No heating and cooling needed
+            Tm_ini = Tm_free[h]+k_Tm_ff*Tm_ini
+
+    c = np.array(c)
+
+    #Postprocess `c` to set cooling load to 0 when Text < Ti_set_coo - 20
+    c[(Text < (TI_SET_COO - 20)) & (c < 0)] = 0
+    return c
+
+
+def simulate_building(horizontal_area, height, facade_areas, usage, constructions, weather, poa_cache=None, schedule_gains=False):
+    """
+    Simulate one building and return its hourly loads and parameters.
+
+    Args:
+        horizontal_area (float): Footprint area of the building [m2].
+        height (float): Height of the building [m].
+        facade_areas (dict): Vertical areas [m2] grouped by azimuth angle [deg].
+        usage (str): Building usage, either 'RES_1' or 'COM_1'.
+        constructions (dict): Archetype constructions, as returned by archetypes.ArchetypeRegistry.lookup.
+        weather (dict): Weather data, as returned by `load_weather`.
+        poa_cache (PoaCache): Cache of plane-of-array irradiance (default: weather.POA_CACHE).
+        schedule_gains (bool): Use the schedule-based internal gains of the usage instead of
+                               the constant `INTERNAL_GAIN`.
+
+    Returns:
+        tuple: Hourly heating (+) and cooling (-) loads [W] and the building parameters (dict).
+    """
+    params = building_parameters(horizontal_area, height, facade_areas, constructions)
+    solar = solar_gains(params, facade_areas, weather, poa_cache)
+
+    if schedule_gains:
+        gain = internal_gains(usage, params["Aflo_tot"])
+    else:
+        gain = np.full(HOURS, float(INTERNAL_GAIN))
+
+    loads = hourly_loads(params, weather["temp_air"], gain, solar)
+    return loads, params
+
+
+def stack_parameters(parameters):
+    """
+    Turn a list of building parameters (dicts) into a dict of arrays of shape (n_buildings,).
+    """
+    return {key: np.array([params[key] for params in parameters], dtype=float) for key in parameters[0]}
+
+
+def hourly_loads_batch(params, Text, gain, solar, backend="auto"):
+    """
+    Solve the 5R1C network of several buildings at once, advancing all of them hour by hour.
+
+    Same model as `hourly_loads`, but the mass temperature, the free-floating air temperature
+    and the heating/cooling branch selection are arrays of shape (n_buildings,), so that the
+    cost of each hour is shared by the whole district. With the 'numba' backend the whole
+    recurrence runs in a single compiled call instead (see kernels.py).
+
+    Args:
+        params (dict): Building parameters as arrays of shape (n_buildings,), see `stack_parameters`.
+        Text (numpy.ndarray): Hourly external air temperature [degC], shape (8760,).
+        gain (numpy.ndarray): Hourly internal gains [W], shape (n_buildings, 8760).
+        solar (numpy.ndarray): Hourly solar gains [W], shape (n_buildings, 8760).
+        backend (str): 'auto', 'numba' or 'numpy', see kernels.resolve_backend.
+
+    Returns:
+        numpy.ndarray: Hourly heating (+) and cooling (-) loads [W], shape (n_buildings, 8760).
+    """
+    coef = system_coefficients(params)
+    Text = np.asarray(Text, dtype=float)
+
+    if kernels.resolve_backend(backend) == "numba":
+        return kernels.run_recurrence(kernels.pack_coefficients(params, coef), Text, gain, solar,
+                                      TM_INI, TI_SET_HEA, TI_SET_COO)
+
+    n = len(params["Hven"])
+
+    #Hour-major copies, so that the values of one hour are contiguous in memory
+    gain_h = np.ascontiguousarray(np.asarray(gain, dtype=float).T)
+    solar_h = np.ascontiguousarray(np.asarray(solar, dtype=float).T)
+
+    c = np.zeros((HOURS, n))
+    Tm_ini = np.full(n, float(TM_INI))
+
+    for h in range(HOURS):
+        Ti_free, Tm_free, phi_hea, Tm_hea, phi_coo, Tm_coo = _open_loop_terms(params, coef, Text[h], gain_h[h], solar_h[h])
+
+        Ti = Ti_free+coef["k_Ti_ff"]*Tm_ini
+        heating = Ti < TI_SET_HEA
+        cooling = Ti > TI_SET_COO
+
+        c[h] = np.where(heating, phi_hea+coef["k_phi_hc"]*Tm_ini,
+                        np.where(cooling, phi_coo+coef["k_phi_hc"]*Tm_ini, 0))
+        Tm_ini = np.where(heating, Tm_hea+coef["k_Tm_hc"]*Tm_ini,
+                          np.where(cooling, Tm_coo+coef["k_Tm_hc"]*Tm_ini, Tm_free+coef["k_Tm_ff"]*Tm_ini))
+
+    #Postprocess `c` to set cooling load to 0 when Text < Ti_set_coo - 20
+    c[(Text < (TI_SET_COO - 20))[:, None] & (c < 0)] = 0
+    return np.ascontiguousarray(c.T)
+
+
+def simulate(horizontal_areas, heights, facade_areas, usages, constructions, weather, mode="batch", batch_size=1024, backend="auto", poa_cache=None, schedule_gains=False, sink=None):
+    """
+    Simulate a set of buildings.
+
+    Args:
+        horizontal_areas (sequence): Footprint area of each building [m2].
+        heights (sequence): Height of each building [m].
+        facade_areas (list): Vertical areas grouped by azimuth (dict) for each building.
+        usages (list): Usage of each building ('RES_1' or 'COM_1').
+        constructions (list): Archetype constructions (dict) for each building.
+        weather (dict): Weather data, as returned by `load_weather`.
+        mode (str): 'batch' to advance `batch_size` buildings together hour by hour
+                    (`hourly_loads_batch`), 'serial' to simulate one building at a time.
+        batch_size (int): Maximum number of buildings simulated together in 'batch' mode.
+        backend (str): Backend of the hourly recurrence in 'batch' mode ('auto', 'numba' or
+                       'numpy'); kernels.resolve_backend tells which one runs.
+        poa_cache (PoaCache): Cache of plane-of-array irradiance (default: weather.POA_CACHE).
+        schedule_gains (bool): Use the schedule-based internal gains of each usage instead of
+                               the constant `INTERNAL_GAIN`.
+        sink: Object with a `write(start, loads)` method (e.g. results.ResultWriter) that
+              receives the loads of each batch (each building in 'serial' mode) as soon as
+              they are computed. The loads are then not kept in memory.
+
+    Returns:
+        tuple: Loads array of shape (n_buildings, 8760) [W] (None with a `sink`) and the list
+               of building parameters.
+    """
+    if mode not in ("batch", "serial"):
+        raise ValueError(f"Unknown simulation mode '{mode}'. Must be 'batch' or 'serial'.")
+    kernels.resolve_backend(backend)
+
+    n = len(horizontal_areas)
+    loads = np.zeros((n, HOURS)) if sink is None else None
+    parameters = []
+
+    if mode == "serial":
+        for i in range(n):
+            building_loads, params = simulate_building(horizontal_areas[i], heights[i], facade_areas[i], usages[i], constructions[i], weather, poa_cache, schedule_gains)
+            if sink is None:
+                loads[i] = building_loads
+            else:
+                sink.write(i, building_loads[None])
+            parameters.append(params)
+        return loads, parameters
+
+    for start in range(0, n, batch_size):
+        stop = min(start+batch_size, n)
+        solar = np.zeros((stop-start, HOURS))
+        for j, i in enumerate(range(start, stop)):
+            params = building_parameters(horizontal_areas[i], heights[i], facade_areas[i], constructions[i])
+            solar[j] = solar_gains(params, facade_areas[i], weather, poa_cache)
+            parameters.append(params)
+
+        batch_params = stack_parameters(parameters[start:stop])
+        if schedule_gains:
+            #One broadcast multiply of the per-m2 profiles of each usage by the floor areas
+            gain = SCHEDULES.gains(usages[start:stop], batch_params["Aflo_tot"])
+        else:
+            gain = np.full((stop-start, HOURS), float(INTERNAL_GAIN))
+        batch_loads = hourly_loads_batch(batch_params, weather["temp_air"], gain, solar, backend)
+        if sink is None:
+            loads[start:stop] = batch_loads
+        else:
+            sink.write(start, batch_loads)
+    return loads, parameters
@@ -0,0 +1,588 @@
+"""
+Building footprints and their analytic geometry.
+
+Footprints read from a GeoJSON file are kept as flat coordinate arrays plus ring
+offsets. Footprint area, façade areas and orientations, and volume are computed
+directly from the projected polygons (vectorized shoelace and edge-normal math), so
+buildings can be simulated without creating Blender meshes. Nothing here depends on bpy.
+"""
+import json
+import os
+from math import pi
+import numpy as np
+
+from .geometry import polygon_area_vectors, group_by_orientation
+
+# Earth radius and scale (in meters)
+EARTH_RADIUS = 6371000  # in meters
+
+# Height of one story (in meters)
+STORY_HEIGHT = 3
+
+# Footprints smaller than this are skipped by the importer (in m2)
+MIN_FOOTPRINT_AREA = 75
+
+# Version of the binary footprint format (.npz); version 1 files (no column encodings) are still read
+FOOTPRINT_FORMAT_VERSION = 2
+
+# Footprints of the last `save_footprints` call of this session, by absolute file path: (modification time, Footprints)
+SESSION_FOOTPRINTS = {}
+
+
+def latlon_to_xyz(lat, lon, origin_lat, origin_lon, scale=1):
+    """ Convert lat/lon to Blender 3D coordinates based on an origin point.
+    Treating the region as locally flat for small areas using basic projection.
+
+    Parameters:
+        lat, lon: The latitude and longitude of the point, or NumPy arrays of points
+                  (all points are then projected in one operation).
+        origin_lat, origin_lon: The origin latitude and longitude to center the map.
+        scale: Scaling factor to adjust the size of the projection in Blender.
+    """
+    # Calculate deltas from the origin (in meters)
+    lat_diff = (lat - origin_lat) * (pi / 180) * EARTH_RADIUS
+    lon_diff = (lon - origin_lon) * (pi / 180) * EARTH_RADIUS * np.cos(origin_lat * pi / 180)
+
+    # Return scaled x, y coordinates for Blender
+    return lon_diff * scale, lat_diff * scale
+
+
+def usage_class(use):
+    """ Map the OSM/BRAILS 'building' tag to the usage of the archetypes ('RES_1' or 'COM_1'). """
+    if use == "office" or use == "commercial":
+        return "COM_1"
+    return "RES_1"
+
+
+def construction_year(start_date):
+    """
+    Return the construction year of a 'start_date' property as an int, or None if it is
+    missing or not a plain year (e.g. "NA" or "~1930").
+    """
+    if isinstance(start_date, (int, float)) and not isinstance(start_date, bool):
+        return int(start_date) if float(start_date).is_integer() else None
+    text = str(start_date).strip()
+    return int(text) if text.isdigit() else None
+
+
+class Footprints:
+    """
+    Outer rings of building footprints as flat arrays.
+
+    Attributes:
+        coords (numpy.ndarray): Longitude and latitude of every ring point, shape (n_points, 2).
+        offsets (numpy.ndarray): Start of each ring in `coords`, plus the total number of
+                                 points, shape (n_buildings + 1,).
+        properties (list): GeoJSON properties (dict) of each building.
+        metadata (dict): Information on how the footprints were made (e.g. the enrichment
+                         seed), saved with them.
+    """
+
+    def __init__(self, coords, offsets, properties, metadata=None):
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.properties = list(properties)
+        self.metadata = dict(metadata or {})
+
+    def __len__(self):
+        return len(self.properties)
+
+    @classmethod
+    def from_features(cls, features):
+        """ Build the footprints from a list of GeoJSON features (outer ring of each polygon). """
+        rings = [feature['geometry']['coordinates'][0] for feature in features]
+        offsets = np.zeros(len(rings)+1, dtype=np.int64)
+        np.cumsum([len(ring) for ring in rings], out=offsets[1:])
+        coords = np.fromiter((value for ring in rings for point in ring for value in point[:2]),
+                             dtype=float, count=2*offsets[-1])
+        return cls(coords, offsets, [feature['properties'] for feature in features])
+
+    def select(self, mask):
+        """ Return the footprints where `mask` (boolean array, one item per building) is True. """
+        mask = np.asarray(mask, dtype=bool)
+        totals = np.diff(self.offsets)
+        offsets = np.concatenate([[0], np.cumsum(totals[mask])])
+        coords = self.coords[np.repeat(mask, totals)]
+        return Footprints(coords, offsets, [properties for properties, keep in zip(self.properties, mask) if keep], self.metadata)
+
+    def ring(self, index):
+        """ Return the longitude/latitude points of one footprint, shape (n_points, 2). """
+        return self.coords[self.offsets[index]:self.offsets[index+1]]
+
+    def origin(self):
+        """ Return the smallest latitude and longitude of all footprints (the importer origin). """
+        return float(self.coords[:, 1].min()), float(self.coords[:, 0].min())
+
+    def project(self, origin_lat=None, origin_lon=None):
+        """
+        Project all points to local x/y coordinates in meters (see `latlon_to_xyz`).
+
+        Args:
+            origin_lat, origin_lon: Origin of the projection (default: `origin()`).
+
+        Returns:
+            numpy.ndarray: Projected points, shape (n_points, 2).
+        """
+        if origin_lat is None or origin_lon is None:
+            origin_lat, origin_lon = self.origin()
+        x, y = latlon_to_xyz(self.coords[:, 1], self.coords[:, 0], origin_lat, origin_lon)
+        return np.column_stack([x, y])
+
+    def features(self):
+        """ Yield the footprints as GeoJSON polygon features. """
+        coords = self.coords.tolist()
+        for index, properties in enumerate(self.properties):
+            yield {
+                "type": "Feature",
+                "properties": properties,
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [coords[self.offsets[index]:self.offsets[index+1]]]
+                }
+            }
+
+    def save_geojson(self, file_path):
+        """ Write the footprints to a compact GeoJSON file. """
+        with open(file_path, 'w') as f:
+            json.dump({"type": "FeatureCollection", "metadata": self.metadata, "features": list(self.features())},
+                      f, separators=(',', ':'))
+
+    def save(self, file_path):
+        """
+        Write the footprints to a binary .npz file: the coordinate and offset arrays, plus one
+        array per property with a mask of the buildings that have it. Integer, float and string
+        properties are stored as such; columns with other or mixed types (e.g. None, booleans)
+        are stored JSON-encoded, so they load back with the same values as from GeoJSON.
+        """
+        columns = list(dict.fromkeys(key for properties in self.properties for key in properties))
+        encodings = []
+        arrays = {"version": np.array(FOOTPRINT_FORMAT_VERSION), "coords": self.coords,
+                  "offsets": self.offsets, "columns": np.array(columns, dtype=str),
+                  "metadata": np.array(json.dumps(self.metadata))}
+        for index, column in enumerate(columns):
+            present = np.array([column in properties for properties in self.properties])
+            values = [properties.get(column) for properties in self.properties]
+            kinds = {type(value) for value, has in zip(values, present) if has}
+            if kinds <= {int}:
+                encodings.append("int")
+                arrays[f"values_{index}"] = np.array([value if has else 0 for value, has in zip(values, present)], dtype=np.int64)
+            elif kinds <= {int, float}:
+                encodings.append("float")
+                arrays[f"values_{index}"] = np.array([value if has else 0 for value, has in zip(values, present)], dtype=float)
+            elif kinds <= {str}:
+                encodings.append("str")
+                arrays[f"values_{index}"] = np.array([value if has else "" for value, has in zip(values, present)], dtype=str)
+            else:
+                encodings.append("json")
+                arrays[f"values_{index}"] = np.array([json.dumps(value) if has else "" for value, has in zip(values, present)], dtype=str)
+            arrays[f"present_{index}"] = present
+        arrays["encodings"] = np.array(encodings, dtype=str)
+        with open(file_path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, file_path):
+        """ Read footprints written by `save`. """
+        with np.load(file_path) as data:
+            if int(data["version"]) not in (1, FOOTPRINT_FORMAT_VERSION):
+                raise ValueError(f"Unsupported footprint file version {int(data['version'])} in {file_path}")
+            properties = [{} for _ in range(len(data["offsets"])-1)]
+            columns = data["columns"].tolist()
+            encodings = data["encodings"].tolist() if "encodings" in data.files else [None]*len(columns)
+            for index, (column, encoding) in enumerate(zip(columns, encodings)):
+                values = data[f"values_{index}"].tolist()
+                for building, (value, has) in enumerate(zip(values, data[f"present_{index}"].tolist())):
+                    if has:
+                        properties[building][column] = json.loads(value) if encoding == "json" else value
+            metadata = json.loads(str(data["metadata"])) if "metadata" in data.files else {}
+            return cls(data["coords"], data["offsets"], properties, metadata)
+
+
+def load_geojson(file_path):
+    """ Read the building footprints of a GeoJSON file. """
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    footprints = Footprints.from_features(data['features'])
+    footprints.metadata = data.get('metadata', {})
+    return footprints
+
+
+def save_footprints(footprints, file_stem, formats=("npz",)):
+    """
+    Write footprints to disk and keep them in memory for the importer of this session.
+
+    Args:
+        footprints (Footprints): The building footprints.
+        file_stem (str): Path of the output files, without extension.
+        formats (tuple): File formats to write: "npz" (binary) and/or "geojson".
+
+    Returns:
+        dict: Path of the written file of each format, in the order of `formats`.
+    """
+    # Only the latest footprints are kept in memory
+    SESSION_FOOTPRINTS.clear()
+    paths = {}
+    for file_format in formats:
+        path = f"{file_stem}.{file_format}"
+        if file_format == "npz":
+            footprints.save(path)
+        elif file_format == "geojson":
+            footprints.save_geojson(path)
+        else:
+            raise ValueError(f"Unknown footprint format '{file_format}'")
+        SESSION_FOOTPRINTS[os.path.abspath(path)] = (os.path.getmtime(path), footprints)
+        paths[file_format] = path
+    return paths
+
+
+def read_footprints(file_path):
+    """
+    Read the building footprints of a .npz or GeoJSON file.
+
+    Footprints written by `save_footprints` in this session are returned from memory
+    without reading the file, unless the file has been modified since.
+    """
+    path = os.path.abspath(file_path)
+    if path in SESSION_FOOTPRINTS:
+        mtime, footprints = SESSION_FOOTPRINTS[path]
+        if os.path.exists(path) and os.path.getmtime(path) == mtime:
+            return footprints
+        # The file has changed since: forget the stale footprints
+        del SESSION_FOOTPRINTS[path]
+    if path.lower().endswith(".npz"):
+        return Footprints.load(path)
+    return load_geojson(path)
+
+
+def iter_features(file_path, read_size=1 << 20):
+    """
+    Read the features of a GeoJSON FeatureCollection one at a time.
+
+    The file is read in blocks of `read_size` characters and each feature is decoded
+    as soon as it is complete, so memory use depends on the size of one feature
+    instead of the size of the file.
+
+    Args:
+        file_path (str): Path to the GeoJSON file.
+        read_size (int): Number of characters read at a time.
+
+    Yields:
+        dict: The GeoJSON features, in file order.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as f:
+        buffer = ""
+        position = 0
+        in_features = False
+        end_of_file = False
+        while True:
+            if not in_features:
+                # Skip to the opening bracket of the "features" array
+                start = buffer.find('"features"')
+                bracket = buffer.find('[', start) if start >= 0 else -1
+                if bracket >= 0:
+                    position = bracket+1
+                    in_features = True
+                    continue
+            else:
+                # Skip separators, then decode the next feature if it is complete
+                while position < len(buffer) and buffer[position] in ", \t\r\n":
+                    position += 1
+                if position < len(buffer) and buffer[position] == ']':
+                    return
+                if position < len(buffer):
+                    try:
+                        feature, position = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if end_of_file:
+                            raise
+                    else:
+                        yield feature
+                        continue
+                buffer = buffer[position:]
+                position = 0
+
+            if end_of_file:
+                return
+            block = f.read(read_size)
+            end_of_file = not block
+            buffer += block
+
+
+def iter_footprints(file_path, chunk_size=1000):
+    """
+    Read the building footprints of a GeoJSON file in chunks (see `iter_features`).
+
+    Args:
+        file_path (str): Path to the GeoJSON file.
+        chunk_size (int): Number of buildings per chunk.
+
+    Yields:
+        Footprints: The footprints of at most `chunk_size` buildings.
+    """
+    features = []
+    for feature in iter_features(file_path):
+        features.append(feature)
+        if len(features) == chunk_size:
+            yield Footprints.from_features(features)
+            features = []
+    if features:
+        yield Footprints.from_features(features)
+
+
+def scan_geojson(file_path, chunk_size=1000):
+    """
+    Stream a GeoJSON file once to find its number of features and the projection origin.
+
+    Returns:
+        tuple: Number of features, and the smallest latitude and longitude of all footprints.
+    """
+    count = 0
+    min_lat, min_lon = float('inf'), float('inf')
+    for footprints in iter_footprints(file_path, chunk_size):
+        count += len(footprints)
+        if len(footprints.coords):
+            lat, lon = footprints.origin()
+            min_lat, min_lon = min(min_lat, lat), min(min_lon, lon)
+    return count, min_lat, min_lon
+
+
+def footprint_geometry(xy, offsets, heights, angle_tolerance=30):
+    """
+    Calculate the geometry of extruded footprints analytically.
+
+    Args:
+        xy (numpy.ndarray): Projected ring points, shape (n_points, 2). Rings may repeat their
+                            first point at the end, and may be clockwise or counter-clockwise.
+        offsets (numpy.ndarray): Start of each ring in `xy`, plus the total number of points.
+        heights (array-like): Height of each building [m].
+        angle_tolerance (float): Maximum difference in orientation to group façades [deg].
+
+    Returns:
+        dict: "area" (footprint area [m2]), "volume" [m3], and per edge "edge_area" [m2],
+              "edge_azimuth" (outward normal [deg], 0 = North, clockwise) and "edge_owner";
+              "facade_areas" is the list of façade areas grouped by orientation (dict) of each
+              building, as returned by `calculate_and_group_vertical_faces`.
+    """
+    xy = np.asarray(xy, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    heights = np.asarray(heights, dtype=float)
+    starts = offsets[:-1]
+    totals = np.diff(offsets)
+    n = len(starts)
+
+    # Shoelace formula: z component of the area vector of each ring (positive if counter-clockwise)
+    signed_area = polygon_area_vectors(np.column_stack([xy, np.zeros(len(xy))]), starts, totals)[:, 2]
+    area = np.abs(signed_area)
+
+    # Edges from each point to the next one of the same ring
+    owner = np.repeat(np.arange(n), totals)
+    following = np.arange(1, len(xy)+1)
+    following[starts+totals-1] = starts
+    edge = xy[following]-xy
+    length = np.hypot(edge[:, 0], edge[:, 1])
+
+    # Outward normal: right of the edge for counter-clockwise rings, left for clockwise ones
+    side = np.where(signed_area[owner] >= 0, 1.0, -1.0)
+    azimuth = np.degrees(np.arctan2(edge[:, 1]*side, -edge[:, 0]*side)) % 360
+
+    # Repeated points (e.g. the closing point of GeoJSON rings) give no façade
+    keep = length > 0
+    edge_owner = owner[keep]
+    edge_area = length[keep]*heights[edge_owner]
+    edge_azimuth = azimuth[keep]
+
+    boundaries = np.searchsorted(edge_owner, np.arange(1, n))
+    if n == 0:
+        return {"area": area, "volume": area, "edge_area": edge_area, "edge_azimuth": edge_azimuth,
+                "edge_owner": edge_owner, "facade_areas": []}
+    facade_areas = [group_by_orientation(azimuths, areas, angle_tolerance)
+                    for azimuths, areas in zip(np.split(edge_azimuth, boundaries), np.split(edge_area, boundaries))]
+
+    return {
+        "area": area,
+        "volume": area*heights,
+        "edge_area": edge_area,
+        "edge_azimuth": edge_azimuth,
+        "edge_owner": edge_owner,
+        "facade_areas": facade_areas,
+    }
+
+
+def buildings_from_footprints(footprints, min_area=MIN_FOOTPRINT_AREA, angle_tolerance=30):
+    """
+    Turn footprints into the building inputs of engine.simulate, without Blender meshes.
+
+    Footprints without a numeric 'building:levels' or 'start_date' (flat faces in the
+    importer) and footprints smaller than `min_area` are skipped, as in the GeoJSON
+    importer; the number of footprints skipped for their 'start_date' is printed.
+
+    Args:
+        footprints (Footprints): The building footprints.
+        min_area (float): Minimum footprint area [m2].
+        angle_tolerance (float): Maximum difference in orientation to group façades [deg].
+
+    Returns:
+        dict: Lists "names" (as the Blender objects, e.g. 'Building_12'), "horizontal_areas",
+              "heights", "facade_areas", "usages" and "ages", one item per building.
+    """
+    levels = [str(properties.get('building:levels', "NA")) for properties in footprints.properties]
+    heights = np.array([float(level)*STORY_HEIGHT if level.isdigit() else 0.0 for level in levels])
+    geometry = footprint_geometry(footprints.project(), footprints.offsets, heights, angle_tolerance)
+
+    buildings = {"names": [], "horizontal_areas": [], "heights": [], "facade_areas": [], "usages": [], "ages": []}
+    no_year = []
+    for index, properties in enumerate(footprints.properties):
+        if not levels[index].isdigit() or geometry["area"][index] < min_area:
+            continue
+        feature_id = str(properties.get('id', "NA")).replace('/', '_')
+        year = construction_year(properties.get('start_date', "NA"))
+        if year is None:
+            no_year.append(feature_id)
+            continue
+        buildings["names"].append(f"Building_{feature_id}")
+        buildings["horizontal_areas"].append(float(geometry["area"][index]))
+        buildings["heights"].append(float(heights[index]))
+        buildings["facade_areas"].append(geometry["facade_areas"][index])
+        buildings["usages"].append(usage_class(properties.get('building', "NA")))
+        buildings["ages"].append(year)
+    if no_year:
+        print(f"Skipping {len(no_year)} buildings without a numeric start_date (e.g. {', '.join(no_year[:5])})")
+    return buildings
+
+
+def open_rings(xy, offsets):
+    """
+    Drop the closing point of rings that repeat their first point (as GeoJSON rings do).
+
+    Returns:
+        tuple: Points and ring offsets of the open rings.
+    """
+    xy = np.asarray(xy)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    ends = offsets[1:]-1
+    closed = ends > starts
+    closed[closed] = np.all(xy[ends[closed]] == xy[starts[closed]], axis=1)
+    keep = np.ones(len(xy), dtype=bool)
+    keep[ends[closed]] = False
+    totals = np.diff(offsets)-closed
+    return xy[keep], np.concatenate([[0], np.cumsum(totals)])
+
+
+def counter_clockwise(xy, offsets):
+    """
+    Reverse the clockwise rings, so that every ring runs counter-clockwise.
+
+    The side faces of an extruded counter-clockwise ring (see `extrusion_arrays` and
+    functions.create_building) have outward normals, so the façade orientations of the
+    meshes match the ones of `footprint_geometry`.
+
+    Args:
+        xy (numpy.ndarray): Projected ring points, shape (n_points, 2).
+        offsets (numpy.ndarray): Start of each ring in `xy`, plus the total number of points.
+
+    Returns:
+        numpy.ndarray: The ring points, with the clockwise rings reversed.
+    """
+    xy = np.asarray(xy, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    totals = np.diff(offsets)
+    signed_area = polygon_area_vectors(np.column_stack([xy, np.zeros(len(xy))]), starts, totals)[:, 2]
+    owner = np.repeat(np.arange(len(starts)), totals)
+    index = np.arange(len(xy))
+    reversed_index = 2*starts[owner] + totals[owner] - 1 - index
+    return xy[np.where(signed_area[owner] < 0, reversed_index, index)]
+
+
+def extrusion_arrays(xy, offsets, heights):
+    """
+    Build the mesh arrays of many extruded footprints at once, in the layout of
+    Blender's mesh data (vertices, loops and polygons), ready for `foreach_set`.
+
+    Each ring of m points gives 2m vertices (base, then top), m quadrilateral side faces
+    and the bottom and top faces, as `create_building`; rings with a height of 0 give a
+    single flat face of m vertices, as `create_flat_face`. Clockwise rings are reversed
+    first (see `counter_clockwise`), so the side faces have outward normals.
+
+    Args:
+        xy (numpy.ndarray): Projected points of open rings, shape (n_points, 2).
+        offsets (numpy.ndarray): Start of each ring in `xy`, plus the total number of points.
+        heights (array-like): Height of each building [m] (0 for a flat face).
+
+    Returns:
+        dict: "co" (vertex coordinates, shape (n_vertices, 3)), "vertex_index" (vertex of each
+              loop), "loop_start" and "loop_total" (of each polygon), all relative to the mesh
+              of their building, and "vertex_offsets", "loop_offsets" and "polygon_offsets"
+              (shape (n_buildings + 1,)) to slice the arrays of each building.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    xy = counter_clockwise(xy, offsets)
+    heights = np.asarray(heights, dtype=float)
+    m = np.diff(offsets)
+    n = len(m)
+    solid = heights > 0
+
+    # Number of vertices, loops and polygons of each building
+    n_vertices = np.where(solid, 2*m, m)
+    n_loops = np.where(solid, 6*m, m)
+    n_polygons = np.where(solid, m+2, 1)
+    vertex_offsets = np.concatenate([[0], np.cumsum(n_vertices)])
+    loop_offsets = np.concatenate([[0], np.cumsum(n_loops)])
+    polygon_offsets = np.concatenate([[0], np.cumsum(n_polygons)])
+
+    # Index of each ring point in its ring, and whether its building is extruded
+    owner = np.repeat(np.arange(n), m)
+    local = np.arange(len(xy)) - offsets[owner]
+    point_solid = solid[owner]
+    point_m = m[owner]
+
+    # Vertices: base points, then the top points of the extruded buildings
+    co = np.zeros((vertex_offsets[-1], 3))
+    co[vertex_offsets[owner]+local, :2] = xy
+    top = vertex_offsets[owner][point_solid] + point_m[point_solid] + local[point_solid]
+    co[top, :2] = xy[point_solid]
+    co[top, 2] = heights[owner][point_solid]
+
+    vertex_index = np.empty(loop_offsets[-1], dtype=np.int32)
+    loop_start = np.empty(polygon_offsets[-1], dtype=np.int32)
+    loop_total = np.empty(polygon_offsets[-1], dtype=np.int32)
+
+    # Flat faces: one polygon through all points
+    flat = ~point_solid
+    vertex_index[loop_offsets[owner][flat]+local[flat]] = local[flat]
+    loop_start[polygon_offsets[:-1][~solid]] = 0
+    loop_total[polygon_offsets[:-1][~solid]] = m[~solid]
+
+    # Side faces [i, i+1, i+1+m, i+m], then the bottom and top faces
+    i = local[point_solid]
+    ms = point_m[point_solid]
+    first_loop = loop_offsets[owner][point_solid]
+    following = (i+1) % ms
+    sides = first_loop + 4*i
+    vertex_index[sides] = i
+    vertex_index[sides+1] = following
+    vertex_index[sides+2] = following+ms
+    vertex_index[sides+3] = i+ms
+    vertex_index[first_loop+4*ms+i] = i
+    vertex_index[first_loop+5*ms+i] = i+ms
+
+    first_polygon = polygon_offsets[owner][point_solid]
+    loop_start[first_polygon+i] = 4*i
+    loop_total[first_polygon+i] = 4
+    caps = polygon_offsets[:-1][solid] + m[solid]
+    loop_start[caps] = 4*m[solid]
+    loop_total[caps] = m[solid]
+    loop_start[caps+1] = 5*m[solid]
+    loop_total[caps+1] = m[solid]
+
+    return {
+        "co": co,
+        "vertex_index": vertex_index,
+        "loop_start": loop_start,
+        "loop_total": loop_total,
+        "vertex_offsets": vertex_offsets,
+        "loop_offsets": loop_offsets,
+        "polygon_offsets": polygon_offsets,
+    }
@@ -1,30 +1,12 @@
 import bpy
-import json
-import bmesh
-from math import pi, cos, degrees, atan2
 from mathutils import Vector
 import requests
 import pandas as pd
 import os
-
-# Earth radius and scale (in meters)
-EARTH_RADIUS = 6371000  # in meters
-
-def latlon_to_xyz(lat, lon, origin_lat, origin_lon, scale=1):
-    """ Convert lat/lon to Blender 3D coordinates based on an origin point.
-    Treating the region as locally flat for small areas using basic projection.
-
-    Parameters:
-        lat, lon: The latitude and longitude of the point.
-        origin_lat, origin_lon: The origin latitude and longitude to center the map.
-        scale: Scaling factor to adjust the size of the projection in Blender.
-    """
-    # Calculate deltas from the origin (in meters)
-    lat_diff = (lat - origin_lat) * (pi / 180) * EARTH_RADIUS
-    lon_diff = (lon - origin_lon) * (pi / 180) * EARTH_RADIUS * cos(origin_lat * pi / 180)
-
-    # Return scaled x, y coordinates for Blender
-    return lon_diff * scale, lat_diff * scale
+from .geometry import building_surfaces
+from .footprints import usage_class, counter_clockwise, extrusion_arrays, Footprints, save_footprints
+from .overpass import OverpassClient, overpass_to_features
+import numpy as np
 
 # Function to create a flat face (no height)
 def create_flat_face(vertices, name):
@@ -47,6 +29,9 @@ def create_flat_face(vertices, name):
 # Function to create a building mesh from a list of vertices and height (extruded)
 def create_building(vertices, height, name, year, use):
     """ Create a building mesh in Blender from a list of 2D vertices and a height. """
+    # Counter-clockwise footprint, so that the side faces have outward normals
+    vertices = counter_clockwise(vertices, [0, len(vertices)]).tolist()
+
     # Create 3D vertices with base height at 0
     base_verts = [Vector((v[0], v[1], 0)) for v in vertices]
     top_verts = [Vector((v[0], v[1], height)) for v in vertices]
@@ -78,18 +63,69 @@ def create_building(vertices, height, name, year, use):
     obj.my_properties.age = year
 
 
-    if use == "detached" or use =="terrace" or use == "house" or use =="residential" or use =="apartments" or use=="semidetached_house":
-        obj.my_properties.usage = "RES_1"
-    elif use == "office" or use =="commercial":
-        obj.my_properties.usage = "COM_1"
-    else:
-        obj.my_properties.usage = "RES_1"
+    obj.my_properties.usage = usage_class(use)
+
+
+# Function to create many building meshes at once
+def create_buildings(xy, offsets, heights, names, years, uses, collection=None):
+    """
+    Create the meshes of many buildings in Blender at once.
+
+    The vertex, loop and polygon arrays of all buildings are built in one vectorized pass
+    (see `footprints.extrusion_arrays`) and copied into each mesh with `foreach_set`. The
+    objects are linked to the collection and their properties set in one batch at the end,
+    and the view layer is updated once.
+
+    Parameters:
+        xy (numpy.ndarray): Projected points of the open footprint rings, shape (n_points, 2).
+        offsets (numpy.ndarray): Start of each ring in `xy`, plus the total number of points.
+        heights (array-like): Height of each building (0 creates a flat face, as `create_flat_face`).
+        names (list): Name of each object.
+        years (list): Construction year of each building (ignored for flat faces).
+        uses (list): OSM 'building' tag of each building (ignored for flat faces).
+        collection (bpy.types.Collection): Collection of the new objects (default: the active one).
+
+    Returns:
+        list: The new objects.
+    """
+    arrays = extrusion_arrays(xy, offsets, heights)
+    co = arrays["co"].astype(np.float32)
+    vertex_offsets = arrays["vertex_offsets"]
+    loop_offsets = arrays["loop_offsets"]
+    polygon_offsets = arrays["polygon_offsets"]
+    # loop_total is derived from loop_start since Blender 4.0
+    set_loop_total = bpy.app.version < (4, 0, 0)
+
+    objects = []
+    for index, name in enumerate(names):
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(vertex_offsets[index+1]-vertex_offsets[index])
+        mesh.vertices.foreach_set("co", co[vertex_offsets[index]:vertex_offsets[index+1]].ravel())
+        mesh.loops.add(loop_offsets[index+1]-loop_offsets[index])
+        mesh.loops.foreach_set("vertex_index", arrays["vertex_index"][loop_offsets[index]:loop_offsets[index+1]])
+        mesh.polygons.add(polygon_offsets[index+1]-polygon_offsets[index])
+        mesh.polygons.foreach_set("loop_start", arrays["loop_start"][polygon_offsets[index]:polygon_offsets[index+1]])
+        if set_loop_total:
+            mesh.polygons.foreach_set("loop_total", arrays["loop_total"][polygon_offsets[index]:polygon_offsets[index+1]])
+        mesh.update(calc_edges=True)
+        objects.append(bpy.data.objects.new(name, mesh))
+
+    # Link the objects and set their properties in one batch
+    collection = collection or bpy.context.collection
+    for obj, height, year, use in zip(objects, np.asarray(heights).tolist(), years, uses):
+        collection.objects.link(obj)
+        if height > 0:
+            obj.my_properties.age = year
+            obj.my_properties.usage = usage_class(use)
+
+    bpy.context.view_layer.update()
+    return objects
 
 
 # Function to calculate horizontal surface of buildings (floor and roof surface area - divided by 2 to get single surface)
 def calculate_horizontal_area(obj, threshold=0.01):
     """
-    Calculate the horizontal surface area of a mesh object in Blender.
+    Calculate the horizontal surface area of a mesh object in Blender (see `extract_geometry`).
 
     Parameters:
         obj (bpy.types.Object): The mesh object to calculate the area for.
@@ -97,36 +133,15 @@ def calculate_horizontal_area(obj, threshold=0.01):
                            (normal.z close to ±1).
 
     Returns:
-        float: The horizontal surface area in square meters.
+        float: Half of the horizontal surface area (floor + roof) in square meters.
     """
-    if obj.type != 'MESH':
-        print(f"{obj.name} is not a mesh object!")
-        return 0.0
-
-    bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
-
-    # Get the mesh data
-    mesh = obj.data
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-
-    horizontal_area = 0.0
-    threshold = 0.01
-
-    # Loop through all faces in the mesh
-    for face in bm.faces:
-        # Get the face normal
-        normal = face.normal.normalized()
-        # Check if the face is horizontal
-        if abs(normal.z) >= (1 - threshold):  # Nearly horizontal
-            horizontal_area += face.calc_area()/2
-    return horizontal_area
-
+    return extract_geometry([obj], threshold)[0][0]
 
 
 def calculate_and_group_vertical_faces(obj, threshold=0.01, angle_tolerance=30):
     """
-    Calculate and group vertical faces of a mesh object in Blender by similar rotation angles.
+    Calculate and group vertical faces of a mesh object in Blender by similar rotation angles
+    (see `extract_geometry`).
 
     Parameters:
         obj (bpy.types.Object): The mesh object to calculate the areas for.
@@ -138,152 +153,69 @@ def calculate_and_group_vertical_faces(obj, threshold=0.01, angle_tolerance=30):
         dict: A dictionary where keys are the rounded rotation angles (group centers) and
               values are the total area of faces in that group.
     """
-    if obj.type != 'MESH':
-        print(f"{obj.name} is not a mesh object!")
-        return {}
-    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
-    # Get the mesh data
-    mesh = obj.data
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-
-    vertical_faces = []
-
-    # Z-axis for vertical comparison
-    z_axis = Vector((0, 0, 1))
-
-    # Loop through all faces in the mesh
-    for face in bm.faces:
-        # Get the face normal
-        normal = face.normal.normalized()
-
-        # Check if the face is vertical (normal.z is close to 0)
-        if abs(normal.z) <= threshold:  # Nearly vertical
-            # Calculate area
-            area = face.calc_area()
-
-            # Calculate orientation (rotation angle in degrees around Z-axis)
-            horizontal_projection = Vector((normal.x, normal.y))
-            angle = degrees(atan2(horizontal_projection.x, horizontal_projection.y))
-
-            # Normalize angle to range [0, 360)
-            angle = angle % 360
-
-            # Add face information to the list
-            vertical_faces.append({
-                "area": area,
-                "orientation": angle
-            })
-
-    bm.free()
-
-    # Group faces by similar angles (within angle_tolerance)
-    grouped_faces = {}
-    for face_info in vertical_faces:
-        area = face_info["area"]
-        angle = face_info["orientation"]
-
-        # Find the closest group center or create a new group
-        group_found = False
-        for group_angle in grouped_faces:
-            if abs(group_angle - angle) <= angle_tolerance:
-                grouped_faces[group_angle] += area
-                group_found = True
-                break
-
-        if not group_found:
-            grouped_faces[angle] = area
-
-    rounded_grouped_faces = {round(k, 1): round(v, 1) for k, v in grouped_faces.items()}
-    return rounded_grouped_faces
-
-#Function to process archetypes
-def process_archetype(cube, archetype_data, archetype_country):
-    """
-    Determines the archetype name based on the cube's properties, the input country,
-    and returns relevant construction details (U-values, k_m, g-factor, wwr).
+    return extract_geometry([obj], threshold, angle_tolerance)[1][0]
 
-    Args:
-        cube: The selected Blender object with `my_properties.usage` and `my_properties.age`.
-        archetype_data: Loaded JSON data containing archetype information.
-        country (str): The country for the archetype (e.g., 'DK', 'US_2A', 'US_3C', 'US_5A').
 
-    Returns:
-        dict: The matching archetype's constructions, or None if not found.
+def extract_geometry(objects, threshold=0.01, angle_tolerance=30):
     """
-    # Extract building properties from the cube
-    building_type = cube.my_properties.usage  # Either 'RES_1' or 'COM_1'
-    year = cube.my_properties.age             # Building construction year
-
-    # Validate building_type
-    if building_type not in ["RES_1", "COM_1"]:
-        print(f"Invalid building type '{building_type}'. Must be 'RES_1' or 'COM_1'.")
-        return None
-
-    # Validate country
-    if archetype_country not in ["DK", "US_2A", "US_3C", "US_5A"]:
-        print(f"Invalid country '{archetype_country}'. Must be one of ['DK', 'US_2A', 'US_3C', 'US_5A'].")
-        return None
-
-    # Determine the year range based on the country
-    if archetype_country == "DK":
-        if year < 1850:
-            year_range = "1850"
-        elif 1851 <= year <= 1930:
-            year_range = "1851_1930"
-        elif 1931 <= year <= 1950:
-            year_range = "1931_1950"
-        elif 1951 <= year <= 1960:
-            year_range = "1951_1960"
-        elif 1961 <= year <= 1972:
-            year_range = "1961_1972"
-        elif 1973 <= year <= 1978:
-            year_range = "1973_1978"
-        elif 1979 <= year <= 1998:
-            year_range = "1979_1998"
-        elif 1999 <= year <= 2006:
-            year_range = "1999_2006"
-        elif 2007 <= year <= 2010:
-            year_range = "2007_2010"
-        else:
-            year_range = "2011"
-    elif archetype_country in ["US_2A", "US_3C", "US_5A"]:  # US Regions
-        if year < 1980:
-            year_range = "1980"
-        elif 1980 <= year < 2004:
-            year_range = "1980_2004"
-        else:
-            year_range = "2004"
-    else:
-        print(f"Country '{archetype_country}' not supported.")
-        return None
-
-    # Construct the archetype name
-    archetype_name = f"{building_type}_{year_range}_{archetype_country}"
-
-    # Find the matching archetype
-    selected_archetype = None
-    for archetype in archetype_data['archetypes']:
-        if archetype['name'] == archetype_name:
-            selected_archetype = archetype
-            break
-
-    # Handle missing archetypes
-    if not selected_archetype:
-        print(f"Archetype '{archetype_name}' not found!")
-        return None  # Stop processing if no matching archetype is found
-
-    # Return the constructions from the selected archetype
-    return selected_archetype['constructions']
+    Calculate the horizontal area and the grouped vertical areas of many mesh objects at once.
 
+    Vertex coordinates and polygon loops are read in bulk with `foreach_get`, transformed
+    with each object's world matrix in memory (the meshes are not modified, no operator is
+    called) and processed in one vectorized pass by `geometry.building_surfaces`.
 
+    Parameters:
+        objects (list): The objects to calculate the areas for.
+        threshold (float): Tolerance for determining if a face is horizontal or vertical.
+        angle_tolerance (float): Maximum difference in rotation angles (degrees) to group faces.
 
-# Function to fetch buildings GeoJSON
-import requests
-import json
-import numpy as np
+    Returns:
+        tuple: Horizontal area of each object (as `calculate_horizontal_area`) and the grouped
+               vertical areas (dict) of each object (as `calculate_and_group_vertical_faces`).
+               Non-mesh objects get 0.0 and {}.
+    """
+    coords = []
+    loop_starts = []
+    loop_totals = []
+    owners = []
+    offset = 0
+
+    for index, obj in enumerate(objects):
+        if obj.type != 'MESH':
+            print(f"{obj.name} is not a mesh object!")
+            continue
+        mesh = obj.data
+
+        co = np.empty(len(mesh.vertices)*3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        vertex_index = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", vertex_index)
+        starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", starts)
+        totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", totals)
+
+        # Apply the world matrix in memory
+        matrix = np.array(obj.matrix_world, dtype=float)
+        world = co.reshape(-1, 3).astype(float) @ matrix[:3, :3].T + matrix[:3, 3]
+
+        coords.append(world[vertex_index])
+        loop_starts.append(starts.astype(np.int64)+offset)
+        loop_totals.append(totals)
+        owners.append(np.full(len(starts), index))
+        offset += len(vertex_index)
+
+    if not coords:
+        return [0.0]*len(objects), [{} for _ in objects]
+
+    horizontal_areas, facade_areas = building_surfaces(np.concatenate(coords), np.concatenate(loop_starts),
+                                                       np.concatenate(loop_totals), np.concatenate(owners),
+                                                       len(objects), threshold, angle_tolerance)
+    return horizontal_areas.tolist(), facade_areas
 
-def fetch_buildings_geojson(bbox, output_folder, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev):
+# Function to fetch buildings GeoJSON
+def fetch_buildings_geojson(bbox, output_folder, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev,
+                            tile_size=None, endpoint=None, cache_dir=None, workers=4, formats=("geojson",), seed=None):
     """
     Fetch buildings within a specified bounding box from Overpass API, enrich with probabilistic properties,
     and save as GeoJSON.
@@ -295,106 +227,91 @@ def fetch_buildings_geojson(bbox, output_folder, start_date_mean, start_date_std
         start_date_std_dev (int): Standard deviation for start_date normal distribution.
         levels_mean (float): Mean levels for building:levels normal distribution.
         levels_std_dev (float): Standard deviation for building:levels normal distribution.
+        tile_size (float): Split the bounding box into tiles of this size in degrees, fetched
+                           concurrently (0 or None: a single query).
+        endpoint (str): URL of the Overpass interpreter (default: overpass.DEFAULT_ENDPOINT).
+        cache_dir (str): Folder of the on-disk cache of the Overpass responses (None: no cache).
+        workers (int): Maximum number of concurrent requests.
+        formats (tuple): Output formats, "npz" (binary footprint file) and/or "geojson"
+                         (see `footprints.save_footprints`).
+        seed (int): Seed of the enrichment (None: a new random seed). The seed used is
+                    recorded in the metadata of the output file.
 
     Returns:
-        str: Result message indicating success or error.
+        tuple: Result message indicating success or error, and the path of the written file
+               of each format (dict, empty on error).
     """
-    # Overpass API endpoint
-    overpass_url = "https://overpass-api.de/api/interpreter"
-
-    # Overpass query
-    query = f"""
-    [out:json][timeout:25];
-    (
-      way["building"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
-      relation["building"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
-    );
-    out body;
-    >;
-    out skel qt;
-    """
-
     try:
         print("Sending request to Overpass API...")
-        response = requests.get(overpass_url, params={"data": query})
-
-        if response.status_code == 200:
-            print("Response received. Parsing data...")
-            data = response.json()
-
-            # Convert Overpass JSON to GeoJSON
-            geojson = {
-                "type": "FeatureCollection",
-                "features": []
-            }
-
-            # Parse nodes and ways to construct polygons
-            nodes = {node["id"]: (node["lon"], node["lat"]) for node in data.get("elements", []) if node["type"] == "node"}
-            feature_id = 1  # Initialize a counter for the sequential ID
-
-            for element in data.get("elements", []):
-                if element["type"] == "way" and "nodes" in element:
-                    coordinates = [nodes[node_id] for node_id in element["nodes"] if node_id in nodes]
-                    if len(coordinates) > 2:  # Ensure it forms a polygon
-                        feature = {
-                            "type": "Feature",
-                            "properties": {
-                                **element.get("tags", {}),
-                                "id": feature_id  # Use sequential ID
-                            },
-                            "geometry": {
-                                "type": "Polygon",
-                                "coordinates": [coordinates]
-                            }
-                        }
-                        geojson["features"].append(feature)
-                        feature_id += 1  # Increment the counter for the next feature
-
-            # Enrich missing properties
-            enrich_features(geojson["features"], start_date_mean, start_date_std_dev, levels_mean, levels_std_dev)
-
-            # Save the enriched GeoJSON to file
-            output_file = f"{output_folder}/enriched_buildings.geojson"
-            with open(output_file, "w") as f:
-                json.dump(geojson, f, indent=4)
-
-            return f"Enriched GeoJSON data saved to {output_file}"
-        else:
-            return f"Error: Unable to fetch data. HTTP Status code: {response.status_code}"
+        with OverpassClient(endpoint, cache_dir=cache_dir, workers=workers) as client:
+            data = client.fetch(bbox, tile_size)
+
+        print("Response received. Parsing data...")
+
+        # Convert Overpass JSON to GeoJSON features
+        features = overpass_to_features(data)
+
+        # Enrich missing properties
+        seed = enrich_features(features, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev, seed)
+        print(f"Missing properties enriched with seed {seed}")
 
+        # Save the enriched footprints to file(s), with the enrichment settings
+        footprints = Footprints.from_features(features)
+        footprints.metadata = {"enrichment": {"seed": seed, "start_date_mean": start_date_mean,
+                                              "start_date_std_dev": start_date_std_dev,
+                                              "levels_mean": levels_mean, "levels_std_dev": levels_std_dev}}
+        output_files = save_footprints(footprints, f"{output_folder}/enriched_buildings", formats)
+
+        return f"Enriched footprint data saved to {', '.join(output_files.values())}", output_files
+
+    except requests.HTTPError as e:
+        return f"Error: Unable to fetch data. HTTP Status code: {e.response.status_code}", {}
     except Exception as e:
-        return f"Error occurred: {str(e)}"
+        return f"Error occurred: {str(e)}", {}
 
 
-def enrich_features(features, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev):
+def enrich_features(features, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev, seed=None):
     """
     Enrich features by assigning missing start_date and building:levels properties.
 
+    The features missing each property are found with a mask and all their values are
+    drawn at once from a seeded `numpy.random.Generator`, so that the same seed always
+    gives the same district.
+
     Args:
         features (list): List of GeoJSON features.
         start_date_mean (int): Mean year for start_date normal distribution.
         start_date_std_dev (int): Standard deviation for start_date normal distribution.
         levels_mean (float): Mean levels for building:levels normal distribution.
         levels_std_dev (float): Standard deviation for building:levels normal distribution.
+        seed (int): Seed of the random generator (None: a new random seed).
+
+    Returns:
+        int: The seed used.
     """
-    for feature in features:
-        # Assign missing start_date
-        if "start_date" not in feature["properties"] or not feature["properties"]["start_date"]:
-            start_date = int(np.random.normal(start_date_mean, start_date_std_dev))
-            if start_date < 1850:
-                start_date = 1850
-            elif start_date > 2024:
-                start_date = 2024
-            feature["properties"]["start_date"] = str(start_date)
-
-        # Assign missing building:levels
-        if "building:levels" not in feature["properties"] or not feature["properties"]["building:levels"]:
-            levels = max(1, round(np.random.normal(levels_mean, levels_std_dev)))  # Ensure at least 1 level
-            feature["properties"]["building:levels"] = str(levels)
-
-        # Ensure the "building" key is set appropriately
-        if "building" not in feature["properties"] or feature["properties"]["building"] == "yes":
-            feature["properties"]["building"] = "residential"
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0] & 0x7FFFFFFF)
+    rng = np.random.default_rng(seed)
+    properties = [feature["properties"] for feature in features]
+
+    # Assign missing start_date
+    missing = np.flatnonzero([not p.get("start_date") for p in properties])
+    start_dates = np.clip(rng.normal(start_date_mean, start_date_std_dev, len(missing)).astype(int), 1850, 2024)
+    for index, start_date in zip(missing.tolist(), start_dates.tolist()):
+        properties[index]["start_date"] = str(start_date)
+
+    # Assign missing building:levels
+    missing = np.flatnonzero([not p.get("building:levels") for p in properties])
+    levels = np.maximum(1, np.rint(rng.normal(levels_mean, levels_std_dev, len(missing)))).astype(int)  # Ensure at least 1 level
+    for index, level in zip(missing.tolist(), levels.tolist()):
+        properties[index]["building:levels"] = str(level)
+
+    # Ensure the "building" key is set appropriately
+    for p in properties:
+        if "building" not in p or p["building"] == "yes":
+            p["building"] = "residential"
+
+    return seed
 
 
 def get_csv_column(file_path, column_name):
@@ -0,0 +1,121 @@
+"""
+Vectorized surface geometry of building polygons.
+
+These functions do not depend on bpy: polygons are described by a flat buffer of loop
+coordinates plus the start and length of each polygon in the buffer (the layout of
+Blender's mesh loops), so the faces of many buildings are processed in one pass.
+"""
+import numpy as np
+
+
+def polygon_area_vectors(coords, loop_starts, loop_totals):
+    """
+    Calculate the area vector (unit normal times area) of a set of polygons.
+
+    Args:
+        coords (numpy.ndarray): Coordinates of the polygon corners, shape (n_loops, 3),
+                                polygon after polygon.
+        loop_starts (numpy.ndarray): Index in `coords` of the first corner of each polygon
+                                     (increasing).
+        loop_totals (numpy.ndarray): Number of corners of each polygon.
+
+    Returns:
+        numpy.ndarray: Area vectors, shape (n_polygons, 3).
+    """
+    coords = np.asarray(coords, dtype=float)
+    loop_starts = np.asarray(loop_starts, dtype=np.int64)
+    loop_totals = np.asarray(loop_totals, dtype=np.int64)
+    if len(loop_starts) == 0:
+        return np.zeros((0, 3))
+
+    # Corners relative to the first corner of their polygon, for precision far from the origin
+    owner = np.repeat(np.arange(len(loop_starts)), loop_totals)
+    local = coords - coords[loop_starts][owner]
+
+    # Next corner of each corner, wrapping around at the end of every polygon
+    following = np.arange(1, len(coords)+1)
+    following[loop_starts+loop_totals-1] = loop_starts
+
+    # Newell's method: half the sum of the cross products of consecutive corners
+    return 0.5*np.add.reduceat(np.cross(local, local[following]), loop_starts, axis=0)
+
+
+def classify_surfaces(area_vectors, threshold=0.01):
+    """
+    Split polygons into horizontal and vertical surfaces and compute their orientation.
+
+    Args:
+        area_vectors (numpy.ndarray): Area vectors, as returned by `polygon_area_vectors`.
+        threshold (float): Tolerance on the z component of the unit normal: horizontal if
+                           |z| >= 1 - threshold, vertical if |z| <= threshold.
+
+    Returns:
+        dict: Arrays of shape (n_polygons,): "area" [m2], "horizontal" and "vertical" (bool)
+              and "orientation" (azimuth of the normal [deg], 0 = North, clockwise).
+    """
+    area = np.linalg.norm(area_vectors, axis=1)
+    normal = np.divide(area_vectors, area[:, None], out=np.zeros_like(area_vectors), where=area[:, None] > 0)
+    return {
+        "area": area,
+        "horizontal": np.abs(normal[:, 2]) >= (1 - threshold),
+        "vertical": np.abs(normal[:, 2]) <= threshold,
+        "orientation": np.degrees(np.arctan2(normal[:, 0], normal[:, 1])) % 360,
+    }
+
+
+def group_by_orientation(orientations, areas, angle_tolerance=30):
+    """
+    Group vertical surfaces by similar orientation.
+
+    Surfaces are visited in order: each one joins the first group whose angle (the
+    orientation of the surface that created it) is within `angle_tolerance` degrees,
+    otherwise it starts a new group.
+
+    Args:
+        orientations (sequence): Orientation of each surface [deg].
+        areas (sequence): Area of each surface [m2].
+        angle_tolerance (float): Maximum difference in orientation to group surfaces [deg].
+
+    Returns:
+        dict: Rounded group angles [deg] and total area of each group [m2].
+    """
+    grouped_faces = {}
+    for angle, area in zip(np.asarray(orientations, dtype=float).tolist(), np.asarray(areas, dtype=float).tolist()):
+        for group_angle in grouped_faces:
+            if abs(group_angle - angle) <= angle_tolerance:
+                grouped_faces[group_angle] += area
+                break
+        else:
+            grouped_faces[angle] = area
+
+    return {round(k, 1): round(v, 1) for k, v in grouped_faces.items()}
+
+
+def building_surfaces(coords, loop_starts, loop_totals, owners, n_buildings, threshold=0.01, angle_tolerance=30):
+    """
+    Calculate the horizontal area and the grouped vertical areas of many buildings at once.
+
+    Args:
+        coords, loop_starts, loop_totals: Polygons of all buildings, see `polygon_area_vectors`.
+        owners (numpy.ndarray): Index of the building of each polygon (non-decreasing).
+        n_buildings (int): Number of buildings.
+        threshold (float): Tolerance for horizontal and vertical surfaces, see `classify_surfaces`.
+        angle_tolerance (float): Maximum difference in orientation to group façades [deg].
+
+    Returns:
+        tuple: Horizontal area of each building [m2] (half of the floor + roof area, as
+               `calculate_horizontal_area`), and the list of grouped vertical areas (dict)
+               of each building, as `calculate_and_group_vertical_faces`.
+    """
+    owners = np.asarray(owners, dtype=np.int64)
+    surfaces = classify_surfaces(polygon_area_vectors(coords, loop_starts, loop_totals), threshold)
+
+    horizontal = surfaces["horizontal"]
+    horizontal_areas = np.bincount(owners[horizontal], weights=surfaces["area"][horizontal]/2, minlength=n_buildings)
+
+    vertical = surfaces["vertical"]
+    boundaries = np.searchsorted(owners[vertical], np.arange(1, n_buildings))
+    facade_areas = [group_by_orientation(orientations, areas, angle_tolerance)
+                    for orientations, areas in zip(np.split(surfaces["orientation"][vertical], boundaries),
+                                                   np.split(surfaces["area"][vertical], boundaries))]
+    return horizontal_areas, facade_areas
@@ -0,0 +1,143 @@
+"""
+Compiled kernel for the hourly 5R1C recurrence.
+
+The mass temperature carries over from one hour to the next, so the recurrence cannot be
+vectorized in time. When Numba is importable, `_recurrence` is compiled and runs the whole
+year (including the cooling suppression at low outdoor temperatures) for a batch of
+buildings in a single call. Without Numba, engine.hourly_loads_batch falls back to its
+NumPy implementation.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Backends that can run the hourly recurrence, and the one used by default
+BACKENDS = ("numba", "numpy") if numba is not None else ("numpy",)
+BACKEND = BACKENDS[0]
+
+
+def resolve_backend(backend="auto"):
+    """
+    Return the name of the backend that runs the hourly recurrence.
+
+    Args:
+        backend (str): 'auto' (Numba when installed, NumPy otherwise), 'numba' or 'numpy'.
+
+    Returns:
+        str: Either 'numba' or 'numpy'.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    if backend == "auto":
+        return BACKEND
+    if backend not in ("numba", "numpy"):
+        raise ValueError(f"Unknown backend '{backend}'. Must be 'auto', 'numba' or 'numpy'.")
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend '{backend}' is not available. Install numba to use it.")
+    return backend
+
+
+def pack_coefficients(params, coef):
+    """
+    Pack building parameters and system coefficients into a (n_buildings, 22) float array,
+    in the column order expected by `_recurrence`.
+
+    Args:
+        params (dict): Building parameters as arrays of shape (n_buildings,).
+        coef (dict): Coefficients as returned by engine.system_coefficients for `params`.
+    """
+    return np.column_stack([params["Hven"], params["Hwin"], params["Hem"], params["Htr_sa"],
+                            coef["fac_sur"], coef["fac_mas"],
+                            *coef["ff0"], *coef["ff2"], *coef["hc0"], *coef["hc2"],
+                            coef["k_Ti_ff"], coef["k_Tm_ff"], coef["k_phi_hc"], coef["k_Tm_hc"]]).astype(float)
+
+
+def _recurrence(packed, Text, gain, solar, Tm_start, Ti_set_hea, Ti_set_coo, loads):
+    """
+    Run the hourly recurrence of every building and write the loads [W] into `loads`
+    (shape (n_buildings, n_hours)). Plain Python, compiled with Numba when available.
+    """
+    n_buildings, n_hours = gain.shape
+    for i in range(n_buildings):
+        Hven = packed[i, 0]
+        Hwin = packed[i, 1]
+        Hem = packed[i, 2]
+        Htr_sa = packed[i, 3]
+        fac_sur = packed[i, 4]
+        fac_mas = packed[i, 5]
+        ff00, ff01, ff02 = packed[i, 6], packed[i, 7], packed[i, 8]
+        ff20, ff21, ff22 = packed[i, 9], packed[i, 10], packed[i, 11]
+        hc00, hc01, hc02 = packed[i, 12], packed[i, 13], packed[i, 14]
+        hc20, hc21, hc22 = packed[i, 15], packed[i, 16], packed[i, 17]
+        k_Ti_ff = packed[i, 18]
+        k_Tm_ff = packed[i, 19]
+        k_phi_hc = packed[i, 20]
+        k_Tm_hc = packed[i, 21]
+
+        Tm = Tm_start
+        for h in range(n_hours):
+            T = Text[h]
+
+            #Heat injections
+            phi_air = gain[i, h]*0.5
+            phi_sur = fac_sur*(0.5*gain[i, h]+solar[i, h])
+            phi_mas = fac_mas*(0.5*gain[i, h]+solar[i, h])
+
+            #Free-floating condition
+            b0 = phi_air+Hven*T
+            b1 = -phi_sur-Hwin*T
+            b2 = -phi_mas-Hem*T
+            Ti = ff00*b0+ff01*b1+ff02*b2+k_Ti_ff*Tm
+
+            if Ti < Ti_set_hea or Ti > Ti_set_coo:
+                #Heating or cooling condition
+                Ti_set = Ti_set_hea if Ti < Ti_set_hea else Ti_set_coo
+                b0 = -Hven*T+Hven*Ti_set+Htr_sa*Ti_set-phi_air
+                b1 = -phi_sur-Hwin*T-Ti_set*Htr_sa
+                load = hc00*b0+hc01*b1+hc02*b2+k_phi_hc*Tm
+                Tm = hc20*b0+hc21*b1+hc22*b2+k_Tm_hc*Tm
+
+                #Set cooling load to 0 when Text < Ti_set_coo - 20
+                if load < 0 and T < Ti_set_coo - 20:
+                    load = 0.0
+            else:
+                #No heating and cooling needed
+                load = 0.0
+                Tm = ff20*b0+ff21*b1+ff22*b2+k_Tm_ff*Tm
+
+            loads[i, h] = load
+
+
+# Compiled on first use in every process. Numba's on-disk cache is looked up by source
+# file, which the add-on loads under several package names (Blender extension, worker
+# process), so it is not used.
+if numba is not None:
+    _recurrence = numba.njit(_recurrence)
+
+
+def run_recurrence(packed, Text, gain, solar, Tm_start, Ti_set_hea, Ti_set_coo):
+    """
+    Run the compiled recurrence on a batch of buildings.
+
+    Args:
+        packed (numpy.ndarray): Coefficients, as returned by `pack_coefficients`.
+        Text (numpy.ndarray): Hourly external air temperature [degC], shape (n_hours,).
+        gain (numpy.ndarray): Hourly internal gains [W], shape (n_buildings, n_hours).
+        solar (numpy.ndarray): Hourly solar gains [W], shape (n_buildings, n_hours).
+        Tm_start (float): Mass temperature at the first hour [degC].
+        Ti_set_hea (float): Heating set-point [degC].
+        Ti_set_coo (float): Cooling set-point [degC].
+
+    Returns:
+        numpy.ndarray: Hourly heating (+) and cooling (-) loads [W], shape (n_buildings, n_hours).
+    """
+    gain = np.ascontiguousarray(gain, dtype=float)
+    solar = np.ascontiguousarray(solar, dtype=float)
+    loads = np.zeros(gain.shape)
+    _recurrence(np.ascontiguousarray(packed, dtype=float), np.ascontiguousarray(Text, dtype=float),
+                gain, solar, float(Tm_start), float(Ti_set_hea), float(Ti_set_coo), loads)
+    return loads
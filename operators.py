@@ -1,10 +1,14 @@
-from .functions import latlon_to_xyz, create_flat_face, create_building, calculate_horizontal_area, calculate_and_group_vertical_faces, process_archetype, fetch_buildings_geojson, get_csv_column
+from .functions import create_flat_face, create_building, create_buildings, calculate_horizontal_area, extract_geometry, fetch_buildings_geojson
+from .archetypes import get_registry
+from .footprints import Footprints, construction_year, footprint_geometry, open_rings, iter_footprints, scan_geojson, read_footprints, save_footprints, MIN_FOOTPRINT_AREA, STORY_HEIGHT
+from .weather import load_weather, POA_CACHE
+from .cache import ResultCache
+from .pipeline import SimulationRun
+from .worker import write_job, WorkerProcess, RUNNING, FAILED, LOG_FILE
 import bpy
-import json
 import os
-import math
-from pvlib.iotools import read_epw
-from pvlib import location, irradiance
+import tempfile
+import time
 import pandas as pd
 import numpy as np
 import webbrowser
@@ -14,6 +18,11 @@ from brails.workflow.ImHandler import ImageHandler
 from mathutils import Vector
 import geopandas as gpd
 
+def footprint_formats(footprint_format):
+    """ Return the file formats written for the 'footprint_format' property. """
+    return {'NPZ': ("npz",), 'GEOJSON': ("geojson",), 'BOTH': ("npz", "geojson")}[footprint_format]
+
+
 class ADDON1_OT_Operator(bpy.types.Operator):
     bl_idname = "generate.myop_operator"
     bl_label = "Create gejson file"
@@ -31,11 +40,19 @@ class ADDON1_OT_Operator(bpy.types.Operator):
             levels_std_dev=props.std_nfloor
 
             # Call the fetch function with the specified folder
-            result = fetch_buildings_geojson(bbox, bpy.context.preferences.addons[__package__].preferences.folder_path, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev)
+            prefs = bpy.context.preferences.addons[__package__].preferences
+            cache_dir = os.path.join(bpy.path.abspath(prefs.folder_path), "overpass_cache") if props.fetch_cache and prefs.folder_path else None
+            result, output_files = fetch_buildings_geojson(bbox, prefs.folder_path, start_date_mean, start_date_std_dev, levels_mean, levels_std_dev,
+                                             tile_size=props.fetch_tile_size, endpoint=prefs.overpass_url,
+                                             cache_dir=cache_dir, workers=props.fetch_workers,
+                                             formats=footprint_formats(props.footprint_format),
+                                             seed=props.enrich_seed or None)
 
             # Report the result
-            if "saved" in result:
+            if output_files:
                 self.report({'INFO'}, result)
+                # Hand the fetched footprints to the importer (kept in memory for this session)
+                props.file_path = next(iter(output_files.values()))
                 print("GeoJSON file generated successfully.")
             else:
                 self.report({'ERROR'}, result)
@@ -159,19 +176,13 @@ class ADDON1_OT_Operator(bpy.types.Operator):
                 }
                 features.append(feature)
 
-            geojson_data = {
-                "type": "FeatureCollection",
-                "features": features
-            }
-
-            # Save the GeoJSON file
+            # Save the footprint file(s) and hand them to the importer
             output_folder=bpy.context.preferences.addons[__package__].preferences.folder_path
-            output_geojson = f"{output_folder}/enriched_buildings_ai.geojson"
-            with open(output_geojson, "w") as f:
-                import json
-                json.dump(geojson_data, f, indent=2)
+            output_files = save_footprints(Footprints.from_features(features), f"{output_folder}/enriched_buildings_ai",
+                                           footprint_formats(props.footprint_format))
+            props.file_path = next(iter(output_files.values()))
 
-            print(f"GeoJSON file saved to: {output_geojson}")
+            print(f"Footprint file(s) saved to: {', '.join(output_files.values())}")
 
 
         return {'FINISHED'}
@@ -179,418 +190,201 @@ class ADDON1_OT_Operator(bpy.types.Operator):
 
 
 
-class ADDON2_OT_Operator(bpy.types.Operator):
-    bl_label = "Calculate Heating and Cooling Loads"
-    bl_idname = "calculate.myop_operator"
-
-    def execute(self, context):
-        selected_objects = bpy.context.selected_objects
-        addon_directory = os.path.dirname(os.path.realpath(__file__))
-
-        # Load the JSON file
-        def load_json(file_name):
-            file_path = os.path.join(addon_directory, file_name)
-            with open(file_path, 'r') as file:
-                return json.load(file)
-
-        # Load the archetypes.json file
-        archetype_data = load_json('archetypes.json')
-
-        #-----Define basic climate and geographic info----------
-
-        #read the .epw file
-        epwFile = bpy.context.preferences.addons[__package__].preferences.file_path
-        epw_data = read_epw(epwFile)
-
-        #export timezone and convert it into string with sign changed
-        tz_epw = int(epw_data[1]['TZ'])
-        sign = '+' if tz_epw <= 0 else '-'
-        timezone_string = f"Etc/GMT{sign}{abs(tz_epw)}"
-
-        #define weather parameters for solar calculation
-        lat=epw_data[1]['latitude']
-        lon=epw_data[1]['longitude']
-        ghi=epw_data[0]['ghi'].tz_localize(None).reset_index(drop=True)
-        dni=epw_data[0]['dni'].tz_localize(None).reset_index(drop=True)
-        dhi=epw_data[0]['dhi'].tz_localize(None).reset_index(drop=True)
-        Text = epw_data[0].filter(['temp_air'])
-
-        loc = location.Location(lat,lon)
-        times = pd.date_range(start='01-01-2021', end='12-31-2021 23:00', freq='h', tz=timezone_string)
-        sp = loc.get_solarposition(times)
-
-        solar_zenith=sp['apparent_zenith'].reset_index(drop=True)
-        solar_azimuth=sp['azimuth'].reset_index(drop=True)
-
-
-        #--------START LOOP FOR BUILDINGS----------------------
-        all_buildings_data = {}  # For hourly loads
-        all_buildings_parameters = {}  # For building parameters
-
-        for cube in selected_objects:
-
-            #Calculate number of floors, ensuring that the value is minimum = 1
-            num_floors = max(1, math.floor(cube.dimensions.z / 3))
-
-            #Calculate the horizontal area of the building, and then floor area and roof area
-            horizontal_face_area=calculate_horizontal_area(cube, threshold=0.01)
-            Aflo_tot=horizontal_face_area*num_floors
-            Aflo=horizontal_face_area
-            Aroo=horizontal_face_area
-
-            #Calculate the vertical areas of the building together with their orientation
-            vertical_faces_areas=calculate_and_group_vertical_faces(cube, threshold=0.01, angle_tolerance=30)
-
-            #Calculate total sum of vertical areas, and then area of walls (opaque) and windows
-            tot_vertical_area=sum(vertical_faces_areas.values())
-
-            #Select the archetype
-            archetype_country=context.scene.my_addon_props.bui_arch
-
-            #Process the archetypes JSON file to match the archetype
-            process_archetype(cube, archetype_data, archetype_country)
-
-            constructions_data=process_archetype(cube, archetype_data, archetype_country)
-
-
-            Awal=tot_vertical_area*(1-constructions_data.get("window")["wwr"]) #float
-            Awin=tot_vertical_area*(constructions_data.get("window")["wwr"]) #float
-            Awal_list=[x * (1-constructions_data.get("window")["wwr"]) for x in list(vertical_faces_areas.values())] #list
-            Awin_list=[x * (constructions_data.get("window")["wwr"]) for x in list(vertical_faces_areas.values())] #list
-
-            #Calculate the total heat capacity of the building (1C) (windows are not involved - Eq. 66)
-            Cm_floor=constructions_data.get("floor")["k_m"]*Aflo_tot
-            Cm_roof=constructions_data.get("roof")["k_m"]*Aroo
-            Cm_walls=constructions_data.get("walls")["k_m"]*Awal
-            Cm_tot=Cm_floor+Cm_roof+Cm_walls
-
-            #Calculate the effective mass area Am - Eq. 65)
-            den_floor=constructions_data.get("floor")["k_m"]**2*Aflo_tot
-            den_roof=constructions_data.get("roof")["k_m"]**2*Aroo
-            den_walls=constructions_data.get("walls")["k_m"]**2*Awal
-            Am=Cm_tot**2/(den_floor+den_roof+den_walls)
-
-            #Calculate the volume of the building
-            vol=horizontal_face_area*cube.dimensions.z
-
-
-            #---------------Definition of constant parameters---------------------- MAYBE TO MOVE BEFORE LOOP as they are constant
-
-            #Adjustment factor for floor
-            b=0.5
-
-            #Heat transfer coefficient between surface and air nodes
-            h_sa=3.45 #W/m2K
-
-            #Heat trannsfer coefficient between mass and surface nodes
-            h_ms=9.1 #W/m2K
-
-            #Ratio between internal surfaces and floor area (dimensionless)
-            ratSur=4.5
-
-            #Absorption coefficient for solar radiation (dimensionless)
-            absCoe=0.6
-
-            #Heat resistance of external surfaces
-            surRes=0.04 #m2K/W
-
-            #Emissivity of external surfaces (dimensionless)
-            eps=0.9
-
-            #Air change rate (MAYBE TO BE MOVED INSIDE ARCHETYPES JSON FILE AS IT IS ARCHETYPE-SPECIFIC)
-            ACH=0.15
-
-            #Shading factor
-            shdFac=0.9
-
-            #--------------Calculation of heat transfer elements (5R) -----------------------
-
-            Atot=Aflo_tot*ratSur
-
-            #Heat transfer element for ventilation (Eq. 21)
-            Hven=1.225*1005*ACH*vol/3600
-
-            #Heat transfer element for windows (Eq. 17)
-            Uwin=constructions_data.get("window")["Uvalue"]
-            Hwin=Uwin*Awin
-
-            #Heat transfer element for opaque surfaces (Eq. 63)
-            Uwal=constructions_data.get("walls")["Uvalue"]
-            Uflo=constructions_data.get("floor")["Uvalue"]
-            Uroo=constructions_data.get("roof")["Uvalue"]
-            Hem=1/(1/(Uwal*Awal+b*Uflo*Aflo+Uroo*Aroo)-1/(h_ms*Am))
-
-            #Heat transfer element between mass and surface node
-            Htr_ms=h_ms*Am
+def simulation_inputs(context):
+    """
+    Collect the inputs of the simulation of the selected buildings.
 
-            #Heat transfer element between surface and air node
-            Htr_sa=h_sa*Atot
+    Returns:
+        dict: names, horizontal_areas, heights, facade_areas, usages and constructions of the
+              buildings (see engine.simulate).
+    """
+    selected_objects = context.selected_objects
 
-            #---------CALCULATE SOLAR RADIATION ON SURFACES-----------
+    #Select the archetype
+    archetype_country=context.scene.my_addon_props.bui_arch
 
+    #--------COLLECT GEOMETRY AND ARCHETYPES OF THE BUILDINGS----------------------
+    names = []
+    heights = []
+    usages = []
+    ages = []
 
-            #---Calculate solar radiation on vertical surfaces
-            POA_irradiance_values = []
+    #Calculate the horizontal areas and the vertical areas (with their orientation) of all buildings in one pass
+    horizontal_areas, facade_areas = extract_geometry(selected_objects, threshold=0.01, angle_tolerance=30)
 
+    for cube in selected_objects:
+        names.append(cube.name)
+        heights.append(cube.dimensions.z)
+        usages.append(cube.my_properties.usage)
+        ages.append(cube.my_properties.age)
 
-            # Iterate over each azimuth angle stored in vertical_faces_areas.keys
-            for azimuth_angle in vertical_faces_areas.keys():
-                # Calculate POA irradiance for the current azimuth angle
-                POA_irradiance = irradiance.get_total_irradiance(surface_tilt=90, surface_azimuth=azimuth_angle,
-                                                     solar_zenith=solar_zenith, solar_azimuth=solar_azimuth,
-                                                     dni=dni, ghi=ghi, dhi=dhi)
-                POA_global=POA_irradiance['poa_global']
-                # Append the POA irradiance value to the list
-                POA_irradiance_values.append(POA_global)
+    #Match the archetype of every building (archetypes.json is parsed only once per session)
+    constructions = get_registry().assign(usages, archetype_country, ages)
 
-            POA_irradiance_values_df=pd.DataFrame(POA_irradiance_values)
+    return {"names": names, "horizontal_areas": horizontal_areas, "heights": heights, "facade_areas": facade_areas,
+            "usages": usages, "constructions": constructions}
 
-            #---Calculate solar radiation through windows
-            multiplied_values_win = []
 
-            # Iterate over values in Awin and corresponding POA_irradiance_values
-            for win_value, poa_value in zip(Awin_list, POA_irradiance_values):
-                # Multiply the values and append the result to the list
-                multiplied_value_win = win_value * poa_value*constructions_data.get("window")["g-factor"]*shdFac
-                multiplied_values_win.append(multiplied_value_win)
+def run_options(props):
+    """ Return the options of pipeline.SimulationRun set in the panel. """
+    return {"output_format": props.output_format.lower(), "float32": props.output_float32,
+            "save_building_loads": props.save_building_loads, "save_district_summary": props.save_district_summary,
+            "workers": props.sim_workers, "chunk_size": props.sim_chunk_size}
 
-            multiplied_values_win_df=pd.DataFrame(multiplied_values_win)
-            solRadWin_tot=sum(multiplied_values_win)
-            solRadWin_tot_df=pd.DataFrame(solRadWin_tot)
 
+def load_results(names, results):
+    """ Store the results of the buildings (see pipeline.SimulationRun.results) in their objects. """
+    for name, (peak_heating, peak_cooling, energy_heating, energy_cooling) in zip(names, results.tolist()):
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            obj.my_properties.peak_heating = peak_heating / 1000
+            obj.my_properties.peak_cooling = peak_cooling / 1000
+            obj.my_properties.annual_heating = energy_heating / 1000
+            obj.my_properties.annual_cooling = energy_cooling / 1000
 
-            #---Calculate solar radiation through opaque constructions
-            multiplied_values_opa = []
 
-            #Calculate for the vertical walls
-            # Iterate over values in Awal_list and corresponding POA_irradiance_values
-            for opa_value, poa_value in zip(Awal_list, POA_irradiance_values):
-                # Multiply the values and append the result to the list
-                multiplied_value_opa = opa_value * poa_value*absCoe*Uwal*surRes
-                multiplied_values_opa.append(multiplied_value_opa)
-
-            multiplied_values_opa_df=pd.DataFrame(multiplied_values_opa)
-
-            multiplied_values_t_opa = []
-
-            for areaWal in Awal_list:
-                multiplied_value_t_opa=areaWal*Uwal*surRes*5*eps*11*0.5
-                multiplied_values_t_opa.append(multiplied_value_t_opa)
-
-            multiplied_values_t_opa_df=pd.DataFrame(multiplied_values_t_opa)
-
-            #Total solar radiation on opaque vertical surface
-            solRadOpa_walls = [a - b for a, b in zip(multiplied_values_opa, multiplied_values_t_opa)]
-            solRadOpa_walls_tot=sum(solRadOpa_walls)
-
-            #Calculate for the roof
-            POA_irradiance_roof = irradiance.get_total_irradiance(surface_tilt=0, surface_azimuth=0,
-                                                 solar_zenith=solar_zenith, solar_azimuth=solar_azimuth,
-                                                 dni=dni, ghi=ghi, dhi=dhi)
-            POA_global_roof=POA_irradiance_roof['poa_global']
-
-            multiplied_values_roo = POA_global_roof*Aroo*absCoe*Uroo*surRes
-
-            multiplied_value_roo_t=Aroo*Uroo*surRes*5*eps*11*1
-            multiplied_value_roo_t = [multiplied_value_roo_t] * len(multiplied_values_roo)
-
-            #Total solar radiation on opaque vertical surface
-            solRadOpa_roo_tot = [a - b for a, b in zip(multiplied_values_roo, multiplied_value_roo_t)]
-            solRadOpa_roo_tot_df=pd.DataFrame(solRadOpa_roo_tot)
-
-            #Sum solar radiation walls+roof
-            solRadOpa = [a + b for a, b in zip(solRadOpa_walls_tot, solRadOpa_roo_tot)]
-            solRadOpa_df = pd.Series(solRadOpa)
-
-            #Calculate total solar radiation as sum of windows+opaque
-            solRadTot = [a + b for a, b in zip(solRadOpa_df, solRadWin_tot)]
-            solRadTot_df = pd.Series(solRadTot)
-
-
-            #-------TESTING-----------Uncomment the code below to print csv files about solar radiation
-            #out_dir = bpy.context.preferences.addons[__package__].preferences.folder_path
-            #os.makedirs(out_dir, exist_ok=True)
-            #output_file_solartot = os.path.join(out_dir, "SolarRadTot.csv")
-            #solRadTot_df.to_csv(output_file_solartot, sep=';', index=False)
-
-            #output_file_solarOpa = os.path.join(out_dir, "SolarRadOpa.csv")
-            #solRadOpa_df.to_csv(output_file_solarOpa, sep=';', index=False)
-
-            #output_file_solarWin = os.path.join(out_dir, "SolarRadWin.csv")
-            #solRadWin_tot_df.to_csv(output_file_solarWin, sep=';', index=False)
-
-            # Transpose the DataFrame
-            #poa_transposed = POA_irradiance_values_df.T
-
-            #output_file_rad = os.path.join(out_dir, "Rad.csv")
-            #poa_transposed.to_csv(output_file_rad, sep=';', index=False)
-
-
-
-            #------------INTERNAL GAINS---------------------------
-
-            #Set addon directory
-            addon_dir = os.path.dirname(os.path.realpath(__file__))
-
-            if cube.my_properties.usage=="RES_1":
-                m2_person_RES=35 #m2 per person
-                q_person=120 #heat load from occupants per person
-                q_light_RES=3.88 #heat load from lighting per m2
-                q_equip_RES=5.38 #heat load from equipment per m2
+class ADDON2_OT_Operator(bpy.types.Operator):
+    bl_label = "Calculate Heating and Cooling Loads"
+    bl_idname = "calculate.myop_operator"
+    bl_description = "Simulate the selected buildings. From the panel, the buildings are simulated in chunks while Blender stays responsive: progress is shown in the status bar and Esc cancels, keeping the completed buildings"
 
-                csv_path = os.path.join(addon_dir, "utilities", "RES_SCH.csv")
+    def execute(self, context):
+        run = self.simulation_run(context, simulation_inputs(context))
 
-                fraction_OCC=get_csv_column(csv_path, "RES_OCC_SCH")
-                fraction_LGT=get_csv_column(csv_path, "RES_LIGHT_SCH")
-                fraction_EQP=get_csv_column(csv_path, "RES_EQP_SCH")
+        #--------RUN THE 5R1C MODEL OF ALL BUILDINGS TOGETHER----------------------
+        try:
+            run.run()
+        except BaseException:
+            run.close()
+            raise
+        run.save()
+        load_results(run.names, run.results())
 
-                gain_OCC=[x * q_person * Aflo_tot / m2_person_RES for x in fraction_OCC]
-                gain_LGT=[x * q_light_RES * Aflo_tot for x in fraction_LGT]
-                gain_EQP=[x * q_equip_RES * Aflo_tot for x in fraction_EQP]
+        return {'FINISHED'}
 
-            else:
-                m2_person_COM=18
-                q_person=120
-                q_light_COM=10.76
-                q_equip_COM=10.76
+    def simulation_run(self, context, inputs):
+        """ Return the simulation of the buildings inside Blender (see pipeline.SimulationRun). """
+        props = context.scene.my_addon_props
 
-                csv_path = os.path.join(addon_dir, "utilities", "COM_SCH.csv")
+        #-----Define basic climate and geographic info----------
+        #The preprocessed weather is cached in the output folder and reused on later runs
+        epwFile = context.preferences.addons[__package__].preferences.file_path
+        out_dir = context.preferences.addons[__package__].preferences.folder_path
+        weather = load_weather(epwFile, cache_dir=out_dir or None)
 
-                fraction_OCC=get_csv_column(csv_path, "COM_OCC_SCH")
-                fraction_LGT=get_csv_column(csv_path, "COM_LIGHT_SCH")
-                fraction_EQP=get_csv_column(csv_path, "COM_EQP_SCH")
+        #Façades with similar orientation share the same plane-of-array irradiance series
+        POA_CACHE.azimuth_step = props.poa_azimuth_step
 
-                gain_OCC=[x * q_person * Aflo_tot / m2_person_RES for x in fraction_OCC]
-                gain_LGT=[x * q_light_RES * Aflo_tot for x in fraction_LGT]
-                gain_EQP=[x * q_equip_RES * Aflo_tot for x in fraction_EQP]
+        cache = ResultCache(os.path.join(out_dir, "result_cache"), max_bytes=props.result_cache_size*1024**2) if props.use_result_cache else None
+        return SimulationRun(inputs, weather, out_dir, cache=cache, **run_options(props))
 
-            gain=[a + b + c for a, b, c in zip(gain_OCC, gain_LGT, gain_EQP)]
-            #gain_df=pd.Series(gain)
-            gain_df = pd.Series([200] * 8760)
-
-
-            #------------CALCULATIONS FOR HEAT INJECTIONS-------------------------------------
-            phi_air=gain_df*0.5
-
-            phi_sur=(1-Am/Atot-Hwin/(Atot*h_ms))*(0.5*gain_df+solRadTot_df)
-
-            phi_mas=(Am/Atot)*(0.5*gain_df+solRadTot_df)
-
-            #------------CALCULATION OF HEATING AND COOLING LOADS----------------------------
-
-            a=[]
-            c=[]
-            Tm_ini=20
-            Ti_set_hea=20
-            Ti_set_coo=27
-
-
-            for h in range(0, 8760, 1):
-
-                A = np.array([[Hven+Htr_sa, -Htr_sa, 0], [Htr_sa, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
-                #b = np.array([phi_air+Hven*Tsup, -phi_sur-Hwin*Text.temp_air[h], -phi_mas-Cm_tot/3600*Tm_ini-Hem*Text.temp_air[h]])
-                b = np.array([phi_air.iloc[h]+Hven*Text.temp_air.iloc[h], -phi_sur.iloc[h]-Hwin*Text.temp_air.iloc[h], -phi_mas.iloc[h]-Cm_tot/3600*Tm_ini-Hem*Text.temp_air.iloc[h]])
-                x = np.linalg.solve(A, b)
-
-
-                if x[0]<Ti_set_hea:
-                    #Heating condition
-                    A = np.array([[1, Htr_sa, 0], [0, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
-                    b = np.array([-Hven*Text.temp_air.iloc[h]+Hven*Ti_set_hea+Htr_sa*Ti_set_hea-phi_air.iloc[h], -phi_sur.iloc[h]-Hwin*Text.temp_air.iloc[h]-Ti_set_hea*Htr_sa, -phi_mas.iloc[h]-Cm_tot/3600*Tm_ini-Hem*Text.temp_air.iloc[h]])
-                    x = np.linalg.solve(A, b)
-                    a.append(Ti_set_hea)
-                    c.append(x[0])
-                    Tm_ini=x[2]
-
-                elif x[0]>Ti_set_coo:
-
-                    #Cooling condition
-                    A = np.array([[1, Htr_sa, 0], [0, -Hwin-Htr_sa-Htr_ms, Htr_ms], [0, Htr_ms, -Hem-Htr_ms-Cm_tot/3600]])
-                    b = np.array([-Hven*Text.temp_air.iloc[h]+Hven*Ti_set_coo+Htr_sa*Ti_set_coo-phi_air.iloc[h], -phi_sur.iloc[h]-Hwin*Text.temp_air.iloc[h]-Ti_set_coo*Htr_sa, -phi_mas.iloc[h]-Cm_tot/3600*Tm_ini-Hem*Text.temp_air.iloc[h]])
-                    x = np.linalg.solve(A, b)
-                    a.append(Ti_set_coo)
-                    c.append(x[0])
-                    Tm_ini=x[2]
-
-                else:
-                    #No heating and cooling needed
-                    a.append(x[0])
-                    c.append(0)
-                    Tm_ini=x[2]
-
-            #Postprocess `c` to set cooling load to 0 when Text < Ti_set_coo - 3
-            for h in range(8760):
-                if Text.temp_air.iloc[h] < (Ti_set_coo - 20) and c[h] < 0:
-                    c[h] = 0  # Override cooling/heating load
-
-            print(f"Calculation for {cube.name} completed")
-
-            c = [round(value) for value in c]
-            all_buildings_data[cube.name] = c
-
-            # Store the parameters as a list in the parameters dictionary
-            all_buildings_parameters[cube.name] = [round(Aflo_tot, 1),
-                                                    round(Awal, 1),
-                                                    round(Awin, 1),
-                                                    round(Cm_tot, 0),
-                                                    round(Uflo, 2),
-                                                    round(Uwal, 2),
-                                                    round(Uroo, 2),
-                                                    round(Uwin, 2),
-                                                    round(constructions_data.get("window")["g-factor"],2),
-                                                    round(Hven, 2),
-                                                    round(Hwin, 2),
-                                                    round(Hem, 2),
-                                                    round(Htr_ms, 2),
-                                                    round(Htr_sa, 2),
-                                                    round(Am, 2)
-                                                    ]
-
-
-
-        # Add the "Hour of Year" as the first column in the hourly loads dictionary
-        hour_of_year = list(range(1, 8761))  # Generate a list from 1 to 8760
-        all_buildings_data["Hour of Year"] = hour_of_year
-
-        # Create DataFrames for hourly loads and parameters
-        df_all_buildings = pd.DataFrame(all_buildings_data)
-
-        # Reorder columns to ensure "Hour of Year" is the first column
-        df_all_buildings = df_all_buildings[["Hour of Year"] + [col for col in df_all_buildings.columns if col != "Hour of Year"]]
-
-        # Create the parameters DataFrame (transpose the dictionary)
-        parameters_df = pd.DataFrame(all_buildings_parameters, index=["Floor area [m2]",
-                                                                        "Walls area [m2]",
-                                                                        "Windows area [m2]",
-                                                                        "Building heat capacity [J/K]",
-                                                                        "U-value floor [W/m2K]",
-                                                                        "U-value walls [W/m2K]",
-                                                                        "U-value roof [W/m2K]",
-                                                                        "U-value win [W/m2K]",
-                                                                        "g-factor win [-]",
-                                                                        "Hven [W/K]",
-                                                                        "Hwin [W/K]",
-                                                                        "Hem [W/K]",
-                                                                        "Htr_ms [W/K]",
-                                                                        "Htr_sa [W/K]",
-                                                                        "Am [m2]"
-                                                                        ]).T
-
-        # Save the hourly loads to a CSV file
-        out_dir = bpy.context.preferences.addons[__package__].preferences.folder_path
+    def start_worker(self, context, inputs):
+        """ Start the simulation of the buildings in a separate process (see worker.py). """
+        props = context.scene.my_addon_props
+        out_dir = context.preferences.addons[__package__].preferences.folder_path
         os.makedirs(out_dir, exist_ok=True)
-        output_file_loads = os.path.join(out_dir, "All_Buildings_Loads.csv")
-        df_all_buildings.to_csv(output_file_loads, sep=';', index=False)
+        job_dir = tempfile.mkdtemp(prefix="simulation_job_", dir=out_dir)
+        write_job(job_dir, inputs, {
+            "epw_file": context.preferences.addons[__package__].preferences.file_path,
+            "out_dir": out_dir,
+            "azimuth_step": props.poa_azimuth_step,
+            "result_cache_size": props.result_cache_size*1024**2 if props.use_result_cache else None,
+            "run": run_options(props),
+        })
+        return WorkerProcess(job_dir)
 
-        # Save the building parameters to a CSV file
-        output_file_parameters = os.path.join(out_dir, "All_Buildings_Parameters.csv")
-        parameters_df.to_csv(output_file_parameters, sep=';', index_label="Building")
+    def invoke(self, context, event):
+        # The buildings are simulated `sim_chunk_size` at a time (per worker) between two timer events,
+        # inside Blender or in a separate process that is polled at every timer event
+        props = context.scene.my_addon_props
+        inputs = simulation_inputs(context)
+        if not inputs["names"]:
+            return self.execute(context)
+
+        self.names = inputs["names"]
+        self.run = None
+        self.worker = None
+        self.cancelled = False
+        if props.sim_backend == 'PROCESS':
+            self.worker = self.start_worker(context, inputs)
+        else:
+            self.run = self.simulation_run(context, inputs)
+        self.started = time.perf_counter()
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.01 if self.run is not None else 0.2, window=context.window)
+        wm.progress_begin(0, len(self.names))
+        wm.modal_handler_add(self)
+        context.workspace.status_text_set(f"Arcade: simulating {len(self.names)} buildings (Esc to cancel)")
+        return {'RUNNING_MODAL'}
 
-        print(f"All building data saved to: {output_file_loads}")
-        print(f"Building parameters saved to: {output_file_parameters}")
+    def modal(self, context, event):
+        if event.type == 'ESC' and not self.cancelled:
+            self.cancelled = True
+            if self.worker is not None:
+                # The worker writes the completed buildings out before it stops
+                self.worker.cancel()
+                context.workspace.status_text_set("Arcade: cancelling the simulation...")
+                return {'RUNNING_MODAL'}
+            return self.stop(context)
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        if self.worker is not None:
+            done, count, state = self.worker.status()
+            if state == FAILED:
+                print(self.worker.log_text())
+                self.worker.close(remove=False)
+                self.stop_timer(context)
+                self.report({'ERROR'}, f"The simulation failed, see {os.path.join(self.worker.job_dir, LOG_FILE)}")
+                return {'CANCELLED'}
+            if state != RUNNING:
+                return self.stop(context)
+        else:
+            try:
+                done = self.run.step()
+            except BaseException:
+                self.run.close()
+                self.stop_timer(context)
+                raise
+            count = self.run.count
+            if done == count:
+                return self.stop(context)
+
+        # Progress and estimated time left in the status bar
+        context.window_manager.progress_update(done)
+        if done:
+            elapsed = time.perf_counter() - self.started
+            minutes, seconds = divmod(round(elapsed / done * (count - done)), 60)
+            context.workspace.status_text_set(f"Arcade: {done}/{count} buildings simulated, about {minutes}:{seconds:02d} left (Esc to cancel)")
+        return {'RUNNING_MODAL'}
 
+    def stop(self, context):
+        """ Write out the buildings completed, load their results into the scene and end the operator. """
+        self.stop_timer(context)
+        if self.worker is not None:
+            print(self.worker.log_text())
+            results = self.worker.results()
+            self.worker.close()
+        else:
+            self.run.save()
+            results = self.run.results()
+        load_results(self.names, results)
+
+        if self.cancelled:
+            self.report({'WARNING'}, f"Simulation cancelled: results of {len(results)} of {len(self.names)} buildings saved")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Calculation for {len(self.names)} buildings completed")
         return {'FINISHED'}
 
+    def stop_timer(self, context):
+        """ Remove the timer and clear the progress indicators. """
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
 
 
 class ADDON3_OT_Operator(bpy.types.Operator):
@@ -625,54 +419,39 @@ class ADDON5_OT_Operator(bpy.types.Operator):
     bl_description = "Import the geoJSON file to create the 3D urban area"
 
     def execute(self, context):
-        # Access the file path from the UI property
-        file_path = context.scene.my_addon_props.file_path
-
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-
-        # Find the vertex with the smallest latitude and longitude
-        min_lat = float('inf')
-        min_lon = float('inf')
-
-        # Iterate through all features to find the smallest lat/lon
-        latitudes = []
-
-        for feature in data['features']:
-            coordinates = feature['geometry']['coordinates']
-            for polygon in coordinates:
-                for point in polygon:
-                    latitudes.append(point[1])  # latitude is the second value in the coordinate
-
-        # Find the minimum latitude
-        min_lat = min(latitudes)
-
-
-        longitudes = []
-
-        for feature in data['features']:
-            coordinates = feature['geometry']['coordinates']
-            for polygon in coordinates:
-                for point in polygon:
-                    longitudes.append(point[0])  # latitude is the second value in the coordinate
-
-        # Find the minimum latitude
-        min_lon = min(longitudes)
-
+        # Access the file path from the UI property (relative to the .blend file if it starts with //)
+        file_path = bpy.path.abspath(context.scene.my_addon_props.file_path)
+
+        # Binary footprint files are already compact and are read whole
+        if context.scene.my_addon_props.import_mode == 'STREAM' and not file_path.lower().endswith(".npz"):
+            self.import_stream(context, file_path, context.scene.my_addon_props.import_chunk_size)
+            print("Buildings created successfully.")
+            return {'FINISHED'}
+
+        # Footprints as one coordinate buffer (from memory if they were fetched in this session),
+        # all points projected at once using the smallest lat/lon as the origin
+        footprints = read_footprints(file_path)
+        min_lat, min_lon = footprints.origin()
+        xy = footprints.project(min_lat, min_lon)
+
+        if context.scene.my_addon_props.import_mode == 'BULK':
+            self.import_bulk(context, footprints, xy)
+            print("Buildings created successfully.")
+            return {'FINISHED'}
 
         # Iterate through the features in the JSON and create buildings or flat faces
-        for feature in data['features']:
-            coordinates = feature['geometry']['coordinates'][0]
-            num_stories = feature['properties'].get('building:levels', "NA")
-            year = feature['properties'].get('start_date', "NA")
-            use = feature['properties'].get('building', "NA")
-            feature_id = feature['properties'].get('id', "NA")
+        no_year = 0
+        for index, properties in enumerate(footprints.properties):
+            num_stories = properties.get('building:levels', "NA")
+            year = construction_year(properties.get('start_date', "NA"))
+            use = properties.get('building', "NA")
+            feature_id = properties.get('id', "NA")
 
             # Replace "/" with "_" in the feature ID
             feature_id = str(feature_id).replace('/', '_')
 
-            # Convert lat/lon to Blender coordinates, using the smallest lat/lon as the origin
-            vertices = [latlon_to_xyz(lat, lon, min_lat, min_lon) for lon, lat in coordinates]
+            # Blender coordinates of the footprint
+            vertices = xy[footprints.offsets[index]:footprints.offsets[index+1]].tolist()
 
             # Calculate the horizontal footprint area
             obj_name = f"Temp_{feature_id}"  # Temporary name for footprint object
@@ -692,15 +471,76 @@ class ADDON5_OT_Operator(bpy.types.Operator):
                 print(f"Skipping building {feature_id}: Footprint area ({footprint_area:.2f} m²) is less than 50 m².")
                 continue
 
-            # If height is "NA" or not defined, create a flat face
-            if num_stories == "NA" or not num_stories.isdigit():
-                create_flat_face(vertices, f"Flat_{feature['properties']['id']}")
+            # If height or year is "NA" or not defined, create a flat face
+            if num_stories == "NA" or not num_stories.isdigit() or year is None:
+                if year is None and num_stories.isdigit():
+                    no_year += 1
+                create_flat_face(vertices, f"Flat_{properties['id']}")
             else:
                 # Otherwise, create a building with the given height
                 num_stories = float(num_stories)  # Convert height to float
-                year = int(year)  # Convert year to int
                 create_building(vertices, num_stories*3, f"Building_{feature_id}", year, use)
 
+        if no_year:
+            print(f"{no_year} footprints without a numeric start_date were imported as flat faces.")
         print("Buildings created successfully.")
 
         return {'FINISHED'}
+
+    def import_bulk(self, context, footprints, xy):
+        """ Create the buildings of a set of footprints at once (see `create_buildings`). """
+        # Filter the footprints by area analytically, without temporary meshes
+        areas = footprint_geometry(xy, footprints.offsets, np.zeros(len(footprints)))["area"]
+        for properties, area in zip(footprints.properties, areas.tolist()):
+            if area < MIN_FOOTPRINT_AREA:
+                feature_id = str(properties.get('id', "NA")).replace('/', '_')
+                print(f"Skipping building {feature_id}: Footprint area ({area/2:.2f} m²) is less than 50 m².")
+        keep = areas >= MIN_FOOTPRINT_AREA
+        xy = xy[np.repeat(keep, np.diff(footprints.offsets))]
+        footprints = footprints.select(keep)
+
+        # Buildings with a number of stories and a construction year are extruded, the others are flat faces
+        heights, names, years, uses = [], [], [], []
+        no_year = 0
+        for properties in footprints.properties:
+            num_stories = str(properties.get('building:levels', "NA"))
+            feature_id = str(properties.get('id', "NA")).replace('/', '_')
+            year = construction_year(properties.get('start_date', "NA"))
+            if num_stories.isdigit() and year is not None:
+                heights.append(float(num_stories)*STORY_HEIGHT)
+                names.append(f"Building_{feature_id}")
+                years.append(year)
+            else:
+                if num_stories.isdigit():
+                    no_year += 1
+                heights.append(0.0)
+                names.append(f"Flat_{properties['id']}")
+                years.append(None)
+            uses.append(properties.get('building', "NA"))
+
+        if no_year:
+            print(f"{no_year} footprints without a numeric start_date were imported as flat faces.")
+        xy, offsets = open_rings(xy, footprints.offsets)
+        create_buildings(xy, offsets, heights, names, years, uses)
+
+    def import_stream(self, context, file_path, chunk_size):
+        """
+        Create the buildings of a GeoJSON file in chunks of `chunk_size` features, reading the
+        file incrementally (see `footprints.iter_features`) so that memory use depends on the
+        chunk size rather than on the file size.
+        """
+        # First pass: number of features and origin of the projection
+        count, min_lat, min_lon = scan_geojson(file_path, chunk_size)
+
+        # Second pass: create the buildings chunk by chunk
+        wm = context.window_manager
+        wm.progress_begin(0, max(count, 1))
+        done = 0
+        try:
+            for footprints in iter_footprints(file_path, chunk_size):
+                self.import_bulk(context, footprints, footprints.project(min_lat, min_lon))
+                done += len(footprints)
+                wm.progress_update(done)
+                print(f"Imported {done}/{count} features")
+        finally:
+            wm.progress_end()
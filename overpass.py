@@ -0,0 +1,211 @@
+"""
+Building footprints from the Overpass API.
+
+Large bounding boxes are split into tiles that are fetched concurrently on a pooled
+HTTP session with retries and exponential backoff. The raw response of every tile is
+cached on disk, keyed by endpoint and query, so the same area is downloaded only once.
+Ways that cross tile borders are returned by every tile they touch and are merged by
+their OSM id. Nothing here depends on bpy.
+"""
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Default Overpass API endpoint
+DEFAULT_ENDPOINT = "https://overpass-api.de/api/interpreter"
+
+# HTTP status codes worth retrying (rate limit, gateway errors, server busy)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def building_query(bbox, timeout=25):
+    """
+    Return the Overpass query of the buildings in a bounding box.
+
+    Args:
+        bbox (tuple): Bounding box in the format (south, west, north, east).
+        timeout (int): Server-side timeout of the query [s].
+    """
+    return f"""
+    [out:json][timeout:{timeout}];
+    (
+      way["building"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
+      relation["building"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
+    );
+    out body;
+    >;
+    out skel qt;
+    """
+
+
+def split_bbox(bbox, tile_size):
+    """
+    Split a bounding box into a grid of tiles.
+
+    Args:
+        bbox (tuple): Bounding box in the format (south, west, north, east).
+        tile_size (float): Maximum size of a tile in degrees (0 or None: a single tile).
+
+    Returns:
+        list: The tiles (south, west, north, east), row by row from the south-west corner.
+    """
+    south, west, north, east = bbox
+    if not tile_size:
+        return [tuple(bbox)]
+    rows = max(1, math.ceil((north - south) / tile_size))
+    columns = max(1, math.ceil((east - west) / tile_size))
+    lat_step = (north - south) / rows
+    lon_step = (east - west) / columns
+    return [(south + i*lat_step, west + j*lon_step,
+             north if i == rows-1 else south + (i+1)*lat_step,
+             east if j == columns-1 else west + (j+1)*lon_step)
+            for i in range(rows) for j in range(columns)]
+
+
+def make_session(retries=3, backoff=1.0, pool_size=4):
+    """
+    Return a requests session with a connection pool and automatic retries.
+
+    Args:
+        retries (int): Maximum number of retries of a request.
+        backoff (float): Backoff factor: the n-th retry waits backoff * 2**(n-1) seconds
+                         (or the Retry-After time sent by the server).
+        pool_size (int): Number of pooled connections per host.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUS,
+                  allowed_methods=["GET", "POST"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def merge_responses(responses):
+    """
+    Merge the Overpass responses of several tiles, keeping each element once.
+
+    Elements are identified by type and OSM id; the first occurrence is kept, in tile order.
+    """
+    elements = {}
+    for data in responses:
+        for element in data.get("elements", []):
+            elements.setdefault((element["type"], element["id"]), element)
+    return {"elements": list(elements.values())}
+
+
+def overpass_to_features(data):
+    """
+    Convert an Overpass response to GeoJSON polygon features, one per building way.
+
+    Returns:
+        list: GeoJSON features, with the OSM tags as properties and a sequential "id".
+    """
+    features = []
+    nodes = {node["id"]: (node["lon"], node["lat"]) for node in data.get("elements", []) if node["type"] == "node"}
+    feature_id = 1  # Initialize a counter for the sequential ID
+
+    for element in data.get("elements", []):
+        if element["type"] == "way" and "nodes" in element:
+            coordinates = [nodes[node_id] for node_id in element["nodes"] if node_id in nodes]
+            if len(coordinates) > 2:  # Ensure it forms a polygon
+                features.append({
+                    "type": "Feature",
+                    "properties": {
+                        **element.get("tags", {}),
+                        "id": feature_id  # Use sequential ID
+                    },
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [coordinates]
+                    }
+                })
+                feature_id += 1  # Increment the counter for the next feature
+    return features
+
+
+class OverpassClient:
+    """
+    Client of an Overpass API endpoint with an on-disk response cache.
+
+    Args:
+        endpoint (str): URL of the Overpass interpreter (e.g. a local server for testing).
+        cache_dir (str): Folder of the cached responses (None: no cache).
+        workers (int): Maximum number of concurrent requests.
+        retries (int): Maximum number of retries of a request.
+        backoff (float): Backoff factor of the retries, see `make_session`.
+        timeout (int): Timeout of the queries [s] (server side, and client side with a margin).
+    """
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, cache_dir=None, workers=4, retries=3, backoff=1.0, timeout=25):
+        self.endpoint = endpoint or DEFAULT_ENDPOINT
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.session = make_session(retries, backoff, pool_size=self.workers)
+
+    def cache_path(self, query):
+        """Return the cache file of a query, or None without a cache folder."""
+        if not self.cache_dir:
+            return None
+        key = hashlib.blake2b(f"{self.endpoint}\n{query}".encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"overpass_{key}.json")
+
+    def query(self, query):
+        """
+        Run an Overpass query, or read its response from the cache.
+
+        Returns:
+            dict: The decoded JSON response.
+
+        Raises:
+            requests.HTTPError: If the server still answers with an error after the retries.
+        """
+        path = self.cache_path(query)
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        response = self.session.get(self.endpoint, params={"data": query}, timeout=self.timeout + 30)
+        response.raise_for_status()
+        data = response.json()
+
+        if path:
+            # Write to a temporary file first, so an interrupted write never leaves a broken cache entry
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(response.text)
+            os.replace(tmp_path, path)
+        return data
+
+    def fetch(self, bbox, tile_size=None):
+        """
+        Fetch the buildings of a bounding box, tile by tile.
+
+        Args:
+            bbox (tuple): Bounding box in the format (south, west, north, east).
+            tile_size (float): Maximum size of a tile in degrees (0 or None: a single query).
+
+        Returns:
+            dict: The merged Overpass response of all tiles.
+        """
+        queries = [building_query(tile, self.timeout) for tile in split_bbox(bbox, tile_size)]
+        if len(queries) == 1:
+            return self.query(queries[0])
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(queries))) as pool:
+            return merge_responses(pool.map(self.query, queries))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -106,6 +106,42 @@ class ADDON1_PT_Panel(bpy.types.Panel):
             col2 = split.column()
             col2.prop(props, "std_nfloor", text="")
 
+            row = box.row()
+            split = row.split(factor=0.75)
+            col1 = split.column()
+            col1.alignment = 'RIGHT'
+            col1.label(text="Random seed (0 = new seed)")
+            col2 = split.column()
+            col2.prop(props, "enrich_seed", text="")
+
+            layout.separator()
+
+            row = box.row()
+            split = row.split(factor=0.75)
+            col1 = split.column()
+            col1.alignment = 'RIGHT'
+            col1.label(text="Tile size [deg] (0 = single request)")
+            col2 = split.column()
+            col2.prop(props, "fetch_tile_size", text="")
+
+            row = box.row()
+            split = row.split(factor=0.75)
+            col1 = split.column()
+            col1.alignment = 'RIGHT'
+            col1.label(text="Concurrent requests")
+            col2 = split.column()
+            col2.prop(props, "fetch_workers", text="")
+
+            box.prop(props, "fetch_cache")
+
+
+        # Output format of the footprint file
+        row = layout.row()
+        split = row.split(factor=0.5)
+        col1 = split.column()
+        col1.label(text="Output format:")
+        col2 = split.column()
+        col2.prop(props, "footprint_format", text="")
 
         # Add the button for creating the geojson file
         layout.operator("generate.myop_operator", icon="FILE_NEW")
@@ -129,12 +165,28 @@ class ADDON2_PT_Panel(bpy.types.Panel):
 
         # Add the label in the first column
         col1 = split.column()
-        col1.label(text="Select GeoJSON File:")
+        col1.label(text="Select GeoJSON or .npz File:")
 
         # Add the property box and folder icon in the second column
         col2 = split.column(align=True)
         col2.prop(props, "file_path", text="")
 
+        # Row for the import mode
+        row = layout.row()
+        split = row.split(factor=0.5)
+        col1 = split.column()
+        col1.label(text="Import mode:")
+        col2 = split.column()
+        col2.prop(props, "import_mode", text="")
+
+        if props.import_mode == 'STREAM':
+            row = layout.row()
+            split = row.split(factor=0.5)
+            col1 = split.column()
+            col1.label(text="Chunk size:")
+            col2 = split.column()
+            col2.prop(props, "import_chunk_size", text="")
+
         layout.operator("import.open_file", icon="IMPORT")
 
 
@@ -190,6 +242,13 @@ class ADDON3_PT_Panel(bpy.types.Panel):
             col2 = split.column()
             col2.prop(obj.my_properties, "num_stories", text="")
 
+            # Results of the last simulation
+            layout.separator()
+            layout.label(text="Results of the last simulation:")
+            box = layout.box()
+            for name in ("peak_heating", "peak_cooling", "annual_heating", "annual_cooling"):
+                box.prop(obj.my_properties, name)
+
 
     @classmethod
     def poll(cls, context):
@@ -228,6 +287,71 @@ class ADDON4_PT_Panel(bpy.types.Panel):
         col2 = split.column(align=True)
         col2.prop(scene.my_addon_props, "bui_arch", text="")
 
+        #---# Number of worker processes for the simulation
+        row = layout.row()
+        split = row.split(factor=0.5)
+
+        col1 = split.column()
+        col1.alignment = 'RIGHT'
+        col1.label(text="Worker processes:")
+
+        col2 = split.column(align=True)
+        col2.prop(scene.my_addon_props, "sim_workers", text="")
+
+        #---# Where the simulation runs
+        row = layout.row()
+        split = row.split(factor=0.5)
+
+        col1 = split.column()
+        col1.alignment = 'RIGHT'
+        col1.label(text="Run simulation:")
+
+        col2 = split.column(align=True)
+        col2.prop(scene.my_addon_props, "sim_backend", text="")
+
+        #---# Number of buildings simulated between two updates of the interface
+        row = layout.row()
+        split = row.split(factor=0.5)
+
+        col1 = split.column()
+        col1.alignment = 'RIGHT'
+        col1.label(text="Buildings per step:")
+
+        col2 = split.column(align=True)
+        col2.prop(scene.my_addon_props, "sim_chunk_size", text="")
+
+        #---# Azimuth step of the solar irradiance cache
+        row = layout.row()
+        split = row.split(factor=0.5)
+
+        col1 = split.column()
+        col1.alignment = 'RIGHT'
+        col1.label(text="Solar azimuth step [deg]:")
+
+        col2 = split.column(align=True)
+        col2.prop(scene.my_addon_props, "poa_azimuth_step", text="")
+
+        #---# Output format of the results
+        row = layout.row()
+        split = row.split(factor=0.5)
+
+        col1 = split.column()
+        col1.alignment = 'RIGHT'
+        col1.label(text="Output format:")
+
+        col2 = split.column(align=True)
+        col2.prop(scene.my_addon_props, "output_format", text="")
+
+        if scene.my_addon_props.output_format != 'CSV':
+            layout.prop(scene.my_addon_props, "output_float32")
+
+        layout.prop(scene.my_addon_props, "save_building_loads")
+        layout.prop(scene.my_addon_props, "save_district_summary")
+
+        layout.prop(scene.my_addon_props, "use_result_cache")
+        if scene.my_addon_props.use_result_cache:
+            layout.prop(scene.my_addon_props, "result_cache_size")
+
         # Display the button to start simulation
         layout.operator("calculate.myop_operator")
 
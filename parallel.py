@@ -0,0 +1,259 @@
+"""
+Parallel simulation of buildings on a process pool.
+
+Buildings are independent, so they are split into chunks and simulated by
+engine.simulate on a configurable ProcessPoolExecutor. The weather, solar-position
+and schedule arrays are copied once into shared memory and read by every worker
+without pickling, and the workers write their loads straight into a shared output
+matrix, in the same order as the input buildings. With a sink (see results.ResultWriter),
+each chunk's loads are instead handed to the sink as soon as the chunk completes.
+A `SimulationPool` keeps the worker processes for several calls. The number of workers
+is capped at the number of CPUs, and districts too small to repay the start of the
+workers are simulated in the calling process (see `worker_count`).
+"""
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+import numpy as np
+
+from . import engine
+from .weather import POA_CACHE, PoaCache, weather_key
+from .schedules import SCHEDULES, USAGE_GAINS
+
+# Shared arrays attached by each worker process (see `_init_worker`)
+_worker_state = {}
+
+# Below this number of buildings, starting worker processes takes longer than simulating in process
+MIN_PARALLEL_BUILDINGS = 500
+
+
+def worker_count(workers=None, n_buildings=None):
+    """
+    Return the number of worker processes to use: `workers` (default: number of CPUs) capped
+    at the number of CPUs, or 1 (simulate in the calling process) for fewer than
+    MIN_PARALLEL_BUILDINGS buildings.
+    """
+    cpus = os.cpu_count() or 1
+    if n_buildings is not None and n_buildings < MIN_PARALLEL_BUILDINGS:
+        return 1
+    return max(1, min(workers or cpus, cpus))
+
+
+def _attach(name):
+    # Workers only attach: the parent process owns (and unlinks) the block
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArrays:
+    """
+    Copy a dict of float arrays into a single shared memory block.
+
+    `spec` is a small picklable description of the block that worker processes pass
+    to `SharedArrays.attach` to get NumPy views on the same memory.
+    """
+
+    def __init__(self, arrays):
+        layout = {}
+        offset = 0
+        for key, value in arrays.items():
+            value = np.asarray(value, dtype=float)
+            layout[key] = (offset, value.shape)
+            offset += value.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.spec = (self.shm.name, layout)
+        self.arrays = self._views(self.shm, layout)
+        for key, value in arrays.items():
+            self.arrays[key][...] = value
+
+    @staticmethod
+    def _views(shm, layout):
+        return {key: np.ndarray(shape, dtype=float, buffer=shm.buf, offset=offset)
+                for key, (offset, shape) in layout.items()}
+
+    @classmethod
+    def attach(cls, spec):
+        """Return the shared memory block described by `spec` and a dict of views on it."""
+        name, layout = spec
+        shm = _attach(name)
+        return shm, cls._views(shm, layout)
+
+    def close(self):
+        """Release the views and free the shared memory block."""
+        self.arrays = {}
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _init_worker(weather_spec, weather_scalars, loads_spec, schedules_spec, azimuth_step):
+    POA_CACHE.azimuth_step = azimuth_step
+    weather_shm, weather = SharedArrays.attach(weather_spec)
+    schedules_shm, schedules = SharedArrays.attach(schedules_spec)
+    weather.update(weather_scalars)
+    SCHEDULES.preload(schedules)
+    _worker_state.update(shm=(weather_shm, schedules_shm), weather=weather, loads=None)
+    if loads_spec is not None:
+        loads_shm, loads = SharedArrays.attach(loads_spec)
+        _worker_state.update(shm=(weather_shm, schedules_shm, loads_shm), loads=loads["loads"])
+
+
+def _simulate_chunk(start, horizontal_areas, heights, facade_areas, usages, constructions, backend, schedule_gains):
+    loads, parameters = engine.simulate(horizontal_areas, heights, facade_areas, usages, constructions,
+                                        _worker_state["weather"], mode="batch", batch_size=len(horizontal_areas),
+                                        backend=backend, schedule_gains=schedule_gains)
+    if _worker_state["loads"] is None:
+        # Streaming: the loads go back to the parent process, which hands them to its sink
+        return start, parameters, loads
+    _worker_state["loads"][start:start+len(horizontal_areas)] = loads
+    return start, parameters, None
+
+
+class SimulationPool:
+    """
+    Pool of worker processes that share the weather and simulate buildings over several calls.
+
+    Starting worker processes takes time, so callers that simulate the buildings a chunk at a
+    time (see pipeline.SimulationRun) keep one pool for the whole run.
+
+    Args:
+        weather (dict): Weather data, as returned by weather.load_weather.
+        workers (int): Number of worker processes (default and maximum: number of CPUs).
+        backend (str): Backend of the hourly recurrence, see kernels.resolve_backend.
+        azimuth_step (float): Azimuth quantization of the plane-of-array cache of the workers
+                              (default: the one of weather.POA_CACHE).
+        schedule_gains (bool): Use the schedule-based internal gains, see engine.simulate.
+        rows (int): Number of rows of the shared loads matrix that `simulate` fills when it is
+                    called without a sink (0: always call it with a sink).
+    """
+
+    def __init__(self, weather, workers=None, backend="auto", azimuth_step=None, schedule_gains=False, rows=0):
+        if azimuth_step is None:
+            azimuth_step = POA_CACHE.azimuth_step
+        self.weather = weather
+        self.workers = worker_count(workers)
+        self.backend = backend
+        self.schedule_gains = schedule_gains
+
+        weather_key(weather)
+        weather_arrays = {key: value for key, value in weather.items() if isinstance(value, np.ndarray)}
+        weather_scalars = {key: value for key, value in weather.items() if key not in weather_arrays}
+
+        # Internal-gain profiles, read once here and shared with the workers
+        schedule_arrays = {usage: SCHEDULES.gain_per_m2(usage) for usage in USAGE_GAINS} if schedule_gains else {}
+
+        self.shared = [SharedArrays(weather_arrays), SharedArrays(schedule_arrays), SharedArrays({"loads": np.zeros((rows, engine.HOURS))})]
+        shared_weather, shared_schedules, shared_loads = self.shared
+        self.loads = shared_loads.arrays["loads"]
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                        initargs=(shared_weather.spec, weather_scalars, shared_loads.spec if rows else None,
+                                                  shared_schedules.spec, azimuth_step))
+
+    def simulate(self, horizontal_areas, heights, facade_areas, usages, constructions, weather=None, sink=None, chunk_size=None,
+                 schedule_gains=None):
+        """
+        Simulate a set of buildings on the pool.
+
+        Args:
+            horizontal_areas, heights, facade_areas, usages, constructions: Same as engine.simulate.
+            weather (dict): Must be the weather of the pool if given (accepted, like `schedule_gains`,
+                            so that the pool can stand in for engine.simulate, e.g. in
+                            cache.simulate_cached).
+            sink: Object with a `write(start, loads)` method (e.g. results.ResultWriter) that
+                  receives the loads of each chunk as soon as it completes, in completion order.
+                  Without it, the loads are written into the first rows of the shared loads matrix.
+            chunk_size (int): Number of buildings per task (default: about four tasks per worker,
+                              at most 1024 buildings).
+            schedule_gains (bool): Must be the option of the pool if given.
+
+        Returns:
+            tuple: Loads array of shape (n_buildings, 8760) [W], in the order of the input
+                   buildings (None with a `sink`), and the list of building parameters.
+        """
+        if weather is not None and weather is not self.weather:
+            raise ValueError("The weather of the simulation differs from the weather of the pool.")
+        if schedule_gains is not None and schedule_gains != self.schedule_gains:
+            raise ValueError("The internal gains of the simulation differ from the ones of the pool.")
+        n = len(horizontal_areas)
+        if sink is None and n > len(self.loads):
+            raise ValueError(f"The shared loads matrix has {len(self.loads)} rows, {n} buildings cannot be simulated without a sink.")
+        if chunk_size is None:
+            chunk_size = min(1024, max(1, math.ceil(n / (self.workers*4))))
+
+        parameters = [None]*n
+        futures = {self.pool.submit(_simulate_chunk, start,
+                                    horizontal_areas[start:start+chunk_size], heights[start:start+chunk_size],
+                                    facade_areas[start:start+chunk_size], usages[start:start+chunk_size],
+                                    constructions[start:start+chunk_size], self.backend, self.schedule_gains)
+                   for start in range(0, n, chunk_size)}
+        try:
+            for future in as_completed(futures):
+                start, chunk_parameters, chunk_loads = future.result()
+                parameters[start:start+len(chunk_parameters)] = chunk_parameters
+                if sink is not None:
+                    sink.write(start, chunk_loads)
+                # Drop the finished future so the loads it holds can be freed
+                futures.discard(future)
+                del future, chunk_loads
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return (self.loads[:n].copy() if sink is None else None), parameters
+
+    def close(self):
+        """ Stop the worker processes and free the shared memory. """
+        self.pool.shutdown()
+        for shared in self.shared:
+            shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def simulate_parallel(horizontal_areas, heights, facade_areas, usages, constructions, weather,
+                      workers=None, chunk_size=None, backend="auto", azimuth_step=None, schedule_gains=False,
+                      sink=None):
+    """
+    Simulate a set of buildings on a pool of worker processes.
+
+    Args:
+        horizontal_areas, heights, facade_areas, usages, constructions, weather:
+            Same as engine.simulate.
+        workers (int): Number of worker processes (default and maximum: number of CPUs); with
+                       fewer than MIN_PARALLEL_BUILDINGS buildings, they are simulated in this
+                       process instead.
+        chunk_size (int): Number of buildings per task (default: about four tasks per worker,
+                          at most 1024 buildings).
+        backend (str): Backend of the hourly recurrence, see kernels.resolve_backend.
+        azimuth_step (float): Azimuth quantization of the plane-of-array cache of the workers
+                              (default: the one of weather.POA_CACHE).
+        schedule_gains (bool): Use the schedule-based internal gains, see engine.simulate.
+        sink: Object with a `write(start, loads)` method (e.g. results.ResultWriter) that
+              receives the loads of each chunk as soon as it completes, in completion order.
+              No shared loads matrix is allocated then.
+
+    Returns:
+        tuple: Loads array of shape (n_buildings, 8760) [W], in the order of the input
+               buildings (None with a `sink`), and the list of building parameters.
+    """
+    if worker_count(workers, len(horizontal_areas)) == 1:
+        poa_cache = POA_CACHE if azimuth_step is None else PoaCache(azimuth_step)
+        return engine.simulate(horizontal_areas, heights, facade_areas, usages, constructions, weather, mode="batch",
+                               backend=backend, poa_cache=poa_cache, schedule_gains=schedule_gains, sink=sink)
+    with SimulationPool(weather, workers, backend, azimuth_step, schedule_gains,
+                        rows=len(horizontal_areas) if sink is None else 0) as pool:
+        return pool.simulate(horizontal_areas, heights, facade_areas, usages, constructions,
+                             sink=sink, chunk_size=chunk_size)
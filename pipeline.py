@@ -0,0 +1,205 @@
+"""
+Simulation of a set of buildings into the output files.
+
+`SimulationRun` holds the inputs and the output sinks of one simulation and runs it either
+at once or one chunk of buildings at a time, so that its caller (the modal operator, the
+worker process of worker.py) can report progress and stop between two chunks. The
+buildings completed when a run stops are written out. `simulate_district` runs the whole
+chain on a footprint file, without Blender (see __main__.py). Nothing here depends on bpy.
+"""
+import os
+import time
+import numpy as np
+
+from .engine import simulate, parameter_row
+from .parallel import SimulationPool, worker_count
+from .kernels import resolve_backend
+from .results import ResultWriter, OffsetSink, resolve_format, write_parameters
+from .aggregates import DistrictAggregator
+from .cache import ResultCache, simulate_cached
+from .archetypes import get_registry
+from .footprints import read_footprints, buildings_from_footprints, MIN_FOOTPRINT_AREA
+from .weather import load_weather, POA_CACHE
+
+# Per-building inputs of a simulation, in the order of engine.simulate
+BUILDING_INPUTS = ("horizontal_areas", "heights", "facade_areas", "usages", "constructions")
+
+# Per-building results returned by `SimulationRun.results`
+RESULT_COLUMNS = ("peak_heating", "peak_cooling", "energy_heating", "energy_cooling")
+
+
+class SimulationRun:
+    """
+    Simulation of a set of buildings into the output files.
+
+    Args:
+        buildings (dict): Names of the buildings and their inputs (`BUILDING_INPUTS`).
+        weather (dict): Weather data, as returned by weather.load_weather.
+        out_dir (str): Output folder.
+        output_format (str): Output format of the loads, see results.write_results.
+        float32 (bool): Store the loads of the binary formats as float32.
+        save_building_loads (bool): Write the hourly loads of every building.
+        save_district_summary (bool): Write the district aggregates (see aggregates.py).
+        workers (int): Number of worker processes (1: simulate in this process), capped at the
+                       number of CPUs; small districts are always simulated in this process
+                       (see parallel.worker_count).
+        chunk_size (int): Number of buildings per worker simulated by each `step`.
+        cache (ResultCache): Optional cache of the results of single buildings.
+    """
+
+    def __init__(self, buildings, weather, out_dir, output_format="csv", float32=False,
+                 save_building_loads=True, save_district_summary=True, workers=1, chunk_size=256, cache=None):
+        self.names = list(buildings["names"])
+        self.buildings = [buildings[key] for key in BUILDING_INPUTS]
+        self.weather = weather
+        self.out_dir = out_dir
+        self.output_format = resolve_format(output_format)
+        self.save_district_summary = save_district_summary
+        self.workers = worker_count(workers, len(self.names))
+        self.chunk_size = chunk_size*self.workers
+        self.cache = cache
+
+        #The loads of each batch are streamed to a memory-mapped matrix in the output folder as soon as they are computed,
+        #and the district aggregates (which also give the results of each building) are updated on the way
+        self.writer = ResultWriter(out_dir, self.names, self.output_format, float32) if save_building_loads else None
+        self.aggregator = DistrictAggregator(self.names, sink=self.writer)
+
+        self.pool = None
+        self.parameters = []
+        self.hits = 0
+        self.started = time.perf_counter()
+
+    @property
+    def count(self):
+        """ Number of buildings. """
+        return len(self.names)
+
+    @property
+    def done(self):
+        """ Number of buildings simulated so far. """
+        return len(self.parameters)
+
+    def simulate(self, buildings, sink):
+        """ Simulate some of the buildings into `sink` and return their parameters. """
+        if self.workers > 1:
+            # The worker processes are started once and kept for all the chunks
+            if self.pool is None:
+                self.pool = SimulationPool(self.weather, self.workers)
+            options = {"simulate": self.pool.simulate}
+        else:
+            options = {"simulate": simulate, "mode": "batch"}
+        if self.cache is not None:
+            #Only the buildings whose inputs changed since an earlier run are simulated
+            _, parameters, hits = simulate_cached(*buildings, self.weather, self.cache, sink=sink, **options)
+            self.hits += hits
+            return parameters
+        run = options.pop("simulate")
+        return run(*buildings, self.weather, sink=sink, **options)[1]
+
+    def run(self):
+        """ Simulate all the buildings at once. """
+        self.parameters = self.simulate(self.buildings, self.aggregator)
+
+    def step(self):
+        """ Simulate the next chunk of buildings and return the number of buildings done. """
+        start = self.done
+        chunk = slice(start, start+self.chunk_size)
+        self.parameters.extend(self.simulate([values[chunk] for values in self.buildings], OffsetSink(self.aggregator, start)))
+        return self.done
+
+    def save(self):
+        """
+        Write the hourly loads, the building parameters and the district aggregates of the
+        buildings simulated so far (all of them after a complete run).
+        """
+        self.close_pool()
+        count = self.done
+        if self.cache is not None:
+            print(f"{self.hits} of {count} buildings served from the result cache")
+        print(f"Calculation for {count} of {self.count} buildings completed in {time.perf_counter() - self.started:.1f} s ({resolve_backend()} kernel)")
+
+        all_buildings_parameters = [parameter_row(params) for params in self.parameters]  # For building parameters
+
+        # Save the hourly loads and the building parameters
+        if self.writer is not None:
+            output_file_loads, output_file_parameters = self.writer.finish(all_buildings_parameters, count)
+            print(f"All building data saved to: {output_file_loads}")
+        else:
+            output_file_parameters = write_parameters(self.out_dir, self.names[:count], all_buildings_parameters, self.output_format)
+        print(f"Building parameters saved to: {output_file_parameters}")
+
+        # Save the district aggregates
+        if self.save_district_summary:
+            summary_file, hourly_file = self.aggregator.save(self.out_dir, count)
+            print(f"District summary saved to: {summary_file} and {hourly_file}")
+
+    def close_pool(self):
+        """ Stop the worker processes. """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def close(self):
+        """ Stop the worker processes and release the output files after a failed run. """
+        self.close_pool()
+        if self.writer is not None:
+            self.writer.close()
+
+    def results(self):
+        """
+        Return the results of the buildings simulated so far: peak heating and cooling
+        demands [W] and annual heating and cooling demands [Wh], shape (n_done, 4).
+        """
+        aggregator = self.aggregator
+        return np.column_stack([getattr(aggregator, column)[:self.done] for column in RESULT_COLUMNS])
+
+
+def simulate_district(footprints_file, epw_file, archetype, out_dir, workers=1, azimuth_step=0.0,
+                      cache_size=None, min_area=MIN_FOOTPRINT_AREA, angle_tolerance=30, **options):
+    """
+    Simulate the buildings of a footprint file and write the output files of the add-on.
+
+    The footprints go through the same stages as in Blender: the buildings with a number of
+    levels and a large enough footprint are kept (as by the importer), their geometry is
+    computed from the footprints (footprints.buildings_from_footprints), their archetype is
+    matched and they are simulated with the weather of the EPW file.
+
+    Args:
+        footprints_file (str): GeoJSON or .npz footprint file (see footprints.read_footprints).
+        epw_file (str): Path to the .epw weather file.
+        archetype (str): Archetype region (e.g. 'DK'), see archetypes.ArchetypeRegistry.regions.
+        out_dir (str): Output folder (it also holds the preprocessed weather).
+        workers (int): Number of worker processes.
+        azimuth_step (float): Azimuth quantization of the plane-of-array irradiance [deg]
+                              (0: exact azimuths, see weather.PoaCache).
+        cache_size (int): Size limit of the result cache in out_dir/result_cache [bytes]
+                          (None: no result cache).
+        min_area (float): Minimum footprint area [m2].
+        angle_tolerance (float): Maximum difference in orientation to group façades [deg].
+        **options: Other options of `SimulationRun` (output_format, float32, ...).
+
+    Returns:
+        SimulationRun: The completed run.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    footprints = read_footprints(footprints_file)
+    buildings = buildings_from_footprints(footprints, min_area, angle_tolerance)
+    print(f"{len(buildings['names'])} of {len(footprints)} footprints are buildings to simulate")
+
+    #Match the archetype of every building
+    buildings["constructions"] = get_registry().assign(buildings["usages"], archetype, buildings["ages"])
+
+    #The preprocessed weather is cached in the output folder and reused on later runs
+    weather = load_weather(epw_file, cache_dir=out_dir)
+    POA_CACHE.azimuth_step = azimuth_step
+
+    cache = ResultCache(os.path.join(out_dir, "result_cache"), max_bytes=cache_size) if cache_size else None
+    run = SimulationRun(buildings, weather, out_dir, workers=workers, cache=cache, **options)
+    try:
+        run.run()
+    except BaseException:
+        run.close()
+        raise
+    run.save()
+    return run
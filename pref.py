@@ -18,9 +18,15 @@ class saveLocFile(bpy.types.AddonPreferences):
         name="Google API key",
         subtype='NONE',
     )
+    overpass_url: StringProperty(
+        name="Overpass API endpoint",
+        subtype='NONE',
+        default="https://overpass-api.de/api/interpreter",
+    )
 
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "folder_path")
         layout.prop(self, "file_path")
         layout.prop(self, "google_path")
+        layout.prop(self, "overpass_url")
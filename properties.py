@@ -34,6 +34,12 @@ class MyPropertyGroup(bpy.types.PropertyGroup):
         set=set_num_stories,
     )
 
+    # Results of the last simulation of the building
+    peak_heating: bpy.props.FloatProperty(name="Peak heating load [kW]", description="Peak heating load of the last simulation", precision=1)
+    peak_cooling: bpy.props.FloatProperty(name="Peak cooling load [kW]", description="Peak cooling load of the last simulation", precision=1)
+    annual_heating: bpy.props.FloatProperty(name="Heating demand [kWh/y]", description="Annual heating demand of the last simulation", precision=0)
+    annual_cooling: bpy.props.FloatProperty(name="Cooling demand [kWh/y]", description="Annual cooling demand of the last simulation", precision=0)
+
     #Add property to search for the geojson file
 
 
@@ -103,6 +109,46 @@ class MyAddonProperties(bpy.types.PropertyGroup):
         precision=1
     )
 
+    enrich_seed: bpy.props.IntProperty(
+        name="Random seed",
+        description="Seed of the random values given to missing ages and numbers of stories (0 = new seed at every run; the seed used is saved in the output file)",
+        default=0,
+        min=0
+    )
+
+    fetch_tile_size: bpy.props.FloatProperty(
+        name="Tile size",
+        description="Large areas are split into tiles of this size (in degrees) fetched concurrently (0 = a single request)",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        precision=3
+    )
+
+    fetch_workers: bpy.props.IntProperty(
+        name="Concurrent requests",
+        description="Maximum number of tiles fetched at the same time",
+        default=4,
+        min=1,
+        max=16
+    )
+
+    fetch_cache: bpy.props.BoolProperty(
+        name="Cache downloads",
+        description="Keep the Overpass responses in the output folder and reuse them for the same area",
+        default=True
+    )
+
+    footprint_format: bpy.props.EnumProperty(
+        name= "",
+        description= "File format of the fetched building footprints",
+        items= [('NPZ', "Binary (.npz)", "Compact binary footprint file, fastest to write and import"),
+                ('GEOJSON', "GeoJSON", "GeoJSON file, readable by GIS tools"),
+                ('BOTH', "Binary + GeoJSON", "Write both files")
+        ],
+        default='GEOJSON'
+    )
+
     lon_min: bpy.props.FloatProperty(name="Min longitude", description="Minimum longitutide of the box containing the urban area", min=-180, max=180, default=(-122.280495), precision=4)
     lat_max: bpy.props.FloatProperty(name="Max latitude", description="Maximum latitude of the box containing the urban area", min=-90, max=90, default=(37.877737), precision=4)
     lon_max: bpy.props.FloatProperty(name="Max longitude", description="Maximum longitutide of the box containing the urban area", min=-180, max=180, default=(-122.279699), precision=4)
@@ -115,6 +161,98 @@ class MyAddonProperties(bpy.types.PropertyGroup):
         subtype="FILE_PATH"
     )
 
+    import_mode: bpy.props.EnumProperty(
+        name= "",
+        description= "How the buildings of the GeoJSON file are created",
+        items= [('BULK', "Bulk", "Create the meshes of all buildings at once (fast for large files)"),
+                ('STREAM', "Streaming", "Read the file and create the buildings in chunks (bounded memory for very large files)"),
+                ('STANDARD', "Standard", "Create the buildings one by one")
+        ],
+        default='BULK'
+    )
+
+    import_chunk_size: bpy.props.IntProperty(
+        name="Chunk size",
+        description="Number of buildings read and created at a time in streaming mode",
+        default=5000,
+        min=100,
+        max=1000000
+    )
+
+    sim_workers: bpy.props.IntProperty(
+        name="Worker processes",
+        description="Number of processes used to simulate the buildings in parallel, at most the number of CPUs (1 = run inside Blender; small districts always run in a single process)",
+        default=1,
+        min=1,
+        max=256
+    )
+
+    sim_backend: bpy.props.EnumProperty(
+        name="Run simulation",
+        description="Where the simulation started from the panel runs",
+        items=[('BLENDER', "Inside Blender", "Simulate the buildings in Blender's process, a chunk at a time between interface updates"),
+               ('PROCESS', "Separate process", "Simulate the buildings in a separate Python process, so Blender stays fully responsive")],
+        default='BLENDER'
+    )
+
+    sim_chunk_size: bpy.props.IntProperty(
+        name="Buildings per step",
+        description="Number of buildings simulated between two updates of the interface when the simulation is started from the panel",
+        default=256,
+        min=1
+    )
+
+    poa_azimuth_step: bpy.props.FloatProperty(
+        name="Azimuth step",
+        description="Exact solar irradiance of every façade orientation (0), or a faster approximation where façades whose orientation differs by less than this angle share the same irradiance calculation",
+        default=0.0,
+        min=0.0,
+        max=45.0,
+        precision=1
+    )
+
+    output_format: bpy.props.EnumProperty(
+        name= "",
+        description= "File format of the hourly loads and building parameters",
+        items= [('CSV', "CSV", "Semicolon-separated text files"),
+                ('PARQUET', "Parquet", "Compressed columnar file (needs pyarrow, .npy otherwise)"),
+                ('FEATHER', "Feather", "Uncompressed columnar file, fastest to read (needs pyarrow, .npy otherwise)"),
+                ('NPY', "NumPy (.npy)", "Raw loads matrix with a JSON header")
+        ],
+        default='CSV'
+    )
+
+    output_float32: bpy.props.BoolProperty(
+        name="Single precision",
+        description="Store the loads of the binary formats as 32-bit floats (half the size)",
+        default=False
+    )
+
+    save_building_loads: bpy.props.BoolProperty(
+        name="Save building loads",
+        description="Write the hourly loads of every building (disable for very large districts when only the district aggregates are needed)",
+        default=True
+    )
+
+    save_district_summary: bpy.props.BoolProperty(
+        name="Save district summary",
+        description="Write the hourly district heating and cooling demands, peaks and load-duration curves",
+        default=True
+    )
+
+    use_result_cache: bpy.props.BoolProperty(
+        name="Reuse unchanged results",
+        description="Keep the results of every building in the output folder and simulate again only the buildings whose inputs changed",
+        default=False
+    )
+
+    result_cache_size: bpy.props.IntProperty(
+        name="Result cache size [MB]",
+        description="Maximum size of the result cache; the least recently used results are deleted beyond it",
+        default=2048,
+        min=10
+    )
+
     bui_arch: bpy.props.EnumProperty(
         name= "",
         description= "Building archetype",
@@ -0,0 +1,262 @@
+"""
+Output of the simulation results.
+
+The hourly loads are written with one column per building, in one of several backends:
+the semicolon-separated CSV files of the add-on (default), Parquet or Feather when pyarrow
+is installed, or a raw .npy matrix with a JSON header otherwise. The binary backends can
+store the loads as float32 to halve their size.
+
+During a simulation, `ResultWriter` receives the loads of each batch of buildings as soon
+as they are computed and stores them in a memory-mapped matrix on disk, so memory use does
+not grow with the number of buildings; the files are converted block by block at the end.
+Nothing here depends on bpy.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .engine import HOURS, PARAMETER_LABELS
+
+# Output formats, and the ones that can be written in this environment
+OUTPUT_FORMATS = ("csv", "parquet", "feather", "npy")
+AVAILABLE_FORMATS = OUTPUT_FORMATS if pyarrow is not None else ("csv", "npy")
+
+# Base name of the output files
+LOADS_FILE = "All_Buildings_Loads"
+PARAMETERS_FILE = "All_Buildings_Parameters"
+
+# Number of hours converted at a time from the memory-mapped loads to the output file
+HOUR_BLOCK = 730
+
+
+def resolve_format(output_format="csv"):
+    """
+    Return the output format that will be written.
+
+    Parquet and Feather need pyarrow: without it they fall back to 'npy'.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    output_format = output_format.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'. Must be one of {OUTPUT_FORMATS}.")
+    if output_format not in AVAILABLE_FORMATS:
+        print(f"Output format '{output_format}' needs pyarrow, which is not installed: writing 'npy' instead.")
+        return "npy"
+    return output_format
+
+
+def loads_frame(names, loads, dtype=float, hours=None):
+    """
+    Return the hourly loads as a DataFrame with the hour of the year and one column per building.
+
+    Args:
+        names (list): Name of each building.
+        loads (numpy.ndarray): Hourly loads [W], shape (n_buildings, n_hours).
+        dtype: Type of the load columns.
+        hours (numpy.ndarray): Hours of the year of the columns of `loads` (default: 1 to 8760).
+    """
+    columns = {"Hour of Year": np.arange(1, HOURS+1) if hours is None else hours}
+    columns.update(zip(names, np.asarray(loads, dtype=dtype)))
+    return pd.DataFrame(columns, copy=False)
+
+
+def parameters_frame(names, parameters):
+    """ Return the rounded building parameters (see engine.parameter_row) as a DataFrame. """
+    return pd.DataFrame(parameters, index=pd.Index(names, name="Building"), columns=PARAMETER_LABELS)
+
+
+def write_results(out_dir, names, loads, parameters, output_format="csv", float32=False):
+    """
+    Write the hourly loads and the building parameters.
+
+    Args:
+        out_dir (str): Output folder.
+        names (list): Name of each building.
+        loads (numpy.ndarray): Hourly loads [W], shape (n_buildings, 8760); may be memory-mapped,
+                               it is read in blocks of `HOUR_BLOCK` hours.
+        parameters (list): Rounded parameters of each building (engine.parameter_row).
+        output_format (str): 'csv' (loads rounded to W, ';' separator), 'parquet', 'feather'
+                             or 'npy' (see `resolve_format`).
+        float32 (bool): Store the loads of the binary formats as float32 instead of float64.
+
+    Returns:
+        tuple: Paths of the loads file and of the parameters file.
+    """
+    output_format = resolve_format(output_format)
+    dtype = np.float32 if float32 else np.float64
+    os.makedirs(out_dir, exist_ok=True)
+    loads_file = os.path.join(out_dir, f"{LOADS_FILE}.{output_format}")
+    write_loads(loads_file, output_format, names, loads, dtype)
+    return loads_file, write_parameters(out_dir, names, parameters, output_format)
+
+
+def write_loads(loads_file, output_format, names, loads, dtype=np.float64):
+    """ Write the hourly loads to a file of the given format, `HOUR_BLOCK` hours at a time. """
+    hours = np.arange(1, HOURS+1)
+    blocks = range(0, HOURS, HOUR_BLOCK)
+
+    if output_format == "csv":
+        with open(loads_file, 'w', newline='') as f:
+            for start in blocks:
+                block = np.rint(loads[:, start:start+HOUR_BLOCK]).astype(np.int64)
+                loads_frame(names, block, np.int64, hours[start:start+HOUR_BLOCK]).to_csv(
+                    f, sep=';', index=False, header=(start == 0))
+
+    elif output_format in ("parquet", "feather"):
+        schema = pyarrow.schema([("Hour of Year", pyarrow.int64())]
+                                + [(name, pyarrow.from_numpy_dtype(dtype)) for name in names])
+        if output_format == "parquet":
+            writer = pyarrow.parquet.ParquetWriter(loads_file, schema)
+        else:
+            writer = pyarrow.ipc.new_file(loads_file, schema)
+        with writer:
+            for start in blocks:
+                columns = [hours[start:start+HOUR_BLOCK]] + list(np.asarray(loads[:, start:start+HOUR_BLOCK], dtype=dtype))
+                writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+
+    else:
+        # A ResultWriter matrix is already the output file (its header lists the buildings written)
+        if not (isinstance(loads, np.memmap) and os.path.abspath(loads.filename) == os.path.abspath(loads_file)):
+            # Raw matrix, one row per building (each building's year is contiguous)
+            matrix = np.lib.format.open_memmap(loads_file, mode='w+', dtype=dtype, shape=(len(names), HOURS))
+            for start in blocks:
+                matrix[:, start:start+HOUR_BLOCK] = loads[:, start:start+HOUR_BLOCK]
+            matrix.flush()
+            del matrix
+        write_header(loads_file, names, dtype)
+
+
+def write_parameters(out_dir, names, parameters, output_format="csv"):
+    """ Write the building parameters (as CSV for the 'csv' and 'npy' formats) and return the file path. """
+    params = parameters_frame(names, parameters)
+    if output_format in ("parquet", "feather"):
+        parameters_file = os.path.join(out_dir, f"{PARAMETERS_FILE}.{output_format}")
+        if output_format == "parquet":
+            params.reset_index().to_parquet(parameters_file, index=False)
+        else:
+            params.reset_index().to_feather(parameters_file)
+    else:
+        parameters_file = os.path.join(out_dir, f"{PARAMETERS_FILE}.csv")
+        params.to_csv(parameters_file, sep=';', index_label="Building")
+    return parameters_file
+
+
+class ResultWriter:
+    """
+    Streaming sink of the hourly loads of a simulation.
+
+    The loads are written into a preallocated memory-mapped .npy matrix in the output folder
+    as each batch of buildings completes (see engine.simulate), so nothing but the current
+    batch is held in memory. `finish` writes the output files: for the 'npy' format the
+    matrix is the output file itself, the other formats are converted from it block by block
+    and the temporary matrix is removed. After a crash, the buildings already simulated are
+    in the matrix file.
+
+    Args:
+        out_dir (str): Output folder.
+        names (list): Name of each building.
+        output_format (str): Output format, see `write_results`.
+        float32 (bool): Store the loads as float32 instead of float64.
+    """
+
+    def __init__(self, out_dir, names, output_format="csv", float32=False):
+        self.out_dir = out_dir
+        self.names = list(names)
+        self.output_format = resolve_format(output_format)
+        self.dtype = np.float32 if float32 else np.float64
+        os.makedirs(out_dir, exist_ok=True)
+
+        suffix = "npy" if self.output_format == "npy" else "partial.npy"
+        self.path = os.path.join(out_dir, f"{LOADS_FILE}.{suffix}")
+        self.loads = np.lib.format.open_memmap(self.path, mode='w+', dtype=self.dtype, shape=(len(self.names), HOURS))
+
+    def write(self, start, loads):
+        """ Store the hourly loads [W] of the buildings `start` to `start + len(loads)`. """
+        self.loads[start:start+len(loads)] = loads
+
+    def finish(self, parameters, count=None):
+        """
+        Write the output files.
+
+        Args:
+            parameters (list): Rounded parameters of each building (engine.parameter_row).
+            count (int): Write only the first `count` buildings (e.g. the ones completed before
+                         a run was cancelled); default: all of them.
+
+        Returns:
+            tuple: Paths of the loads file and of the parameters file.
+        """
+        count = len(self.names) if count is None else count
+        self.loads.flush()
+        loads_file = os.path.join(self.out_dir, f"{LOADS_FILE}.{self.output_format}")
+        write_loads(loads_file, self.output_format, self.names[:count], self.loads[:count], self.dtype)
+        parameters_file = write_parameters(self.out_dir, self.names[:count], parameters[:count], self.output_format)
+        self.close(remove=self.path != loads_file)
+        return loads_file, parameters_file
+
+    def close(self, remove=False):
+        """ Release the memory-mapped matrix, and delete its file if `remove`. """
+        if self.loads is not None:
+            self.loads.flush()
+            self.loads = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class OffsetSink:
+    """
+    Sink that shifts the buildings it receives by `offset` before passing them to `sink`, to
+    simulate a slice of the buildings (starting at `offset`) into the sink of all of them.
+    """
+
+    def __init__(self, sink, offset):
+        self.sink = sink
+        self.offset = offset
+
+    def write(self, start, loads):
+        self.sink.write(self.offset + start, loads)
+
+
+def write_header(loads_file, names, dtype):
+    """ Write the JSON header that describes a .npy loads matrix (next to it, with a .json extension). """
+    header = {
+        "shape": [len(names), HOURS],
+        "dtype": np.dtype(dtype).name,
+        "layout": "building x hour",
+        "units": "W",
+        "buildings": list(names),
+    }
+    with open(os.path.splitext(loads_file)[0] + ".json", 'w') as f:
+        json.dump(header, f)
+
+
+def read_loads(loads_file):
+    """
+    Read hourly loads written by `write_results`, whatever the format.
+
+    Returns:
+        tuple: Names of the buildings and loads array of shape (n_buildings, 8760) [W].
+    """
+    extension = os.path.splitext(loads_file)[1].lower()
+    if extension == ".npy":
+        with open(os.path.splitext(loads_file)[0] + ".json", 'r') as f:
+            header = json.load(f)
+        return header["buildings"], np.load(loads_file, mmap_mode='r')[:len(header["buildings"])]
+    if extension == ".csv":
+        df = pd.read_csv(loads_file, sep=';')
+    elif extension == ".parquet":
+        df = pd.read_parquet(loads_file)
+    else:
+        df = pd.read_feather(loads_file)
+    df = df.drop(columns="Hour of Year")
+    return list(df.columns), df.to_numpy().T
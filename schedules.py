@@ -0,0 +1,98 @@
+"""
+Internal-gain profiles per usage class.
+
+The occupancy, lighting and equipment schedules of each usage are read once from the
+CSV files in utilities/ and combined into a single hourly gain per m2 of floor area,
+so the internal gains of a building are one multiplication by its floor area.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+addon_dir = os.path.dirname(os.path.realpath(__file__))
+
+# Schedule file, column prefix and specific gains of each usage
+USAGE_GAINS = {
+    "RES_1": {
+        "file": "RES_SCH.csv",
+        "prefix": "RES",
+        "m2_person": 35,    #m2 per person
+        "q_person": 120,    #heat load from occupants per person
+        "q_light": 3.88,    #heat load from lighting per m2
+        "q_equip": 5.38,    #heat load from equipment per m2
+    },
+    "COM_1": {
+        "file": "COM_SHC.csv",
+        "prefix": "COM",
+        "m2_person": 18,
+        "q_person": 120,
+        "q_light": 10.76,
+        "q_equip": 10.76,
+    },
+}
+
+
+class ScheduleStore:
+    """
+    Hourly internal gains per m2 of floor area of each usage, loaded on first use.
+
+    Args:
+        schedule_dir (str): Folder of the schedule CSV files (default: utilities/ of the add-on).
+    """
+
+    def __init__(self, schedule_dir=None):
+        self.schedule_dir = schedule_dir or os.path.join(addon_dir, "utilities")
+        self._gains = {}
+
+    def profiles(self, usage):
+        """
+        Read the occupancy, lighting and equipment schedules of a usage.
+
+        Returns:
+            dict: The hourly fractions under "OCC", "LIGHT" and "EQP".
+        """
+        spec = USAGE_GAINS[usage]
+        columns = {kind: f"{spec['prefix']}_{kind}_SCH" for kind in ("OCC", "LIGHT", "EQP")}
+        df = pd.read_csv(os.path.join(self.schedule_dir, spec["file"]), usecols=list(columns.values()))
+        return {kind: df[column].to_numpy(dtype=float) for kind, column in columns.items()}
+
+    def gain_per_m2(self, usage):
+        """
+        Return the hourly internal gains [W/m2] of a usage (occupants + lighting + equipment).
+        The array is shared and read-only.
+        """
+        if usage not in self._gains:
+            spec = USAGE_GAINS[usage]
+            profiles = self.profiles(usage)
+            self.preload({usage: profiles["OCC"]*spec["q_person"]/spec["m2_person"]
+                                 + profiles["LIGHT"]*spec["q_light"]
+                                 + profiles["EQP"]*spec["q_equip"]})
+        return self._gains[usage]
+
+    def preload(self, gains):
+        """Set the hourly gains [W/m2] of some usages, e.g. arrays shared by another process."""
+        for usage, gain in gains.items():
+            gain = np.asarray(gain, dtype=float)
+            gain.flags.writeable = False
+            self._gains[usage] = gain
+
+    def gains(self, usages, floor_areas):
+        """
+        Return the hourly internal gains [W] of a set of buildings.
+
+        Args:
+            usages (list): Usage of each building ('RES_1' or 'COM_1').
+            floor_areas (array-like): Total floor area of each building [m2].
+
+        Returns:
+            numpy.ndarray: Internal gains of shape (n_buildings, 8760).
+        """
+        classes, index = np.unique(np.asarray(usages, dtype=str), return_inverse=True)
+        table = np.stack([self.gain_per_m2(usage) for usage in classes]) if len(classes) else np.zeros((0, 8760))
+        gains = table[index.reshape(-1)]
+        gains *= np.asarray(floor_areas, dtype=float)[:, None]
+        return gains
+
+
+# Store used by default by the simulation engine
+SCHEDULES = ScheduleStore()
@@ -0,0 +1,48 @@
+"""
+The façade geometry computed from the footprints (headless runs, see pipeline.py) must
+match the one of the meshes created by the importer (see functions.extract_geometry).
+"""
+import numpy as np
+
+from ..footprints import footprint_geometry, extrusion_arrays
+from ..geometry import building_surfaces
+
+# Trapezoidal footprint, clockwise, with the closing point removed: the façades face West,
+# North, East-North-East (the slanted side) and South
+CLOCKWISE_RING = np.array([[0.0, 0.0], [0.0, 20.0], [10.0, 20.0], [20.0, 0.0]])
+
+
+def mesh_geometry(xy, offsets, heights):
+    # Same computation as functions.extract_geometry, on the arrays of functions.create_buildings
+    arrays = extrusion_arrays(xy, offsets, heights)
+    coords = arrays["co"][arrays["vertex_index"]]
+    owners = np.repeat(np.arange(len(heights)), np.diff(arrays["polygon_offsets"]))
+    loop_starts = arrays["loop_start"] + np.repeat(arrays["loop_offsets"][:-1], np.diff(arrays["polygon_offsets"]))
+    return building_surfaces(coords, loop_starts, arrays["loop_total"], owners, len(heights))
+
+
+def test_clockwise_footprint_geometry_matches_mesh():
+    offsets = np.array([0, len(CLOCKWISE_RING)])
+    heights = np.array([9.0])
+
+    expected = footprint_geometry(CLOCKWISE_RING, offsets, heights)
+    horizontal_areas, facade_areas = mesh_geometry(CLOCKWISE_RING, offsets, heights)
+
+    assert np.allclose(horizontal_areas, expected["area"])
+    assert facade_areas[0].keys() == expected["facade_areas"][0].keys()
+    for azimuth, area in expected["facade_areas"][0].items():
+        assert np.isclose(facade_areas[0][azimuth], area)
+    # The wall along x = 0 faces West
+    assert np.isclose(facade_areas[0][270.0], 20.0*9.0)
+
+
+def test_ring_winding_does_not_change_geometry():
+    offsets = np.array([0, len(CLOCKWISE_RING)])
+    heights = np.array([9.0])
+
+    clockwise = mesh_geometry(CLOCKWISE_RING, offsets, heights)[1][0]
+    counter_clockwise = mesh_geometry(CLOCKWISE_RING[::-1], offsets, heights)[1][0]
+
+    assert clockwise.keys() == counter_clockwise.keys()
+    for azimuth, area in clockwise.items():
+        assert np.isclose(counter_clockwise[azimuth], area)
@@ -0,0 +1,164 @@
+import hashlib
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from pvlib.iotools import read_epw
+from pvlib import location, irradiance
+
+
+# Arrays of the weather dict stored in the on-disk cache
+WEATHER_ARRAYS = ("temp_air", "ghi", "dni", "dhi", "solar_zenith", "solar_azimuth")
+
+# Version of the on-disk cache format (part of the file name)
+CACHE_VERSION = 1
+
+
+def load_weather(epw_file, cache_dir=None):
+    """
+    Read an EPW file and compute the solar position for every hour of the year.
+
+    When `cache_dir` is given, the preprocessed arrays are stored there as
+    `weather_v<CACHE_VERSION>_<hash>.npz` (e.g. weather_v1_<hash>.npz), keyed by the
+    hash of the EPW content, and later calls (from this or any other process) load them
+    instead of parsing the EPW file again.
+
+    Args:
+        epw_file (str): Path to the .epw weather file.
+        cache_dir (str): Folder of the preprocessed weather cache (optional).
+
+    Returns:
+        dict: Latitude and longitude of the site, plus hourly arrays (8760 values) of
+              temp_air, ghi, dni, dhi, solar_zenith (apparent) and solar_azimuth. The "key"
+              entry identifies the weather file (hash of its content) for caching.
+    """
+    with open(epw_file, 'rb') as f:
+        key = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    cache_file = None
+    if cache_dir:
+        cache_file = os.path.join(cache_dir, f"weather_v{CACHE_VERSION}_{key}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                weather = {name: cached[name] for name in WEATHER_ARRAYS}
+                weather.update(key=key, latitude=float(cached["latitude"]), longitude=float(cached["longitude"]))
+            return weather
+
+    epw_data = read_epw(epw_file)
+
+    #export timezone and convert it into string with sign changed
+    tz_epw = int(epw_data[1]['TZ'])
+    sign = '+' if tz_epw <= 0 else '-'
+    timezone_string = f"Etc/GMT{sign}{abs(tz_epw)}"
+
+    #define weather parameters for solar calculation
+    lat = epw_data[1]['latitude']
+    lon = epw_data[1]['longitude']
+
+    loc = location.Location(lat, lon)
+    times = pd.date_range(start='01-01-2021', end='12-31-2021 23:00', freq='h', tz=timezone_string)
+    sp = loc.get_solarposition(times)
+
+    weather = {
+        "key": key,
+        "latitude": lat,
+        "longitude": lon,
+        "temp_air": epw_data[0]['temp_air'].to_numpy(dtype=float),
+        "ghi": epw_data[0]['ghi'].to_numpy(dtype=float),
+        "dni": epw_data[0]['dni'].to_numpy(dtype=float),
+        "dhi": epw_data[0]['dhi'].to_numpy(dtype=float),
+        "solar_zenith": sp['apparent_zenith'].to_numpy(dtype=float),
+        "solar_azimuth": sp['azimuth'].to_numpy(dtype=float),
+    }
+
+    if cache_file:
+        # Write to a temporary file first, so that concurrent readers never see a partial file
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, latitude=lat, longitude=lon, **{name: weather[name] for name in WEATHER_ARRAYS})
+        os.replace(tmp_file, cache_file)
+
+    return weather
+
+
+def plane_of_array(weather, surface_tilt, surface_azimuth):
+    """
+    Calculate the global irradiance on a tilted surface for every hour of the year.
+
+    Args:
+        weather (dict): Weather data as returned by `load_weather`.
+        surface_tilt (float): Tilt of the surface [deg] (0 = horizontal, 90 = vertical).
+        surface_azimuth (float): Azimuth of the surface [deg] (0 = North, clockwise).
+
+    Returns:
+        numpy.ndarray: Hourly plane-of-array global irradiance [W/m2].
+    """
+    POA_irradiance = irradiance.get_total_irradiance(surface_tilt=surface_tilt, surface_azimuth=surface_azimuth,
+                                                     solar_zenith=weather["solar_zenith"], solar_azimuth=weather["solar_azimuth"],
+                                                     dni=weather["dni"], ghi=weather["ghi"], dhi=weather["dhi"])
+    return np.asarray(POA_irradiance['poa_global'], dtype=float)
+
+
+def weather_key(weather):
+    """
+    Return the identity of the weather data, used to key caches.
+
+    Weather loaded with `load_weather` carries its own key; for other dicts (e.g. synthetic
+    weather) a hash of the irradiance and solar position arrays is computed and stored in
+    the dict under "key".
+    """
+    if "key" not in weather:
+        h = hashlib.blake2b(digest_size=16)
+        for name in ("ghi", "dni", "dhi", "solar_zenith", "solar_azimuth"):
+            h.update(np.ascontiguousarray(weather[name], dtype=float).tobytes())
+        weather["key"] = h.hexdigest()
+    return weather["key"]
+
+
+class PoaCache:
+    """
+    Cache of plane-of-array irradiance series, keyed by (weather, tilt, azimuth bin).
+
+    By default (`azimuth_step=0`) every distinct azimuth gets its own, exact series, so a
+    district with a handful of façade orientations only needs a handful of irradiance
+    calculations. A positive `azimuth_step` trades accuracy for speed: surfaces whose azimuth
+    falls in the same bin of `azimuth_step` degrees share one series, computed at the centre
+    of the bin. The returned arrays are read-only and shared: do not modify them.
+    """
+
+    def __init__(self, azimuth_step=0.0, max_entries=1024):
+        self.azimuth_step = azimuth_step
+        self.max_entries = max_entries
+        self._series = OrderedDict()
+
+    def azimuth_bin(self, surface_azimuth):
+        """Return the azimuth [deg] at the centre of the bin of `surface_azimuth`."""
+        if not self.azimuth_step:
+            return float(surface_azimuth) % 360
+        return round(float(surface_azimuth) / self.azimuth_step) * self.azimuth_step % 360
+
+    def get(self, weather, surface_tilt, surface_azimuth):
+        """
+        Return the hourly plane-of-array global irradiance [W/m2], see `plane_of_array`.
+        """
+        azimuth = self.azimuth_bin(surface_azimuth)
+        key = (weather_key(weather), float(surface_tilt), azimuth)
+        series = self._series.get(key)
+        if series is None:
+            series = plane_of_array(weather, surface_tilt, azimuth)
+            series.flags.writeable = False
+            self._series[key] = series
+            if len(self._series) > self.max_entries:
+                self._series.popitem(last=False)
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def clear(self):
+        """Remove all the cached series."""
+        self._series.clear()
+
+
+# Cache used by default by the simulation engine
+POA_CACHE = PoaCache()
@@ -0,0 +1,208 @@
+"""
+Simulation in a separate Python process.
+
+The add-on writes the inputs of a simulation job into a job folder (`write_job`): the
+per-building arrays as .npy files and the names, usages, archetype constructions and
+options in job.json. `WorkerProcess` runs this module on the job folder with the Python
+interpreter of Blender (`python -m <package>.worker <job_dir>`), outside Blender's
+process, so the simulation neither competes with the interface nor is limited by it.
+
+The worker reads the arrays memory-mapped, simulates the buildings chunk by chunk into the
+output files (see pipeline.SimulationRun) and reports its progress in progress.npy, a small
+memory-mapped array that the add-on polls and also uses to ask the worker to stop. When
+it finishes, the worker stores the results of each building in results.npy. Nothing here
+depends on bpy.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import numpy as np
+
+from .weather import load_weather, POA_CACHE
+from .cache import ResultCache
+from .pipeline import SimulationRun
+
+# Entries of the progress array
+DONE, COUNT, STATE, CANCEL = range(4)
+
+# States of a job
+RUNNING, FINISHED, CANCELLED, FAILED = range(4)
+
+JOB_FILE = "job.json"
+PROGRESS_FILE = "progress.npy"
+RESULTS_FILE = "results.npy"
+LOG_FILE = "worker.log"
+
+
+def write_job(job_dir, buildings, options):
+    """
+    Write the inputs of a simulation job.
+
+    Args:
+        job_dir (str): Job folder (created if needed).
+        buildings (dict): Names of the buildings and their inputs (pipeline.BUILDING_INPUTS).
+        options (dict): Options of the job: epw_file, out_dir, azimuth_step, result_cache_size
+                        (bytes, None: no cache) and `run`, the options of pipeline.SimulationRun.
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    n = len(buildings["names"])
+
+    # The grouped façade areas of all buildings as flat arrays with per-building offsets
+    facades = buildings["facade_areas"]
+    facade_offsets = np.zeros(n+1, dtype=np.int64)
+    facade_offsets[1:] = np.cumsum([len(areas) for areas in facades])
+    arrays = {
+        "horizontal_areas": np.asarray(buildings["horizontal_areas"], dtype=float),
+        "heights": np.asarray(buildings["heights"], dtype=float),
+        "facade_offsets": facade_offsets,
+        "facade_azimuths": np.fromiter((azimuth for areas in facades for azimuth in areas), dtype=float, count=facade_offsets[-1]),
+        "facade_areas": np.fromiter((area for areas in facades for area in areas.values()), dtype=float, count=facade_offsets[-1]),
+    }
+
+    # Usages and constructions are shared by many buildings: each is stored once, with an index per building
+    usages = sorted(set(buildings["usages"]))
+    constructions = {}
+    construction_index = [constructions.setdefault(json.dumps(construction, sort_keys=True), len(constructions))
+                          for construction in buildings["constructions"]]
+    arrays["usage_index"] = np.array([usages.index(usage) for usage in buildings["usages"]], dtype=np.int64)
+    arrays["construction_index"] = np.array(construction_index, dtype=np.int64)
+
+    for key, value in arrays.items():
+        np.save(os.path.join(job_dir, f"{key}.npy"), value)
+
+    job = {
+        "names": list(buildings["names"]),
+        "usages": usages,
+        "constructions": [json.loads(construction) for construction in constructions],
+        **options,
+    }
+    with open(os.path.join(job_dir, JOB_FILE), 'w') as f:
+        json.dump(job, f)
+
+    progress = np.lib.format.open_memmap(os.path.join(job_dir, PROGRESS_FILE), mode='w+', dtype=np.int64, shape=(4,))
+    progress[COUNT] = n
+    progress.flush()
+
+
+def read_job(job_dir):
+    """
+    Read a simulation job written by `write_job`.
+
+    Returns:
+        tuple: The buildings (as for `write_job`, with the arrays memory-mapped) and the job.
+    """
+    with open(os.path.join(job_dir, JOB_FILE), 'r') as f:
+        job = json.load(f)
+
+    def array(key):
+        return np.load(os.path.join(job_dir, f"{key}.npy"), mmap_mode='r')
+
+    offsets = array("facade_offsets")
+    azimuths = array("facade_azimuths")
+    areas = array("facade_areas")
+    buildings = {
+        "names": job["names"],
+        "horizontal_areas": array("horizontal_areas"),
+        "heights": array("heights"),
+        "facade_areas": [dict(zip(azimuths[start:stop].tolist(), areas[start:stop].tolist()))
+                         for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())],
+        "usages": [job["usages"][i] for i in array("usage_index").tolist()],
+        "constructions": [job["constructions"][i] for i in array("construction_index").tolist()],
+    }
+    return buildings, job
+
+
+def run_job(job_dir):
+    """
+    Simulate the buildings of a job into the output files, chunk by chunk, until all are
+    done or the add-on asks to stop; the buildings completed are written out in both cases.
+    """
+    progress = np.load(os.path.join(job_dir, PROGRESS_FILE), mmap_mode='r+')
+    try:
+        buildings, job = read_job(job_dir)
+        POA_CACHE.azimuth_step = job["azimuth_step"]
+        weather = load_weather(job["epw_file"], cache_dir=job["out_dir"] or None)
+        cache = ResultCache(os.path.join(job["out_dir"], "result_cache"), max_bytes=job["result_cache_size"]) if job["result_cache_size"] else None
+        run = SimulationRun(buildings, weather, job["out_dir"], cache=cache, **job["run"])
+
+        try:
+            while run.done < run.count and not progress[CANCEL]:
+                progress[DONE] = run.step()
+            run.save()
+        except BaseException:
+            run.close()
+            raise
+
+        results = np.lib.format.open_memmap(os.path.join(job_dir, RESULTS_FILE), mode='w+', dtype=float, shape=(run.done, 4))
+        results[:] = run.results()
+        results.flush()
+        del results
+        progress[STATE] = FINISHED if run.done == run.count else CANCELLED
+    except BaseException:
+        progress[STATE] = FAILED
+        raise
+    finally:
+        progress.flush()
+
+
+class WorkerProcess:
+    """
+    A simulation job running in a separate Python process.
+
+    Args:
+        job_dir (str): Folder of a job written by `write_job`.
+        python (str): Python interpreter of the worker (default: the current one, which in
+                      Blender is its bundled Python).
+    """
+
+    def __init__(self, job_dir, python=None):
+        self.job_dir = job_dir
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        # The worker imports this package from its parent folder, and the dependencies from the current paths
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.dirname(package_dir)] + sys.path))
+        self.log = open(os.path.join(job_dir, LOG_FILE), 'w')
+        self.process = subprocess.Popen([python or sys.executable, "-m", f"{os.path.basename(package_dir)}.worker", job_dir],
+                                        stdout=self.log, stderr=subprocess.STDOUT, env=env)
+        self.progress = np.load(os.path.join(job_dir, PROGRESS_FILE), mmap_mode='r+')
+
+    def status(self):
+        """
+        Return the number of buildings done, the number of buildings and the state of the job
+        (RUNNING, FINISHED, CANCELLED or FAILED; a worker that exits without a final state failed).
+        """
+        exited = self.process.poll() is not None
+        done, count, state = (int(value) for value in self.progress[:CANCEL])
+        if state == RUNNING and exited:
+            state = FAILED
+        return done, count, state
+
+    def cancel(self):
+        """ Ask the worker to stop after the current chunk and write out the buildings done. """
+        self.progress[CANCEL] = 1
+        self.progress.flush()
+
+    def results(self):
+        """ Return the results of the buildings done, see pipeline.SimulationRun.results. """
+        return np.load(os.path.join(self.job_dir, RESULTS_FILE))
+
+    def log_text(self):
+        """ Return the output of the worker (e.g. the traceback of a failure). """
+        self.log.flush()
+        with open(os.path.join(self.job_dir, LOG_FILE), 'r') as f:
+            return f.read()
+
+    def close(self, remove=True):
+        """ Stop the worker if it is still running, and delete the job folder if `remove`. """
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+        self.progress = None
+        if remove:
+            shutil.rmtree(self.job_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_job(sys.argv[1])